@@ -25,6 +25,7 @@ import com.litongjava.tio.http.common.sse.SsePacket;
 import com.litongjava.tio.http.server.util.SseEmitter;
 import com.litongjava.tio.utils.SystemTimer;
 import com.litongjava.tio.utils.crypto.Md5Utils;
+import com.litongjava.tio.utils.environment.EnvUtils;
 import com.litongjava.tio.utils.hutool.FileUtil;
 import com.litongjava.tio.utils.hutool.ResourceUtil;
 import com.litongjava.tio.utils.hutool.StrUtil;
@@ -205,8 +206,14 @@ public class ExplanationVideoService {
 
   public String getSystemPrompt() {
     // 生成代码
+    // 渲染端提供 custom_voiceover 模块时（本地 render_service.py、Modal）才让生成的代码导入它，
+    // 默认的远程渲染端没有这个模块，仍使用内联 TTS 代码的提示词
+    boolean sharedTts = Boolean.parseBoolean(EnvUtils.getStr("linux.api.shared_tts", "false"));
     URL resource = ResourceUtil.getResource("prompts/gen_video_code_en.txt");
     StringBuilder stringBuffer = FileUtil.readURLAsString(resource);
+    if (sharedTts) {
+      stringBuffer = new StringBuilder(SharedTtsPrompts.instructions(stringBuffer.toString()));
+    }
 
     String sql = "select prompt from ef_generate_code_avoid_error_prompt";
     List<String> prompts = Db.queryListString(sql);
@@ -215,17 +222,18 @@ public class ExplanationVideoService {
         stringBuffer.append(string).append("\r\n");
       }
     }
-    URL code_example_01_url = ResourceUtil.getResource("prompts/code_example_01.txt");
-    StringBuilder code_example_01 = FileUtil.readURLAsString(code_example_01_url);
-
-    URL code_example_02_url = ResourceUtil.getResource("prompts/code_example_02.txt");
-    StringBuilder code_example_02 = FileUtil.readURLAsString(code_example_02_url);
-
-    URL code_example_03_url = ResourceUtil.getResource("prompts/code_example_03.txt");
-    StringBuilder code_example_03 = FileUtil.readURLAsString(code_example_03_url);
+    String code_example_01 = readCodeExample("prompts/code_example_01.txt", sharedTts);
+    String code_example_02 = readCodeExample("prompts/code_example_02.txt", sharedTts);
+    String code_example_03 = readCodeExample("prompts/code_example_03.txt", sharedTts);
 
     String prompt = stringBuffer.toString() + "\r\n## complete Python code example  \r\n" + "\r\n### Example 1  \r\n" + code_example_01 + "\r\n### Example 2  \r\n" + code_example_02
         + "\r\n### Example 3  \r\n" + code_example_03;
     return prompt;
   }
+
+  private String readCodeExample(String name, boolean sharedTts) {
+    URL url = ResourceUtil.getResource(name);
+    String codeExample = FileUtil.readURLAsString(url).toString();
+    return sharedTts ? SharedTtsPrompts.codeExample(codeExample) : codeExample;
+  }
 }
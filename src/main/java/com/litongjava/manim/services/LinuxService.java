@@ -19,6 +19,7 @@ import com.litongjava.template.PromptEngine;
 import com.litongjava.tio.core.ChannelContext;
 import com.litongjava.tio.core.Tio;
 import com.litongjava.tio.http.common.sse.SsePacket;
+import com.litongjava.tio.utils.environment.EnvUtils;
 import com.litongjava.tio.utils.hutool.FileUtil;
 import com.litongjava.tio.utils.hutool.StrUtil;
 import com.litongjava.tio.utils.json.FastJson2Utils;
@@ -37,8 +38,10 @@ public class LinuxService {
    * @return
    */
   public ProcessResult executeCode(String code) {
-    String apiBase = "http://13.216.69.13";
-    ProcessResult executeMainmCode = LinuxClient.executeMainmCode(apiBase, "123456", code);
+    // 可通过 linux.api.base 指向本地的 render_service.py
+    String apiBase = EnvUtils.getStr("linux.api.base", "http://13.216.69.13");
+    String apiKey = EnvUtils.getStr("linux.api.key", "123456");
+    ProcessResult executeMainmCode = LinuxClient.executeMainmCode(apiBase, apiKey, code);
     return executeMainmCode;
   }
 
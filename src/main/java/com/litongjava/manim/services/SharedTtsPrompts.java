@@ -0,0 +1,80 @@
+package com.litongjava.manim.services;
+
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+/**
+ * 把内联 TTS 代码的提示词改写成使用渲染端 custom_voiceover 模块的版本（linux.api.shared_tts=true 时使用），
+ * 只维护一份提示词
+ */
+public class SharedTtsPrompts {
+
+  /** 只有内联 TTS 代码用到的导入 */
+  private static final String TTS_IMPORTS = "(?:import os|import requests|from contextlib import contextmanager|import hashlib|from moviepy import AudioFileClip)\\b";
+
+  /** 从 CACHE_DIR 的定义（连同紧挨着的导入）到 custom_voiceover_tts 末尾 finally 里的 pass */
+  private static final String TTS_BLOCK = "^(?:(?:" + TTS_IMPORTS + ".*\\r?\\n)+(?:\\r?\\n)*)?(?:# --- TTS Caching Setup ---\\r?\\n)?"
+      + "CACHE_DIR = .*\\r?\\n[\\s\\S]*?^    finally:\\r?\\n(?:.*\\r?\\n)*?        pass\\b.*\\r?\\n";
+
+  private static final Pattern TTS_BLOCK_PATTERN = Pattern.compile(TTS_BLOCK, Pattern.MULTILINE);
+  private static final Pattern TTS_BLOCK_IN_FENCE_PATTERN = Pattern.compile(TTS_BLOCK + "```\\r?\\n", Pattern.MULTILINE);
+  private static final Pattern TTS_IMPORT_LINE_PATTERN = Pattern.compile("^" + TTS_IMPORTS + ".*\\r?\\n", Pattern.MULTILINE);
+
+  /** if tracker.audio_path and tracker.duration > 0: self.add_sound(tracker.audio_path) [else: print(...)] */
+  private static final Pattern CHECKED_ADD_SOUND_PATTERN = Pattern.compile(
+      "^([ \\t]*)if tracker\\.audio_path(?: and tracker\\.duration > 0)?:\\r?\\n\\1[ \\t]+self\\.add_sound\\(tracker\\.audio_path(?:, time_offset=0)?\\)(.*)\\r?\\n"
+          + "(?:\\1else:\\r?\\n\\1[ \\t]+print\\(.*\\)\\r?\\n)?",
+      Pattern.MULTILINE);
+  private static final Pattern ADD_SOUND_PATTERN = Pattern.compile("^([ \\t]*)self\\.add_sound\\(tracker\\.audio_path(?:, time_offset=0)?\\)(.*)\\r?\\n",
+      Pattern.MULTILINE);
+
+  private static final Pattern CACHE_DIR_SETUP_PATTERN = Pattern.compile(
+      "^    CACHE_DIR = r\"#\\(output_path\\)/audio\"\\r?\\n    # Ensure the directory is created.*\\r?\\n    os\\.makedirs\\(CACHE_DIR, exist_ok=True\\)\\r?\\n", Pattern.MULTILINE);
+
+  private static final String TTS_SETUP = "# --- TTS Setup ---\n" //
+      + "# custom_voiceover is provided by the render environment; do not re-implement it.\n" //
+      + "from custom_voiceover import custom_voiceover_tts, set_cache_dir\n" //
+      + "set_cache_dir(r\"#(output_path)/audio\")\n";
+
+  private static final String TTS_NOTE = "**Do not** copy or re-implement `custom_voiceover_tts`, `CustomVoiceoverTracker` or `get_cache_filename` in the generated code. "
+      + "The shared `custom_voiceover` module keeps one pooled HTTP connection to the TTS service, retries failed requests and caches the audio. "
+      + "Start the sound with `tracker.add_sound(self)` instead of `self.add_sound(tracker.audio_path)`: it does not wait for the narration download, "
+      + "so build the mobjects after it, and it skips the sound if the request failed (the tracker then has `audio_path=None` and `duration=0`).\n";
+
+  /**
+   * 改写代码生成提示词（gen_video_code_en.txt）：TTS 代码块、CACHE_DIR 规则和 add_sound 的用法
+   * @param prompt
+   * @return
+   */
+  public static String instructions(String prompt) {
+    String text = prompt.replace("`self.add_sound(tracker.audio_path)`", "`tracker.add_sound(self)`") //
+        .replace("`self.add_sound()`", "`tracker.add_sound(self)`")
+        .replace("*   **Set `CACHE_DIR` Variable:** In the Python script, the global variable `CACHE_DIR` (used by the `custom_voiceover_tts` function) **must** be defined exactly as follows:",
+            "*   **Set the Cache Directory:** In the Python script, the TTS cache directory (used by the `custom_voiceover_tts` function) **must** be set exactly as follows:")
+        .replace("    # --- TTS Caching Setup ---", "    # --- TTS Setup ---") //
+        .replace("a different relative path for `CACHE_DIR`.", "a different relative path for the cache directory.");
+    text = CACHE_DIR_SETUP_PATTERN.matcher(text)
+        .replaceFirst(Matcher.quoteReplacement("    from custom_voiceover import custom_voiceover_tts, set_cache_dir\n    set_cache_dir(r\"#(output_path)/audio\")\n"));
+    text = TTS_BLOCK_IN_FENCE_PATTERN.matcher(text).replaceFirst(Matcher.quoteReplacement(TTS_SETUP + "```\n" + TTS_NOTE));
+    return useTrackerAddSound(text);
+  }
+
+  /**
+   * 改写完整的代码示例（code_example_0N.txt）：去掉内联 TTS 代码和它的导入
+   * @param code
+   * @return
+   */
+  public static String codeExample(String code) {
+    String text = TTS_BLOCK_PATTERN.matcher(code).replaceFirst(Matcher.quoteReplacement(TTS_SETUP));
+    text = TTS_IMPORT_LINE_PATTERN.matcher(text).replaceAll("");
+    return useTrackerAddSound(text);
+  }
+
+  /**
+   * tracker.add_sound(self) 不等待旁白下载完成，也会跳过失败的旁白
+   */
+  private static String useTrackerAddSound(String text) {
+    text = CHECKED_ADD_SOUND_PATTERN.matcher(text).replaceAll("$1tracker.add_sound(self)$2\n");
+    return ADD_SOUND_PATTERN.matcher(text).replaceAll("$1tracker.add_sound(self)$2\n");
+  }
+}
@@ -1,24 +1,43 @@
+import sys
+
 import modal
 
 # 构建镜像：
 # - apt_install 安装 TeX Live、FFmpeg、pkg-config、cairo 开发包以及 pango 开发包
 # - pip_install 安装 Python 包（numpy、manim、manimpango、latex、moviepy、requests）
 # - add_local_dir 将本地 "scripts" 目录挂载到容器的 /scripts 目录
+# - add_local_dir 将共享的 TTS 模块（../scripts 下的 custom_voiceover.py 等）挂载到 /runtime
+# - env 让 custom_voiceover 把挂载在 /tts-cache 的共享卷当作第二层 TTS 缓存
 image = (
   modal.Image.debian_slim()
   .apt_install("texlive-full", "ffmpeg", "pkg-config", "libcairo2-dev", "libpango1.0-dev")
   .pip_install("numpy", "manim", "manimpango", "latex", "moviepy", "requests")
   .add_local_dir("scripts", "/scripts")
+  .add_local_dir("../scripts", "/runtime")
+  .env({"TTS_CACHE_BACKENDS": "dir:/tts-cache"})
 )
 
+# 所有容器共享的 TTS 缓存层：本地 tts_cache/ 未命中时先查这里，新下载的旁白写回这里
+tts_volume = modal.Volume.from_name("tts-cache", create_if_missing=True)
+
 app = modal.App("example-run-local-script", image=image)
 
 
-@app.function()
+@app.function(volumes={"/tts-cache": tts_volume})
 def run_script():
+  # 生成的脚本通过 import 使用共享的 custom_voiceover 等模块
+  sys.path.insert(0, "/runtime")
   with open("/scripts/fx_xx_cario.py", "r", encoding="utf-8") as f:
     script_content = f.read()
     print(script_content)
+    # 后台并发下载所有旁白，exec 构建场景时不阻塞
+    from tts_prefetch import prefetch_source
+    prefetch_source(script_content, wait=False)
+    # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    from render_cache import install_render_cache
+    install_render_cache()
     exec(script_content, {'__name__': '__main__'})
+  # 提交写回的旁白，之后启动的容器才能看到
+  tts_volume.commit()
 
   print("exec finished")
@@ -1,11 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-import hashlib
-from moviepy import AudioFileClip
 
 # 为 MathTex 添加 set_font_size 方法
 def mathtex_set_font_size(self, new_font_size):
@@ -25,70 +20,8 @@ MY_RED = "#DC2626"  # 红色
 MY_WHITE = "#FFFFFF"  # 白色
 MY_BLACK = "#000000"  # 黑色
 
-# --- TTS Caching Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    """Tracks audio path and duration for TTS."""
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    """Generates a unique filename based on the text hash."""
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    """
-    Fetches TTS audio, caches it, and provides path and duration.
-    Usage: with custom_voiceover_tts("text") as tracker: ...
-    """
-    cache_file = get_cache_filename(text)
-    audio_file = cache_file  # Initialize audio_file
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-        print(f"Using cached TTS for: {text[:30]}...")
-    else:
-        print(f"Requesting TTS for: {text[:30]}...")
-        try:
-            input_text_encoded = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text_encoded}"
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            audio_file = cache_file
-            print("TTS downloaded and cached.")
-        except requests.exceptions.RequestException as e:
-            print(f"TTS API request failed: {e}")
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return
-
-    if audio_file and os.path.exists(audio_file):
-        try:
-            clip = AudioFileClip(audio_file)
-            duration = clip.duration
-            clip.close()
-            print(f"Audio duration: {duration:.2f}s")
-            tracker = CustomVoiceoverTracker(audio_file, duration)
-        except Exception as e:
-            print(f"Error processing audio file {audio_file}: {e}")
-            tracker = CustomVoiceoverTracker(None, 0)
-    else:
-        print(f"TTS audio file not found or not created: {audio_file}")
-        tracker = CustomVoiceoverTracker(None, 0)
-
-    try:
-        yield tracker
-    finally:
-        pass
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
 
 # -----------------------------
 # CombinedScene：整合所有场景并添加字幕和音频
@@ -185,10 +118,7 @@ class CombinedScene(MovingCameraScene):
         subtitle.next_to(title, DOWN, buff=0.5)
         voice_text_01 = "大家好，欢迎来到本期数学讲解视频。👋 本期我们将讲解如何求解函数 f(x) 等于 x 平方的切线方程。🤔"
         with custom_voiceover_tts(voice_text_01) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 1 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
             subtitle_voice = Text(
                 voice_text_01,
                 font_size=32,
@@ -278,10 +208,7 @@ class CombinedScene(MovingCameraScene):
         )
         voice_text_02 = "首先我们来理解切线的概念。切线就是曲线在某一点的瞬时方向。对于我们研究的函数 f(x) 等于 x 平方，它的图像是一条抛物线。我们关注的是如何找到这条抛物线上任意一点，比如点 (a, a平方) 处的切线。"
         with custom_voiceover_tts(voice_text_02) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 2 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
             subtitle_voice_02 = Text(
                 voice_text_02, font_size=32, color=MY_BLACK,
                 width=config.frame_width - 2, should_center=True
@@ -384,10 +311,7 @@ class CombinedScene(MovingCameraScene):
         tangent_label.set_font_size(24)
         voice_text_03 = "现在我们来一步步求解。第一步，确定切点，就是抛物线上的点 (a, a平方)。第二步，计算函数 f(x) 的导数，得到 f'(x) 等于 2x。那么在点 a 处的斜率就是 f'(a) 等于 2a。第三步，利用点斜式方程，我们可以写出切线的初步形式：y 减 a平方 等于 2a 乘以 (x 减 a)。最后，第四步，整理这个方程，就得到了最终的切线方程：y 等于 2a 乘以 (x 减 a) 再加上 a平方。看右边的图形，当 a=1 时，切点是 (1,1)，斜率是 2，这就是对应的切线。"
         with custom_voiceover_tts(voice_text_03) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 3 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
             subtitle_voice_03 = Text(
                 voice_text_03, font_size=32, color=MY_BLACK,
                 width=config.frame_width - 2, should_center=True
@@ -453,10 +377,7 @@ class CombinedScene(MovingCameraScene):
         )
         voice_text_04 = "回顾一下背后的数学原理。我们计算斜率 2a，是基于导数的定义，它描述了函数在某点变化的快慢。而我们写出最终的切线方程，是利用了直线的点斜式方程，其中 (x1, y1) 就是我们的切点 (a, a平方)，m 就是我们求出的斜率 2a。这两个是求解切线问题的关键理论基础。"
         with custom_voiceover_tts(voice_text_04) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 4 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
             subtitle_voice_04 = Text(
                 voice_text_04, font_size=32, color=MY_BLACK,
                 width=config.frame_width - 2, should_center=True
@@ -505,10 +426,7 @@ class CombinedScene(MovingCameraScene):
         question.to_edge(DOWN, buff=1.0)
         voice_text_05 = "好了，让我们来总结一下。要求函数 f(x) 等于 x 平方的切线方程，你需要记住三个关键点：一是切点坐标 (a, a平方)，二是导数 f'(x) 等于 2x，由此得到切点斜率 2a，三是最终的切线方程 y 等于 2a 乘以 (x 减 a) 加上 a平方。希望通过本期视频，你已经掌握了这个方法！思考一下，切线方程在数学或其他领域还有哪些应用呢？"
         with custom_voiceover_tts(voice_text_05) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 5 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
             subtitle_voice_05 = Text(
                 voice_text_05, font_size=32, color=MY_WHITE,
                 width=config.frame_width - 2, should_center=True
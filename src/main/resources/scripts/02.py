@@ -3,6 +3,8 @@ import random
 import numpy as np
 from manim import *
 
+from render_cache import install_render_cache
+
 # 尝试导入 DARK_GREEN，如果失败则定义一个替代颜色
 try:
     from manim.utils.color.BS381 import DARK_GREEN
@@ -544,5 +546,6 @@ if __name__ == "__main__":
 
     # 临时设置输出目录（这里指定输出到 "./output_video" 目录）
     config.media_dir = "./02"
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
     scene = CombinedScene()
     scene.render()
@@ -4,6 +4,8 @@ import numpy as np
 import random
 from manim.utils.color.BS381 import DARK_GREEN  # 虽然未使用，但按要求导入
 
+from render_cache import install_render_cache
+
 # 定义一些自定义颜色
 MY_BLUE = "#2E6F95"
 MY_GOLD = "#F2C641"
@@ -428,5 +430,6 @@ if __name__ == "__main__":
     from manim import tempconfig
 
     with tempconfig({"media_dir": output_directory}):
+        install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
         scene = CombinedScene()
         scene.render()
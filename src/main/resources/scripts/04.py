@@ -1,13 +1,8 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-import hashlib
 import manimpango # For font checking
 
-from moviepy import AudioFileClip # Correct import for AudioFileClip
 # Removed the problematic import for contrasting_color
 
 # --- Font Check ---
@@ -46,99 +41,10 @@ MY_RED = "#DC2626" # Red for emphasis
 MY_BLUE = "#3B82F6" # Blue for blocks
 MY_GREEN = "#10B981" # Green for blocks
 
-# --- TTS Caching Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-
-class CustomVoiceoverTracker:
-    """Tracks audio path and duration for TTS."""
-
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-
-def get_cache_filename(text):
-    """Generates a unique filename based on the text hash."""
-    # Use a language code prefix if supporting multiple languages
-    lang_prefix = "en_" # Assuming English for this script
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{lang_prefix}{text_hash}.mp3")
-
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    """
-    Fetches TTS audio, caches it, and provides path and duration.
-    Usage: with custom_voiceover_tts("text") as tracker: ...
-    """
-    cache_file = get_cache_filename(text)
-    audio_file = cache_file  # Initialize audio_file
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-        # print(f"Using cached TTS for: {text[:30]}...")
-    else:
-        # print(f"Requesting TTS for: {text[:30]}...")
-        try:
-            # URL encode the input text to handle special characters
-            input_text_encoded = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text_encoded}"
-
-            response = requests.get(url, stream=True, timeout=60)  # Added timeout
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            audio_file = cache_file
-            # print("TTS downloaded and cached.")
-
-        except requests.exceptions.RequestException as e:
-            print(f"TTS API request failed: {e}")
-            # Fallback: create a dummy tracker with zero duration
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return  # Exit context manager
-        except Exception as e:
-             # Clean up potentially incomplete cache file on error
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
-            print(f"An error occurred during TTS processing: {e}")
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return # Exit context manager
-
-
-    # Ensure audio file exists before processing with MoviePy
-    if audio_file and os.path.exists(audio_file):
-        try:
-            # Use context manager for AudioFileClip
-            with AudioFileClip(audio_file) as clip:
-                duration = clip.duration
-            # print(f"Audio duration: {duration:.2f}s")
-            tracker = CustomVoiceoverTracker(audio_file, duration)
-        except Exception as e:
-            print(f"Error processing audio file {audio_file}: {e}")
-            # Fallback if audio file is corrupted or invalid
-            if os.path.exists(cache_file): # Clean up potentially bad cache file
-                try:
-                    os.remove(cache_file)
-                except OSError as rm_err:
-                    print(f"Error removing corrupted cache file {cache_file}: {rm_err}")
-            tracker = CustomVoiceoverTracker(None, 0)
-    else:
-        # Fallback if audio file was not created or found
-        print(f"TTS audio file not found or not created: {audio_file}")
-        tracker = CustomVoiceoverTracker(None, 0)
-
-    try:
-        yield tracker
-    finally:
-        # No cleanup needed here as we are caching
-        pass
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 # --- Helper Function for Creating Grids ---
 def create_grid(rows, cols, square_size=0.4, spacing=0.05, color=BLUE):
@@ -260,10 +166,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_01 = "Hello! Today, we'll explore the associative property of multiplication using graphics. We want to visually prove that multiplying 7 by 5, then by 2, gives the same result as multiplying 7 by the result of 5 times 2. Is (7 times 5) times 2 equal to 7 times (5 times 2)?"
         with custom_voiceover_tts(voice_text_01) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 1 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_01, font_size=32, color=text_color,
@@ -352,10 +255,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_02 = "Let's first visualize (7 times 5) times 2. We start with a block representing 7 times 5, containing 35 small squares. The expression means we need two of these blocks. Here's the second one. Together, these represent (7 times 5) times 2. Now, let's rearrange all these 70 squares into one single rectangle. We can arrange them into a rectangle with 7 rows and 10 columns."
         with custom_voiceover_tts(voice_text_02) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 2 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_02, font_size=32, color=text_color,
@@ -463,10 +363,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_03 = "Next, let's visualize 7 times (5 times 2). We start with a block representing 5 times 2, containing 10 small squares. The expression means we need seven of these blocks. Here they are. Together, these represent 7 times (5 times 2). Now, let's rearrange all these 70 squares into one single rectangle. Notice, we can arrange them into the exact same rectangle as before: 7 rows and 10 columns."
         with custom_voiceover_tts(voice_text_03) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 3 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_03, font_size=32, color=text_color,
@@ -566,10 +463,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_04 = "So, we saw that the grouping (7 times 5) times 2, which is 35 times 2, equals 70. We also saw that the grouping 7 times (5 times 2), which is 7 times 10, also equals 70. Both ways of grouping lead to the same total number of squares, 70. This visually confirms that (7 times 5) times 2 is equal to 7 times (5 times 2)."
         with custom_voiceover_tts(voice_text_04) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 4 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_04, font_size=32, color=text_color,
@@ -644,10 +538,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_05 = "In conclusion, using these graphical representations, we have demonstrated the associative property of multiplication for this example: (7 times 5) times 2 equals 7 times (5 times 2). This property holds true for any numbers and is written generally as (a times b) times c equals a times (b times c). Can you think if this property applies to other operations like addition or subtraction? Thanks for watching!"
         with custom_voiceover_tts(voice_text_05) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 5 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_05, font_size=32, color=text_color,
@@ -705,6 +596,8 @@ if __name__ == "__main__":
 
 
     # Create and render the scene
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
 
@@ -1,11 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-from moviepy import AudioFileClip
-import hashlib
 
 # 自定义颜色
 MY_DARK_BLUE = "#1E3A8A"  # 深蓝色
@@ -17,51 +12,10 @@ MY_RED = "#DC2626"  # 红色
 MY_WHITE = "#FFFFFF"  # 白色
 MY_BLACK = "#000000"  # 黑色
 
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-
-class CustomVoiceoverTracker:
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-
-def get_cache_filename(text):
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-    else:
-        input_text = requests.utils.quote(text)
-        url = f"{base_url}?token={token}&input={input_text}"
-
-        response = requests.get(url, stream=True)
-        if response.status_code != 200:
-            raise Exception(f"TTS 接口错误: {response.status_code} - {response.text}")
-
-        with open(cache_file, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-
-        audio_file = cache_file
-
-    clip = AudioFileClip(audio_file)
-    duration = clip.duration
-    clip.close()
-
-    tracker = CustomVoiceoverTracker(audio_file, duration)
-    try:
-        yield tracker
-    finally:
-        pass  # 根据需要决定是否清理缓存
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 
 # -----------------------------
@@ -153,7 +107,7 @@ class CombinedScene(MovingCameraScene):
         voice_text = "大家好，欢迎来到本期数学讲解视频。本期我们将讲解如何求解函数 f(x) 等于 x 平方的切线方程。"
         with custom_voiceover_tts(voice_text) as tracker:
             # 立即开始播放声音
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             # 同时显示屏幕底部的完整字幕，与音频完全同步显示
             subtitle_voice = Text(
@@ -206,6 +160,8 @@ if __name__ == "__main__":
     config.output_file = "CombinedScene"
     config.media_dir = "06"
     config.disable_caching = True
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print("Scene rendering finished.")
@@ -1,10 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-import hashlib
 import math
 
 # Correct import for AudioFileClip
@@ -28,81 +24,10 @@ MY_HIGHLIGHT_COLOR = YELLOW_D
 # Manim's default should be fine for English and basic symbols.
 # If using complex characters or other languages, font checking (as in the prompt) is needed.
 
-# --- TTS Caching Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    """Tracks audio path and duration for TTS."""
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    """Generates a unique filename based on the text hash."""
-    # Limit filename length if necessary, although hash should be fixed length
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    """
-    Fetches TTS audio, caches it, and provides path and duration.
-    Usage: with custom_voiceover_tts("text") as tracker: ...
-    """
-    cache_file = get_cache_filename(text)
-    audio_file = cache_file # Initialize audio_file
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-        print(f"Using cached TTS for: {text[:30]}...")
-    else:
-        print(f"Requesting TTS for: {text[:30]}...")
-        try:
-            # URL encode the input text to handle special characters
-            input_text_encoded = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text_encoded}"
-
-            response = requests.get(url, stream=True, timeout=60) # Added timeout
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            audio_file = cache_file
-            print("TTS downloaded and cached.")
-
-        except requests.exceptions.RequestException as e:
-            print(f"TTS API request failed: {e}")
-            # Fallback: create a dummy tracker with zero duration
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return # Exit context manager
-
-    # Ensure audio file exists before processing with MoviePy
-    if audio_file and os.path.exists(audio_file):
-        try:
-            # Use moviepy.editor.AudioFileClip
-            clip = AudioFileClip(audio_file)
-            duration = clip.duration
-            clip.close()
-            print(f"Audio duration: {duration:.2f}s")
-            tracker = CustomVoiceoverTracker(audio_file, duration)
-        except Exception as e:
-            print(f"Error processing audio file {audio_file}: {e}")
-            # Fallback if audio file is corrupted or invalid
-            tracker = CustomVoiceoverTracker(None, 0)
-    else:
-        # Fallback if audio file was not created or found
-        print(f"TTS audio file not found or not created: {audio_file}")
-        tracker = CustomVoiceoverTracker(None, 0)
-
-    try:
-        yield tracker
-    finally:
-        # No cleanup needed here as we are caching
-        pass
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 # -----------------------------
 # Helper Functions for Arch Geometry
@@ -260,10 +185,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_01 = "Hello! Today we'll explore how a simple stone arch stays standing, focusing on the crucial role of the keystone."
         with custom_voiceover_tts(voice_text_01) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 1 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_01, font_size=32, color=MY_BLACK,
@@ -370,10 +292,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_02 = "Imagine building an arch. You start placing wedge-shaped stones, called voussoirs, from both sides on temporary supports. Each stone leans inwards. Gravity pulls them down, creating a gap at the very top."
         with custom_voiceover_tts(voice_text_02) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 2 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_02, font_size=32, color=MY_BLACK,
@@ -444,10 +363,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_03 = "This top gap is filled by a special stone: the keystone. Notice its wedge shape - wider at the top, tapering downwards."
         with custom_voiceover_tts(voice_text_03) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 3 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_03, font_size=32, color=MY_BLACK,
@@ -534,10 +450,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_04 = "When the keystone is tapped into place, it wedges tightly. Gravity pulls down on it, and the side stones push inwards. Because of its shape, the keystone redirects these forces outwards and downwards into the stones below."
         with custom_voiceover_tts(voice_text_04) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 4 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_04, font_size=32, color=MY_BLACK,
@@ -641,10 +554,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_05 = "This locking action creates a continuous line of compression running through all the stones. It squeezes them together tightly. Importantly, stone is very strong when squeezed like this."
         with custom_voiceover_tts(voice_text_05) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 5 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_05, font_size=32, color=MY_BLACK,
@@ -707,10 +617,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS Integration ---
         voice_text_06 = "These compressive forces travel down through the stones, safely transferring the weight to the ground supports, called abutments. The arch also generates an outward push, called thrust, that the abutments must resist. The keystone is the critical piece that locks the entire structure, turning gravity into stable compression."
         with custom_voiceover_tts(voice_text_06) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 6 TTS audio failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_06, font_size=32, color=MY_BLACK,
@@ -767,6 +674,8 @@ if __name__ == "__main__":
     config.media_dir = "./#(output_video)" # Standard placeholder
 
     # Create and render the scene
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
 
@@ -1,11 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-import hashlib
-from moviepy import AudioFileClip # Correct import for AudioFileClip
 import manimpango # For font checking
 
 # --- Custom Colors ---
@@ -46,78 +41,10 @@ else:
     if not found_fallback:
         print(f"警告: 未找到指定的 '{DEFAULT_FONT}' 或任何备用中文字体。将使用 Manim 默认字体，中文可能无法正确显示。")
 
-# --- TTS Caching Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    """Tracks audio path and duration for TTS."""
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    """Generates a unique filename based on the text hash."""
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    """
-    Fetches TTS audio, caches it, and provides path and duration.
-    Usage: with custom_voiceover_tts("text") as tracker: ...
-    """
-    cache_file = get_cache_filename(text)
-    audio_file = cache_file  # Initialize audio_file
-
-    if os.path.exists(cache_file):
-        print(f"Using cached TTS for: {text[:30]}...")
-    else:
-        print(f"Requesting TTS for: {text[:30]}...")
-        try:
-            # URL encode the input text to handle special characters
-            input_text_encoded = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text_encoded}"
-
-            response = requests.get(url, stream=True, timeout=60)  # Added timeout
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            audio_file = cache_file
-            print("TTS downloaded and cached.")
-
-        except requests.exceptions.RequestException as e:
-            print(f"TTS API request failed: {e}")
-            # Fallback: create a dummy tracker with zero duration
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return  # Exit context manager
-
-    # Ensure audio file exists before processing with MoviePy
-    if audio_file and os.path.exists(audio_file):
-        try:
-            clip = AudioFileClip(audio_file)
-            duration = clip.duration
-            clip.close()
-            print(f"Audio duration: {duration:.2f}s")
-            tracker = CustomVoiceoverTracker(audio_file, duration)
-        except Exception as e:
-            print(f"Error processing audio file {audio_file}: {e}")
-            # Fallback if audio file is corrupted or invalid
-            tracker = CustomVoiceoverTracker(None, 0)
-    else:
-        # Fallback if audio file was not created or found
-        print(f"TTS audio file not found or not created: {audio_file}")
-        tracker = CustomVoiceoverTracker(None, 0)
-
-    try:
-        yield tracker
-    finally:
-        # No cleanup needed here as we are caching
-        pass
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 # --- Custom TeX Template for colorbox/color ---
 # Needed for \colorbox and \color[HTML]
@@ -263,11 +190,7 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
 
         voice_text_01 = "大家好！本期视频，我们将用图形化的方式来证明乘法的结合律。具体来说，我们要证明 7 乘以 5 再乘以 2，等于 7 乘以 5 乘以 2 的积。"
         with custom_voiceover_tts(voice_text_01) as tracker:
-            audio_duration = tracker.duration if tracker.audio_path else 0
-            if tracker.audio_path and audio_duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("Warning: Scene 1 TTS failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_01, font_size=32, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5)
             self.add_fixed_in_frame_mobjects(subtitle_voice) # Fixed subtitle
@@ -293,10 +216,10 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
             self.play(Write(formula), run_time=anim_formula_duration)
 
             # Calculate wait time based on audio duration vs animation time
-            if audio_duration > 0:
+            if tracker.duration > 0:
                 elapsed_time = total_anim_duration_planned
                 time_for_fadeout = fade_out_duration
-                remaining_time = audio_duration - elapsed_time - time_for_fadeout
+                remaining_time = tracker.duration - elapsed_time - time_for_fadeout
                 if remaining_time > 0:
                     self.wait(remaining_time)
             else:
@@ -381,10 +304,7 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
         # --- Animations ---
         voice_text_02 = "现在来看第一种计算方式，我们先计算 7 乘以 5。在右边的三维空间里，我们构建一个 7 行 5 列的底层，由 35 个小方块组成，代表 7 乘以 5 等于 35。接着，我们将这个底层向上堆叠一层，代表乘以 2。这样，我们就得到了一个 7 乘 5 乘 2 的长方体，总共有 35 乘以 2，等于 70 个小方块。"
         with custom_voiceover_tts(voice_text_02) as tracker:
-            audio_duration = tracker.duration if tracker.audio_path else 0
-            if tracker.audio_path and audio_duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Scene 2 TTS failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_02, font_size=32, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5)
             self.add_fixed_in_frame_mobjects(subtitle_voice)
@@ -434,8 +354,8 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
             )
 
             total_anim_time = anim_intro_duration + anim_base_duration + anim_stack_duration
-            if audio_duration > 0:
-                remaining_time = audio_duration - total_anim_time - fade_out_duration
+            if tracker.duration > 0:
+                remaining_time = tracker.duration - total_anim_time - fade_out_duration
                 if remaining_time > 0: self.wait(remaining_time)
             else: self.wait(1.5)
 
@@ -525,10 +445,7 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
         # --- Animations ---
         voice_text_03 = "接下来，我们换一种方式，先计算括号里的 5 乘以 2。我们在 YZ 平面上构建一个 5 行 2 列的切片，由 10 个小方块组成，代表 5 乘以 2 等于 10。然后，我们将这个切片沿着 X 轴方向扩展 7 次，代表乘以 7。最终，我们同样得到了一个 7 乘 5 乘 2 的长方体，总共有 7 乘以 10，等于 70 个小方块。请注意，这个长方体和上一种方法得到的是完全一样的！"
         with custom_voiceover_tts(voice_text_03) as tracker:
-            audio_duration = tracker.duration if tracker.audio_path else 0
-            if tracker.audio_path and audio_duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Scene 3 TTS failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_03, font_size=32, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5)
             self.add_fixed_in_frame_mobjects(subtitle_voice)
@@ -582,8 +499,8 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
             )
 
             total_anim_time = anim_intro_duration + anim_slice_duration + anim_extend_duration
-            if audio_duration > 0:
-                remaining_time = audio_duration - total_anim_time - fade_out_duration
+            if tracker.duration > 0:
+                remaining_time = tracker.duration - total_anim_time - fade_out_duration
                 if remaining_time > 0: self.wait(remaining_time)
             else: self.wait(1.5)
 
@@ -673,10 +590,7 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
         # --- Animations ---
         voice_text_04 = "最后我们来对比一下。左边是先算 7 乘 5，右边是先算 5 乘 2。虽然计算过程不同，但我们最终都得到了中间这个完全相同的、由 70 个小方块组成的灰色长方体。这表明，(7 乘以 5) 再乘以 2，等于 7 乘以 (5 乘以 2)。两种不同的计算顺序，得到了完全相同的几何体和结果 70。这直观地证明了乘法结合律。"
         with custom_voiceover_tts(voice_text_04) as tracker:
-            audio_duration = tracker.duration if tracker.audio_path else 0
-            if tracker.audio_path and audio_duration > 0:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Scene 4 TTS failed or has zero duration.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_04, font_size=32, color=MY_BLACK, width=config.frame_width - 2, should_center=True)
             # Position subtitle above conclusion text
@@ -718,8 +632,8 @@ class CombinedScene(ThreeDScene): # Inherit from ThreeDScene for 3D capabilities
             # Calculate wait time based on audio, considering rotation is ongoing
             # Time spent on main animations (excluding rotation start delay)
             main_anim_time = anim_cube_fadein + anim_formulas_duration + anim_arrows_duration + anim_core_eq_duration + 0.5 + anim_conclusion_duration # Added 0.5 for Indicate
-            if audio_duration > 0:
-                remaining_time = audio_duration - main_anim_time - fade_out_duration
+            if tracker.duration > 0:
+                remaining_time = tracker.duration - main_anim_time - fade_out_duration
                 if remaining_time > 0:
                     self.wait(remaining_time)
             else:
@@ -746,6 +660,8 @@ if __name__ == "__main__":
     # Use placeholder for output path - IMPORTANT: Use raw string or double backslashes if needed on Windows
     config.media_dir = r"12" # Java will replace this placeholder
 
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print(f"Scene rendering finished. Output in: {config.media_dir}")
\ No newline at end of file
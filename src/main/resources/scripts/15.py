@@ -1,11 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-import hashlib
-from moviepy import AudioFileClip # Correct import
 
 # --- Custom Colors ---
 MY_LIGHT_GRAY = "#f0f0f0"
@@ -21,75 +16,11 @@ MY_CONCLUSION_BG = "#001f3f" # Dark blue for conclusion
 MY_CONCLUSION_FG = "#ffffff"
 MY_CONCLUSION_SUB = "#cccccc"
 
-# --- TTS Caching Setup ---
-CACHE_DIR = "#(output_path)/audio"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    """Tracks audio path and duration for TTS."""
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    """Generates a unique filename based on the text hash."""
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    """Fetches TTS audio, caches it, and provides path and duration."""
-    cache_file = get_cache_filename(text)
-    audio_file = cache_file
-
-    if os.path.exists(cache_file):
-        # print(f"Using cached TTS for: {text[:30]}...")
-        pass # Use cached file
-    else:
-        # print(f"Requesting TTS for: {text[:30]}...")
-        try:
-            input_text_encoded = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text_encoded}"
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk: f.write(chunk)
-            audio_file = cache_file
-            # print("TTS downloaded and cached.")
-        except requests.exceptions.RequestException as e:
-            print(f"TTS API request failed: {e}")
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return
-        except Exception as e:
-            print(f"An error occurred during TTS processing: {e}")
-            if os.path.exists(cache_file): os.remove(cache_file) # Clean up partial file
-            tracker = CustomVoiceoverTracker(None, 0)
-            yield tracker
-            return
-
-    # Get duration
-    duration = 0
-    if audio_file and os.path.exists(audio_file):
-        try:
-            with AudioFileClip(audio_file) as clip:
-                duration = clip.duration
-            # print(f"Audio duration: {duration:.2f}s")
-        except Exception as e:
-            print(f"Error processing audio file {audio_file}: {e}")
-            # If duration fails, treat as no audio
-            audio_file = None
-            duration = 0
-    else:
-        # print(f"TTS audio file not found or not created: {audio_file}")
-        audio_file = None # Ensure audio_path is None if file doesn't exist
-
-    tracker = CustomVoiceoverTracker(audio_file, duration)
-    try:
-        yield tracker
-    finally:
-        pass # Keep cache
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts, set_cache_dir
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
+set_cache_dir("#(output_path)/audio")
 
 # -----------------------------
 # CombinedScene: Unit Circle to Cosine Graph
@@ -244,10 +175,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS ---
         voice_text_01 = "Let's start with the unit circle. This is a circle centered at the origin with a radius of exactly one. We have our standard x and y axes. A point P moves along the circle. The line connecting the origin to P is the radius, which always has length 1. The angle between the positive x-axis and this radius is called theta."
         with custom_voiceover_tts(voice_text_01) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path)
-            else:
-                print("Warning: Scene 1 TTS failed.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_01, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=MED_SMALL_BUFF)
 
@@ -335,10 +263,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS ---
         voice_text_02 = "Now, let's focus on the coordinates of point P. If we drop a vertical line from P down to the x-axis, the x-coordinate of this intersection point is defined as the cosine of the angle theta, written as cos theta. The y-coordinate is the sine of theta. So, the coordinates of P are (cos theta, sin theta). Watch how the x-coordinate, cos theta, changes as the angle theta increases."
         with custom_voiceover_tts(voice_text_02) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path)
-            else:
-                print("Warning: Scene 2 TTS failed.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_02, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=MED_SMALL_BUFF)
 
@@ -451,10 +376,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS ---
         voice_text_03 = "Now, let's visualize how the cosine value relates to its graph. On the left, we have our unit circle. On the right, we'll plot the angle theta on the horizontal axis and the value of cos theta (the x-coordinate from the unit circle) on the vertical axis. As the angle theta increases from 0 to 2 pi on the unit circle, watch how the corresponding cos theta value traces out the familiar cosine wave on the graph."
         with custom_voiceover_tts(voice_text_03) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path)
-            else:
-                print("Warning: Scene 3 TTS failed.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_03, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=MED_SMALL_BUFF)
 
@@ -604,10 +526,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS ---
         voice_text_04 = "Let's examine some key features. When theta is 0, cos theta is 1, the maximum value. At pi/2, cos theta is 0. At pi, cos theta reaches its minimum, -1. At 3 pi/2, it's 0 again. And at 2 pi, it returns to 1, completing one cycle. These points correspond directly to the x-coordinates on the unit circle at those angles."
         with custom_voiceover_tts(voice_text_04) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path)
-            else:
-                print("Warning: Scene 4 TTS failed.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_04, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=MED_SMALL_BUFF)
 
@@ -684,10 +603,7 @@ class CombinedScene(MovingCameraScene):
         # --- TTS ---
         voice_text_05 = "So, remember: the cosine of an angle theta is simply the x-coordinate of the point where the terminal side of the angle intersects the unit circle. Understanding this connection is key to mastering trigonometry. Thank you for watching!"
         with custom_voiceover_tts(voice_text_05) as tracker:
-            if tracker.audio_path and tracker.duration > 0:
-                self.add_sound(tracker.audio_path)
-            else:
-                print("Warning: Scene 5 TTS failed.")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(voice_text_05, font_size=28, color=MY_CONCLUSION_SUB, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=MED_SMALL_BUFF)
 
@@ -721,6 +637,8 @@ if __name__ == "__main__":
     config.media_dir = r"#(output_path)" # Use raw string for placeholder
 
     # Create and render the scene
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
 
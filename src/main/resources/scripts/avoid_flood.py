@@ -1,11 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-from moviepy import AudioFileClip # Correct import for AudioFileClip
-import hashlib
 import manimpango # For font checking
 
 # --- 自定义颜色 ---
@@ -22,74 +17,10 @@ MY_RED = "#FF0000"         # 红色 (设计过程线)
 MY_ORANGE = "#FFA500"      # 橙色 (备选设计过程线颜色)
 MY_BLACK = "#000000"       # 黑色 (文本)
 
-# --- TTS 配置 ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
-    audio_file = None
-    duration = 0
-
-    try:
-        if os.path.exists(cache_file):
-            audio_file = cache_file
-        else:
-            input_text = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text}"
-
-            response = requests.get(url, stream=True)
-            if response.status_code != 200:
-                print(f"警告: TTS 接口错误: {response.status_code} - {response.text}")
-                # 提供一个虚拟的 tracker，避免程序崩溃
-                tracker = CustomVoiceoverTracker(None, 0)
-                yield tracker
-                return # 提前退出 context manager
-
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            audio_file = cache_file
-
-        # 确保文件写入完成且非空
-        if audio_file and os.path.getsize(audio_file) > 0:
-             # 使用 try-except 块处理可能的 MoviePy 错误
-            try:
-                # 使用 with 语句确保 AudioFileClip 正确关闭
-                with AudioFileClip(audio_file) as clip:
-                    duration = clip.duration
-            except Exception as e:
-                 print(f"警告: 无法读取音频文件 '{audio_file}' 获取时长: {e}")
-                 duration = 5 # 假设一个默认时长，让动画继续
-        else:
-            print(f"警告: TTS 未能生成有效的音频文件 '{cache_file}'")
-            duration = 5 # 假设一个默认时长
-
-        tracker = CustomVoiceoverTracker(audio_file, duration)
-        yield tracker
-
-    except requests.exceptions.RequestException as e:
-        print(f"警告: TTS 请求失败: {e}")
-        tracker = CustomVoiceoverTracker(None, 0) # 提供虚拟 tracker
-        yield tracker
-    except Exception as e:
-        print(f"警告: 处理 TTS 时发生未知错误: {e}")
-        tracker = CustomVoiceoverTracker(None, 0) # 提供虚拟 tracker
-        yield tracker
-    finally:
-        # 通常不在此处清理缓存，以便重用
-        pass
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 
 # --- 字体检查 ---
@@ -226,10 +157,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_scene_00 = "大家好！本次视频将为您详解设计洪水的推求方法，重点介绍典型洪水过程线的选择条件以及详细的计算步骤。让我们开始吧！🌊"
 
         with custom_voiceover_tts(voice_text_scene_00) as tracker:
-            if tracker.audio_path:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("警告 [场景00]: 未能加载音频，动画将按预设时间进行。")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_00, font_size=28, color=MY_WHITE,
@@ -407,10 +335,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_scene_01 = "那么，选择典型洪水过程线需要满足哪些条件呢？主要有四点：一、峰高量大，代表洪水强度和总体积都比较显著；二、具有代表性，能反映流域洪水的一般特性；三、峰形集中，洪水涨落迅速；四、洪峰偏后，峰顶出现在洪水过程的后半段。🧐"
 
         with custom_voiceover_tts(voice_text_scene_01) as tracker:
-            if tracker.audio_path:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("警告 [场景01]: 未能加载音频，动画将按预设时间进行。")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_01, font_size=28, color=MY_WHITE,
@@ -526,10 +451,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_scene_02 = "接下来，我们梳理一下由流量资料推求设计洪水的完整计算步骤。主要包括：一、按年最大值法选样；二、进行资料的三性审查；三、处理特大洪水频率；四、计算洪峰和洪量的频率；五、分析计算安全修正值；六、查算得到设计洪峰和洪量；七、对频率计算成果进行合理性检验；八、选择典型的洪水过程线；最后，九、通过同倍比或同频率缩放，得到最终的设计洪水过程线。🔢"
 
         with custom_voiceover_tts(voice_text_scene_02) as tracker:
-            if tracker.audio_path:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("警告 [场景02]: 未能加载音频，动画将按预设时间进行。")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_02, font_size=28, color=MY_WHITE,
@@ -680,10 +602,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_scene_03 = "我们来可视化关键的两个环节。左侧是频率计算，通过频率曲线（如P-III型线）确定特定频率（如1%）对应的设计洪峰Qp和设计洪量W。右侧是选择典型洪水过程线，并根据计算出的设计洪峰Qp值，对其进行同倍比缩放，最终得到红色的设计洪水过程线。📈➡️📉"
 
         with custom_voiceover_tts(voice_text_scene_03) as tracker:
-            if tracker.audio_path:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("警告 [场景03]: 未能加载音频，动画将按预设时间进行。")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_03, font_size=28, color=MY_WHITE,
@@ -801,10 +720,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_scene_04 = "最后，我们来总结一下。选择典型洪水过程线要关注峰高量大、代表性、峰形集中和洪峰偏后这四个关键条件。而设计洪水的计算则遵循数据准备、频率分析、典型选择和过程线缩放的基本流程。希望本次讲解对您有所帮助，感谢观看！"
 
         with custom_voiceover_tts(voice_text_scene_04) as tracker:
-            if tracker.audio_path:
-                self.add_sound(tracker.audio_path, time_offset=0)
-            else:
-                print("警告 [场景04]: 未能加载音频，动画将按预设时间进行。")
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_04, font_size=28, color=MY_WHITE,
@@ -855,6 +771,8 @@ if __name__ == "__main__":
 
     # 临时设置输出目录,必须使用#(output_video)
     config.media_dir = "avoid_flood" # java程序会对#(output_video)进行替换
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print(f"Scene rendering finished. Output file: {config.output_file}.mp4 in {config.media_dir}")
\ No newline at end of file
@@ -1,14 +1,9 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
 # Note: Importing DARK_GRAY directly is often preferred if only a few specific colors are needed
 # from manim.utils.color.XKCD import DARK_GRAY
 # Or rely on the standard colors like DARK_GRAY if available in the version
-from moviepy import AudioFileClip # Correct import for AudioFileClip
-import hashlib
 import manimpango # For font checking
 
 # --- Font Checking ---
@@ -52,96 +47,9 @@ if "DARK_GRAY" not in globals():
     DARK_GRAY = "#A9A9A9" # Standard dark gray hex
 
 # --- TTS Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    # Use a subdirectory for cache files to keep the main directory clean
-    cache_subdir = os.path.join(CACHE_DIR, "audio_files")
-    os.makedirs(cache_subdir, exist_ok=True)
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(cache_subdir, f"{text_hash}.mp3")
-
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-        print(f"Using cached TTS audio: {cache_file}") # Debugging
-    else:
-        input_text = requests.utils.quote(text)
-        url = f"{base_url}?token={token}&input={input_text}"
-        print(f"Requesting TTS from: {url}") # Debugging
-        try:
-            response = requests.get(url, stream=True, timeout=60) # Added timeout
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        except requests.exceptions.RequestException as e:
-             # Provide more context in the error message
-             raise Exception(f"TTS API request failed for URL {url}. Error: {e}")
-
-        # Check content type before writing
-        content_type = response.headers.get('Content-Type', '').lower()
-        print(f"Response Content-Type: {content_type}") # Debugging
-        if 'audio' not in content_type:
-            # Try to read some text to see the error message from the API
-            error_text = response.text[:500] # Read first 500 chars
-            raise Exception(f"TTS API did not return audio. Status: {response.status_code}. URL: {url}. Response text: {error_text}")
-
-        try:
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            print(f"TTS audio saved to: {cache_file}") # Debugging
-        except Exception as e:
-            # Clean up potentially corrupted cache file
-            if os.path.exists(cache_file):
-                try:
-                    os.remove(cache_file)
-                    print(f"Removed potentially corrupted cache file: {cache_file}")
-                except OSError as oe:
-                    print(f"Error removing corrupted cache file {cache_file}: {oe}")
-            raise Exception(f"Failed to write TTS audio to file {cache_file}: {e}")
-
-        audio_file = cache_file
-
-    # Verify the audio file is valid before getting duration
-    try:
-        # Ensure the file has non-zero size before trying to open
-        if os.path.getsize(audio_file) == 0:
-            raise ValueError("Audio file is empty.")
-        clip = AudioFileClip(audio_file)
-        duration = clip.duration
-        clip.close() # Close the clip to release the file handle
-        if duration is None or duration <= 0:
-             raise ValueError(f"Audio clip has invalid duration: {duration}")
-        print(f"Audio duration: {duration} seconds") # Debugging
-    except Exception as e:
-        # If duration check fails, delete the invalid cache file
-        print(f"Error processing audio file {audio_file}: {e}. Deleting cache file.")
-        if os.path.exists(cache_file):
-            try:
-                os.remove(cache_file)
-            except OSError as oe:
-                print(f"Error removing invalid cache file {cache_file}: {oe}")
-        # Re-raise the exception to stop the process
-        raise Exception(f"Failed to process audio file {audio_file}: {e}. Cache file removed.")
-
-
-    tracker = CustomVoiceoverTracker(audio_file, duration)
-    try:
-        yield tracker
-    finally:
-        # pass # Keep cache for reuse
-        # Explicitly close if needed, though context manager should handle MoviePy clip closure
-        pass
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 
 # -----------------------------
@@ -236,7 +144,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_00 = "大家好！本视频将为您详解设计洪水的推求方法，重点介绍典型洪水过程线的选择条件与详细计算步骤。"
 
         with custom_voiceover_tts(voice_text_00) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_00, font_size=28, color=MY_WHITE,
@@ -368,7 +276,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_01 = "那么，选择典型洪水过程线需要满足哪些条件呢？主要有四点：一，峰高量大，代表洪水强度和总体积都比较显著。二，具有代表性，能反映该流域洪水的一般特性。三，峰形集中，洪水涨落迅速。四，洪峰偏后，峰现时间相对整个过程靠后一些。"
 
         with custom_voiceover_tts(voice_text_01) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_01, font_size=28, color=MY_DARK_GRAY,
@@ -499,7 +407,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_02 = "接下来，我们概述一下由流量资料推求设计洪水的计算步骤。这通常包括：一，按年最大值法选样；二，审查资料的可靠性、一致性和代表性；三，处理特大洪水的频率；四，进行洪峰和洪量的频率计算；五，分析计算安全修正值；六，查算得到设计洪峰和设计洪量；七，检验频率计算成果的合理性；八，选择典型的洪水过程线；最后一步，九，通过同倍比或同频率缩放，得到最终的设计洪水过程线。"
 
         with custom_voiceover_tts(voice_text_02) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_02, font_size=28, color=MY_DARK_GRAY,
@@ -699,7 +607,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_03 = "我们来可视化关键的两个步骤。首先，通过频率分析（如P-III型曲线），根据设计频率（例如P等于0.1），确定对应的设计洪峰流量Qp和设计洪量W。然后，选择一条具有代表性的典型洪水过程线。最后，采用同倍比放大法，将典型过程线的洪峰值放大到我们计算得到的设计洪峰Qp，从而得到最终的设计洪水过程线。"
 
         with custom_voiceover_tts(voice_text_03) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_03, font_size=28, color=MY_DARK_GRAY,
@@ -825,7 +733,7 @@ class CombinedScene(MovingCameraScene):
         voice_text_04 = "总结一下，选择典型洪水过程线需关注峰高量大、代表性、峰形集中和洪峰偏后四个条件。设计洪水的计算流程则主要包括数据准备、频率分析、典型选择和过程线缩放这几个关键环节。感谢您的观看！"
 
         with custom_voiceover_tts(voice_text_04) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_04, font_size=28, color=MY_WHITE,
@@ -908,6 +816,8 @@ if __name__ == "__main__":
     else:
          print(f"Using Manim default font.")
 
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print("Scene rendering finished.")
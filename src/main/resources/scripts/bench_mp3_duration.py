@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks MP3 duration lookup over a directory of cached TTS clips.
+
+    python bench_mp3_duration.py [cache_dir] [--count 300]
+
+Compares the old MoviePy ``AudioFileClip`` path with the header probe
+(cold, no sidecar) and with a warm sidecar read. The clips of ``cache_dir``
+are copied into a temp directory first, so the cache and its ``.dur``
+sidecars are never touched; if it holds fewer than ``--count`` clips, silent
+MP3 clips are generated there instead.
+"""
+import argparse
+import glob
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import mp3_duration
+import tts_offline
+
+
+def write_silent_clip(path, seconds):
+    # 不带 Info 头，测的是最慢的逐帧扫描路径
+    with open(path, "wb") as f:
+        f.write(tts_offline.silent_mp3(seconds, info_header=False))
+
+
+def prepare_clips(cache_dir, count, tmp_dir):
+    """Fills ``tmp_dir`` with ``count`` clips copied from ``cache_dir`` (or generated); returns them and their origin."""
+    sources = sorted(glob.glob(os.path.join(cache_dir, "**", "*.mp3"), recursive=True)) if cache_dir else []
+    clips = []
+    if len(sources) >= count:
+        # 在副本上测试：基准会删除并重写 .dur 伴随文件，不能动真实的缓存
+        for i, src in enumerate(sources[:count]):
+            path = os.path.join(tmp_dir, f"{i:05d}.mp3")
+            shutil.copyfile(src, path)
+            clips.append(path)
+        return clips, cache_dir
+    rng = random.Random(0)
+    for i in range(count):
+        path = os.path.join(tmp_dir, f"{i:05d}.mp3")
+        write_silent_clip(path, rng.uniform(3.0, 40.0))
+        clips.append(path)
+    return clips, "generated silence"
+
+
+def time_it(label, clips, fn):
+    start = time.perf_counter()
+    total = 0.0
+    for path in clips:
+        total += fn(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.3f}s total  {elapsed / len(clips) * 1000:8.3f} ms/clip  (sum {total:.1f}s audio)")
+    return elapsed
+
+
+def moviepy_duration(path):
+    from moviepy import AudioFileClip
+    with AudioFileClip(path) as clip:
+        return clip.duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cache_dir", nargs="?", default="tts_cache")
+    parser.add_argument("--count", type=int, default=300)
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir if os.path.isdir(args.cache_dir) else None
+    with tempfile.TemporaryDirectory(prefix="bench_mp3_") as tmp_dir:
+        clips, source = prepare_clips(cache_dir, args.count, tmp_dir)
+        print(f"{len(clips)} clips from {source} in {tmp_dir}")
+        try:
+            import moviepy  # noqa: F401
+            time_it("moviepy AudioFileClip", clips, moviepy_duration)
+        except ImportError:
+            print("moviepy not installed, skipping AudioFileClip baseline")
+        time_it("header probe (cold)", clips, mp3_duration.probe_mp3_duration)
+        time_it("get_duration (writes)", clips, mp3_duration.get_duration)
+        time_it("get_duration (sidecar)", clips, mp3_duration.get_duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-from moviepy import AudioFileClip # Correct import for AudioFileClip
-import hashlib
 import manimpango # For font checking
 
 # --- Custom Colors ---
@@ -48,73 +44,9 @@ else:
         # final_font 保持为 None
 
 # --- TTS Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
-    audio_file = cache_file # Assume cache hit initially
-
-    if not os.path.exists(cache_file):
-        print(f"缓存未命中，正在请求 TTS：{text[:30]}...")
-        try:
-            input_text = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text}"
-
-            response = requests.get(url, stream=True, timeout=60) # Added timeout
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            print("TTS 请求成功，已缓存。")
-
-        except requests.exceptions.RequestException as e:
-            print(f"TTS 请求失败: {e}")
-            # Fallback: Use a silent audio file of estimated duration? Or raise error?
-            # For now, let's raise an error to make the issue clear.
-            raise Exception(f"无法生成或获取 TTS 音频: {e}")
-        except Exception as e:
-            print(f"处理 TTS 响应时出错: {e}")
-            raise
-
-    # Verify the audio file exists after attempt
-    if not os.path.exists(audio_file):
-         raise FileNotFoundError(f"TTS 音频文件未找到或创建失败: {audio_file}")
-
-    # Get duration
-    try:
-        clip = AudioFileClip(audio_file)
-        duration = clip.duration
-        clip.close()
-        if duration is None or duration <= 0:
-             print(f"警告: 获取到的音频时长无效 ({duration})，文件: {audio_file}。将使用估算时长。")
-             # Estimate duration based on text length (e.g., 5 chars per second)
-             estimated_duration = len(text) / 5.0
-             duration = max(estimated_duration, 1.0) # Ensure at least 1 second
-    except Exception as e:
-        print(f"使用 moviepy 读取音频时长时出错: {e}，文件: {audio_file}。将使用估算时长。")
-        estimated_duration = len(text) / 5.0
-        duration = max(estimated_duration, 1.0) # Ensure at least 1 second
-
-    tracker = CustomVoiceoverTracker(audio_file, duration)
-    try:
-        yield tracker
-    finally:
-        # pass # Keep cache
-        # Clean up? Optional: os.remove(audio_file) if not needed after run
-        pass
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 
 # -----------------------------
@@ -251,7 +183,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover & Animation ---
         voice_text_scene_01 = "大家好！欢迎来到本期视频。今天我们一起探索二次函数 f(x) = ax^2 + bx + c 的奥秘，看看它的系数 a, b, c 是如何塑造抛物线的形状和位置的。"
         with custom_voiceover_tts(voice_text_scene_01) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_01, font_size=28, color=MY_WHITE,
@@ -362,7 +294,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover & Animation ---
         voice_text_scene_02 = "首先，我们建立一个二维坐标系。然后，画出最基础的二次函数图像，f(x) = x^2。在这个基准函数中，系数 a 等于 1，b 等于 0，c 等于 0。"
         with custom_voiceover_tts(voice_text_scene_02) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text_scene_02, font_size=28, color=MY_BLACK, # Black text on light bg
@@ -469,7 +401,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover & Animation ---
         voice_text_scene_03_part1 = "现在，我们来看看系数 'a' 的影响。保持 b 和 c 为 0。当 a 大于 1 时，比如从 1 增加到 3，抛物线开口向上，并且开口变得越来越窄。"
         with custom_voiceover_tts(voice_text_scene_03_part1) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_03_part1, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -499,7 +431,7 @@ class CombinedScene(MovingCameraScene):
 
         voice_text_scene_03_part2 = "如果 a 在 0 和 1 之间，比如从 3 减小到 0.2，抛物线开口仍然向上，但 a 越小，开口变得越宽。"
         with custom_voiceover_tts(voice_text_scene_03_part2) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_03_part2, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -528,7 +460,7 @@ class CombinedScene(MovingCameraScene):
 
         voice_text_scene_03_part3 = "当 a 小于 0 时，比如变为 -1，再变为 -2，抛物线的开口就反转向下了。a 的绝对值大小同样决定开口的宽窄。"
         with custom_voiceover_tts(voice_text_scene_03_part3) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_03_part3, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -647,7 +579,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover & Animation ---
         voice_text_scene_04_part1 = "接下来看系数 'c'。我们将 a 设回 1，b 保持 0。'c' 控制抛物线的垂直位置。当 c 大于 0，比如从 0 增加到 5，图像整体向上平移 c 个单位。注意看 y 轴上的截点 (0, c) 也跟着移动。"
         with custom_voiceover_tts(voice_text_scene_04_part1) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_04_part1, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -683,7 +615,7 @@ class CombinedScene(MovingCameraScene):
 
         voice_text_scene_04_part2 = "当 c 小于 0 时，比如从 5 减小到 -3，图像则向下平移 c 的绝对值个单位。y 轴截距同样是 (0, c)。"
         with custom_voiceover_tts(voice_text_scene_04_part2) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_04_part2, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -807,7 +739,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover & Animation ---
         voice_text_scene_05_part1 = "最后来看系数 'b'。我们设置 a=1, c=2。'b' 会影响抛物线的水平位置和顶点。先看对称轴公式 x = -b / 2a。初始 b=0，对称轴是 y 轴。"
         with custom_voiceover_tts(voice_text_scene_05_part1) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_05_part1, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -833,7 +765,7 @@ class CombinedScene(MovingCameraScene):
 
         voice_text_scene_05_part2 = "当 a>0 且 b>0 时，比如 b 从 0 增加到 4，对称轴 x = -b/2a 向左移动，顶点也随之向左移动。"
         with custom_voiceover_tts(voice_text_scene_05_part2) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_05_part2, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -868,7 +800,7 @@ class CombinedScene(MovingCameraScene):
 
         voice_text_scene_05_part3 = "当 a>0 且 b<0 时，比如 b 从 4 减小到 -4，对称轴移动到 y 轴右侧，顶点也向右移动。"
         with custom_voiceover_tts(voice_text_scene_05_part3) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_05_part3, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_LIGHT_GRAY, fill_opacity=0.8, stroke_width=1, stroke_color=MY_DARK_GRAY).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -951,7 +883,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover & Animation ---
         voice_text_scene_06 = "好了，让我们来总结一下：系数 a 决定抛物线的开口方向和胖瘦；系数 c 决定图像的垂直位置，也就是它与 y 轴的交点；而系数 b 则与 a 一起，共同决定了对称轴和顶点的位置，从而影响图像的水平位置。希望这个视频能帮助你更好地理解二次函数！"
         with custom_voiceover_tts(voice_text_scene_06) as tracker:
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_scene_06, font_size=28, color=MY_WHITE, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.5).set_z_index(50)
             subtitle_bg = Rectangle(width=subtitle_voice.width + 0.4, height=subtitle_voice.height + 0.4, fill_color=MY_BLACK, fill_opacity=0.6, stroke_width=0).move_to(subtitle_voice.get_center()).set_z_index(subtitle_voice.z_index - 1)
             subtitle_group = VGroup(subtitle_bg, subtitle_voice)
@@ -1015,6 +947,8 @@ if __name__ == "__main__":
     # Set background color for the whole rendering process (optional, can be overridden by scenes)
     # config.background_color = MY_BLACK
 
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print("Scene rendering finished.")
@@ -1,54 +1,643 @@
 # -*- coding: utf-8 -*-
+"""
+Shared TTS client for the generated Manim scripts.
+
+Usage:
+    from custom_voiceover import custom_voiceover_tts
+    with custom_voiceover_tts("text") as tracker:
+        tracker.add_sound(self)
+        self.play(..., run_time=tracker.duration)
+
+Lines started early with ``request_voiceover(text)`` (``tts_prefetch`` does
+this for every literal narration line) download in the background while the
+scene builds its mobjects; their trackers block only when ``audio_path`` or
+``duration`` is first read. ``tracker.add_sound(self)`` reads neither while
+the line is still downloading: it notes the scene time and adds the sound
+once the tracker resolves, at the latest when the ``with`` block ends.
+
+All narration requests go through one pooled keep-alive ``requests.Session``,
+so a video with many narration lines pays the TCP/TLS handshake once.
+"""
 import os
-import numpy as np
-import requests
-from contextlib import contextmanager
-from manim import *
-from moviepy import AudioFileClip
+import atexit
 import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-CACHE_DIR = "tts_cache"
+import mp3_duration
+import pcm_sidecar
+import tts_cache_backends
+import tts_cache_index
+import tts_chunking
+import tts_offline
+from file_lock import file_lock
+
+# 渲染环境共用的缓存目录（tts_warmup.py 预热的目录）。设置后脚本里按任务调用的
+# set_cache_dir(r"#(output_path)/audio") 不再改变缓存位置，所有任务命中同一份片段和伴随文件
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR") or None
+CACHE_DIR = TTS_CACHE_DIR or "tts_cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# 缓存大小上限（字节），超出后按最近访问时间淘汰；0 表示不限制
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# 本地缓存之后依次查找的共享层（共享目录 / HTTP blob 存储），见 tts_cache_backends
+CACHE_BACKENDS = tts_cache_backends.parse_backends(
+    os.environ.get("TTS_CACHE_BACKENDS", ""), token=os.environ.get("TTS_BLOB_TOKEN") or None)
+
+TTS_TOKEN = os.environ.get("TTS_TOKEN", "123456")
+TTS_BASE_URL = os.environ.get("TTS_BASE_URL", "https://uni-ai.fly.dev/api/manim/tts")
+# TTS_OFFLINE=1 时不发 HTTP 请求，用 tts_offline 生成确定性的静音音频（基准测试/隔离节点）
+TTS_OFFLINE = os.environ.get("TTS_OFFLINE", "") in ("1", "true", "yes")
+TTS_FORMAT = "mp3"
+# TTS_PCM_SIDECAR=1 时为每个片段预解码一份 WAV，add_sound 直接读取，不再每次渲染解码 MP3
+TTS_PCM_SIDECAR = os.environ.get("TTS_PCM_SIDECAR", "") in ("1", "true", "yes")
+TTS_PCM_SAMPLE_RATE = int(os.environ.get("TTS_PCM_SAMPLE_RATE", pcm_sidecar.DEFAULT_SAMPLE_RATE))
+
+# 默认声音，由渲染环境通过环境变量或 set_voice() 设置
+TTS_VOICE_PROVIDER = os.environ.get("TTS_VOICE_PROVIDER") or None
+TTS_VOICE_ID = os.environ.get("TTS_VOICE_ID") or None
+
+# (connect, read) 超时，单位秒
+TTS_TIMEOUT = (5, 60)
+TTS_MAX_RETRIES = 3
+TTS_BACKOFF_FACTOR = 0.5
+TTS_POOL_SIZE = 16
+# 等待其他进程下载同一片段的最长时间，单位秒
+TTS_LOCK_TIMEOUT = 300
+# 后台解析旁白（下载 + 时长）的线程数
+TTS_BACKGROUND_WORKERS = 8
+# 超过这个字数的旁白按标点拆成多段并行请求，每段单独缓存后拼接；0（默认）表示不拆分。
+# 拼接的音频和整句请求的不同，开启后新旁白的声音会变，已经缓存的整句不受影响
+TTS_CHUNK_CHARS = int(os.environ.get("TTS_CHUNK_CHARS", 0))
+TTS_CHUNK_WORKERS = 4
+
+_session = None
+_session_lock = threading.Lock()
+# 每次请求 TTS 服务前调用（包括拆分出的分段），tts_warmup 用它限速；None 表示不限制
+_request_limiter = None
+
+_executor = None
+# (缓存目录, TtsRequest.key) -> Future[CustomVoiceoverTracker]，本进程正在解析的旁白；完成后移除
+_pending = {}
+_pending_lock = threading.Lock()
+
 
 class CustomVoiceoverTracker:
+    """Tracks audio path and duration for TTS."""
+
     def __init__(self, audio_path, duration):
         self.audio_path = audio_path
         self.duration = duration
 
+    def add_sound(self, scene, time_offset=0, gain=None):
+        """Adds the clip to ``scene`` at ``scene.time + time_offset``; skipped with a warning if TTS failed."""
+        if self.audio_path and self.duration > 0:
+            scene.add_sound(self.audio_path, time_offset=time_offset, gain=gain)
+        else:
+            print("Warning: TTS audio failed or has zero duration, no sound added.")
 
-def get_cache_filename(text):
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
+    def flush_sounds(self):
+        pass
 
 
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
+class LazyVoiceoverTracker:
+    """
+    Tracker resolved by a background thread. Reading ``audio_path`` or
+    ``duration`` blocks until the clip is downloaded and probed.
+    """
 
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-    else:
-        input_text = requests.utils.quote(text)
-        url = f"{base_url}?token={token}&input={input_text}"
+    def __init__(self, future):
+        self._future = future
+        # (scene, 场景时间, gain)：下载完成前登记的 add_sound
+        self._sounds = []
+
+    def done(self):
+        return self._future.done()
+
+    def result(self):
+        return self._future.result()
+
+    @property
+    def audio_path(self):
+        tracker = self.result()
+        self.flush_sounds()
+        return tracker.audio_path
+
+    @property
+    def duration(self):
+        tracker = self.result()
+        self.flush_sounds()
+        return tracker.duration
+
+    def add_sound(self, scene, time_offset=0, gain=None):
+        """
+        Adds the clip to ``scene`` at ``scene.time + time_offset``. While the
+        clip is still downloading only the time is noted, so the scene keeps
+        building its mobjects; the sound is added once the tracker resolves.
+        """
+        if self.done():
+            self.flush_sounds()
+            self.result().add_sound(scene, time_offset, gain)
+        elif not scene.renderer.skip_animations:
+            self._sounds.append((scene, scene.time + time_offset, gain))
+
+    def flush_sounds(self):
+        """Waits for the clip and adds the sounds noted by add_sound()."""
+        sounds, self._sounds = self._sounds, []
+        for scene, time, gain in sounds:
+            # Scene.add_sound 按绝对时间叠加音轨，补加到已经播放过的时间点也能对齐
+            self.result().add_sound(scene, time - scene.time, gain)
+
+
+def set_cache_dir(path, force=False):
+    """
+    Points the TTS cache at ``path``, e.g. r"#(output_path)/audio". Ignored
+    when the environment pins a shared cache with TTS_CACHE_DIR, unless
+    ``force`` is set.
+    """
+    global CACHE_DIR
+    if TTS_CACHE_DIR and not force:
+        return
+    CACHE_DIR = path
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+
+def set_cache_backends(backends, token=None):
+    """
+    Sets the shared cache layers, nearest first: a spec string such as
+    "dir:/mnt/tts,http://host:8766/blobs" or a list of backend objects.
+    """
+    global CACHE_BACKENDS
+    if isinstance(backends, str):
+        backends = tts_cache_backends.parse_backends(backends, token=token)
+    CACHE_BACKENDS = list(backends)
 
-        response = requests.get(url, stream=True)
-        if response.status_code != 200:
-            raise Exception(f"TTS 接口错误: {response.status_code} - {response.text}")
 
-        with open(cache_file, "wb") as f:
+def set_request_limiter(wait):
+    """
+    Calls ``wait()`` before every request to the TTS service, chunk requests
+    included, e.g. a rate limiter's ``wait``; None removes it. Returns the
+    previous one.
+    """
+    global _request_limiter
+    previous, _request_limiter = _request_limiter, wait
+    return previous
+
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=TTS_MAX_RETRIES,
+                    connect=TTS_MAX_RETRIES,
+                    read=TTS_MAX_RETRIES,
+                    backoff_factor=TTS_BACKOFF_FACTOR,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(["GET"]),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=TTS_POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    """Closes the pooled session; the next request opens a new one."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+class TtsRequest:
+    """One narration line together with the voice and endpoint that speak it."""
+
+    def __init__(self, text, token=None, base_url=None, voice_provider=None, voice_id=None, audio_format=None):
+        self.text = text
+        self.token = token or TTS_TOKEN
+        self.base_url = base_url or TTS_BASE_URL
+        self.voice_provider = voice_provider or TTS_VOICE_PROVIDER
+        self.voice_id = voice_id or TTS_VOICE_ID
+        self.audio_format = audio_format or TTS_FORMAT
+
+    @property
+    def voice(self):
+        if not self.voice_provider and not self.voice_id:
+            return None
+        return f"{self.voice_provider or ''}/{self.voice_id or ''}"
+
+    @property
+    def key(self):
+        # 同一句话换了声音、服务或格式就是不同的音频
+        parts = (self.audio_format, self.base_url_key, self.voice_provider or "", self.voice_id or "", self.text)
+        return hashlib.md5("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+    @property
+    def url(self):
+        # 服务只接受 token 和 input；声音由服务端的部署决定，只用于区分缓存 key
+        return f"{self.base_url}?token={self.token}&input={requests.utils.quote(self.text)}"
+
+    @property
+    def base_url_key(self):
+        return "offline" if TTS_OFFLINE else self.base_url
+
+
+def set_voice(voice_provider=None, voice_id=None):
+    """Sets the default voice for narration requests of this process."""
+    global TTS_VOICE_PROVIDER, TTS_VOICE_ID
+    TTS_VOICE_PROVIDER = voice_provider
+    TTS_VOICE_ID = voice_id
+
+
+def get_cache_key(text, **voice):
+    """Returns the cache key of a narration line for the given voice."""
+    return TtsRequest(text, **voice).key
+
+
+def cache_path_for_key(key, audio_format=None):
+    """Returns ``CACHE_DIR/ab/cd/<key>.<format>``; two hash-prefix levels keep directories small."""
+    return os.path.join(CACHE_DIR, key[:2], key[2:4], f"{key}.{audio_format or TTS_FORMAT}")
+
+
+def get_cache_filename(text, **voice):
+    """Generates a unique filename based on the text and voice hash."""
+    req = TtsRequest(text, **voice)
+    return cache_path_for_key(req.key, req.audio_format)
+
+
+def _lock_path(key):
+    # 按 key 前缀分成 4096 把锁，锁文件数量固定，不随缓存增长
+    return os.path.join(CACHE_DIR, ".locks", f"{key[:3]}.lock")
+
+
+def _update_index(method, *args):
+    """Calls ``method`` on the cache index; index errors never fail a render."""
+    try:
+        return getattr(tts_cache_index.get_index(CACHE_DIR), method)(*args)
+    except sqlite3.Error as e:
+        print(f"TTS cache index error: {e}")
+        return None
+
+
+def download_tts(req, cache_file):
+    """
+    Downloads the narration of TtsRequest ``req`` into ``cache_file``.
+    The body goes to a temp file that is renamed into place, so readers never
+    see a partially written clip.
+    """
+    if TTS_OFFLINE:
+        return _write_offline_tts(req, cache_file)
+    if _request_limiter:
+        _request_limiter()
+    response = get_session().get(req.url, stream=True, timeout=TTS_TIMEOUT)
+    _remove_sidecars(cache_file)
+    tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").lower()
+        if content_type and "audio" not in content_type and "octet-stream" not in content_type:
+            raise requests.exceptions.RequestException(
+                f"TTS API did not return audio. Content-Type: {content_type}. Response text: {response.text[:500]}")
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, "wb") as f:
             for chunk in response.iter_content(chunk_size=8192):
                 if chunk:
                     f.write(chunk)
+        os.replace(tmp_file, cache_file)
+    finally:
+        response.close()
+        # 不保留写了一半的文件
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return cache_file
+
 
-        audio_file = cache_file
+def _write_offline_tts(req, cache_file):
+    _remove_sidecars(cache_file)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp_file, "wb") as f:
+        f.write(tts_offline.synthesize(req.text))
+    os.replace(tmp_file, cache_file)
+    return cache_file
 
-    clip = AudioFileClip(audio_file)
-    duration = clip.duration
-    clip.close()
 
-    tracker = CustomVoiceoverTracker(audio_file, duration)
+def _remove_sidecars(audio_file):
+    mp3_duration.remove_duration_sidecar(audio_file)
+    pcm_sidecar.remove_pcm_sidecar(audio_file)
+
+
+def ensure_pcm_sidecar(key, audio_file):
+    """
+    Decodes the WAV sidecar of a cached clip if TTS_PCM_SIDECAR is on and it
+    is missing. Failures are logged and leave the MP3 as the sound file.
+    """
+    if not TTS_PCM_SIDECAR or pcm_sidecar.has_pcm_sidecar(audio_file, TTS_PCM_SAMPLE_RATE):
+        return
+    try:
+        wav_file = pcm_sidecar.write_pcm_sidecar(audio_file, TTS_PCM_SAMPLE_RATE)
+    except (OSError, ValueError) as e:
+        print(f"Failed to decode PCM sidecar for {audio_file}: {e}")
+        return
+    # WAV 比 MP3 大得多，计入缓存预算
+    _update_index("add_bytes", key, os.path.getsize(wav_file))
+
+
+def get_sound_file(audio_file):
+    """Returns the file to pass to add_sound: the WAV sidecar when enabled and present, else the clip."""
+    if TTS_PCM_SIDECAR and pcm_sidecar.has_pcm_sidecar(audio_file, TTS_PCM_SAMPLE_RATE):
+        return pcm_sidecar.sidecar_path(audio_file)
+    return audio_file
+
+
+def get_audio_duration(audio_file):
+    """
+    Returns the duration of ``audio_file`` in seconds.
+    MP3 headers are parsed in-process and the result is kept in a sidecar
+    next to the clip; MoviePy is only used for files that are not MP3.
+    """
+    try:
+        return mp3_duration.get_duration(audio_file)
+    except ValueError:
+        from moviepy import AudioFileClip
+        with AudioFileClip(audio_file) as clip:
+            return clip.duration
+
+
+def fetch_tts(text, **voice):
+    """
+    Returns the cached audio file for ``text``, downloading it on a miss.
+    ``voice`` takes the TtsRequest keyword arguments. Raises on request or IO errors.
+    """
+    return fetch_tts_with_source(text, **voice)[0]
+
+
+def fetch_tts_with_source(text, **voice):
+    """
+    Like fetch_tts(), but returns ``(audio_file, source)``: "cache" for the
+    local cache, "shared" for a shared layer, "service" for a new request.
+    """
+    req = TtsRequest(text, **voice)
+    key = req.key
+    cache_file = cache_path_for_key(key, req.audio_format)
+    # 先 pin 再检查文件：本次渲染用到的片段不会被其他进程淘汰
+    _update_index("pin", key)
+    if os.path.exists(cache_file):
+        print(f"Using cached TTS for: {text[:30]}...")
+        _update_index("touch", key)
+        ensure_pcm_sidecar(key, cache_file)
+        return cache_file, "cache"
+    # single-flight：同一片段只有一个进程/线程下载，其余等待后直接命中
+    with file_lock(_lock_path(key), timeout=TTS_LOCK_TIMEOUT):
+        # 整句在本地和共享层都没有时才拆分，已经缓存的整句不会变成拼接的版本
+        source = _reuse_clip(key, req, cache_file)
+        chunks = [] if source else _split(req)
+        if len(chunks) == 1:
+            source = _request_clip(key, req, cache_file)
+    if len(chunks) > 1:
+        # 分段在整句的锁之外下载，每段各自 single-flight，不会出现嵌套加锁
+        chunk_files = _fetch_chunks(chunks, voice)
+        with file_lock(_lock_path(key), timeout=TTS_LOCK_TIMEOUT):
+            source = _reuse_clip(key, req, cache_file) or _request_clip(key, req, cache_file, chunk_files)
+    evict_cache()
+    return cache_file, source
+
+
+def _split(req):
+    if not TTS_CHUNK_CHARS or req.audio_format != "mp3":
+        return [req.text]
+    return tts_chunking.split_narration(req.text, TTS_CHUNK_CHARS)
+
+
+def _reuse_clip(key, req, cache_file):
+    """
+    Under the clip's lock: uses the clip another worker or a shared layer
+    already has and returns its source; None on a miss.
+    """
+    if os.path.exists(cache_file):
+        print(f"Using TTS fetched by another worker for: {req.text[:30]}...")
+        _update_index("touch", key)
+        source = "cache"
+    elif _fetch_from_backends(key, req.audio_format, cache_file):
+        print(f"Using TTS from shared cache for: {req.text[:30]}...")
+        _update_index("record", key, cache_file, req.voice)
+        source = "shared"
+    else:
+        return None
+    ensure_pcm_sidecar(key, cache_file)
+    return source
+
+
+def _request_clip(key, req, cache_file, chunk_files=None):
+    """Under the clip's lock: joins ``chunk_files`` or requests the whole line, then shares the clip."""
+    print(f"Requesting TTS for: {req.text[:30]}...")
+    if not chunk_files or not _join_chunks(chunk_files, cache_file):
+        download_tts(req, cache_file)
+    _write_back(key, req.audio_format, cache_file, CACHE_BACKENDS)
+    print("TTS downloaded and cached.")
+    _update_index("record", key, cache_file, req.voice)
+    ensure_pcm_sidecar(key, cache_file)
+    return "service"
+
+
+def _fetch_chunks(chunks, voice):
+    """Fetches the clips of ``chunks`` in parallel and returns their paths in order."""
+    with ThreadPoolExecutor(max_workers=min(TTS_CHUNK_WORKERS, len(chunks)), thread_name_prefix="tts-chunk") as pool:
+        return list(pool.map(lambda chunk: fetch_tts(chunk, **voice), chunks))
+
+
+def _join_chunks(chunk_files, cache_file):
+    """Concatenates chunk clips into ``cache_file``; returns False if they cannot be joined."""
+    _remove_sidecars(cache_file)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    try:
+        tts_chunking.concat_mp3(chunk_files, cache_file)
+    except ValueError as e:
+        print(f"Failed to join TTS chunks, requesting the whole line: {e}")
+        return False
+    print(f"Joined {len(chunk_files)} TTS chunks.")
+    return True
+
+
+def _fetch_from_backends(key, audio_format, cache_file):
+    """
+    Copies the clip from the first shared layer that has it into ``cache_file``
+    and writes it back to the layers that missed. Returns False if none has it.
+    """
+    missed = []
+    for backend in CACHE_BACKENDS:
+        try:
+            _remove_sidecars(cache_file)
+            found = backend.get(key, audio_format, cache_file)
+        except OSError as e:
+            # 共享层不可用时退回到下一层或 TTS 服务，不影响渲染
+            print(f"TTS cache layer {backend!r} failed to read: {e}")
+            found = False
+        if found:
+            _write_back(key, audio_format, cache_file, missed)
+            return True
+        missed.append(backend)
+    return False
+
+
+def _write_back(key, audio_format, cache_file, backends):
+    for backend in backends:
+        try:
+            backend.put(key, audio_format, cache_file)
+        except OSError as e:
+            print(f"TTS cache layer {backend!r} failed to write: {e}")
+
+
+def evict_cache(max_bytes=None):
+    """Evicts least-recently-used clips once the cache exceeds its byte budget."""
+    max_bytes = TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    result = _update_index("evict", max_bytes)
+    if result and result[0]:
+        print(f"TTS cache evicted {result[0]} clips ({result[1] / 1024 / 1024:.1f} MiB)")
+    return result
+
+
+@atexit.register
+def release_pins():
+    """Unpins every clip this process pinned; run at exit and between worker jobs."""
+    for index in list(tts_cache_index.open_indexes()):
+        try:
+            index.unpin_all()
+        except sqlite3.Error:
+            pass
+
+
+def get_tts_duration(text, audio_file, **voice):
+    """Returns the duration of the cached clip for ``text``, from the index when known."""
+    req = TtsRequest(text, **voice)
+    key = req.key
+    entry = _update_index("lookup", key)
+    if entry is not None and entry.duration:
+        return entry.duration
+    duration = get_audio_duration(audio_file)
+    if entry is None:
+        _update_index("record", key, audio_file, req.voice, duration)
+    else:
+        _update_index("set_duration", key, duration)
+    return duration
+
+
+def resolve_tracker(text, **voice):
+    """
+    Fetches and probes the narration of ``text`` and returns its tracker.
+    On failure the tracker has audio_path=None and duration=0.
+    """
     try:
-        yield tracker
+        audio_file = fetch_tts(text, **voice)
+    except requests.exceptions.RequestException as e:
+        print(f"TTS API request failed: {e}")
+        audio_file = None
+    except OSError as e:
+        print(f"Failed to write TTS audio: {e}")
+        audio_file = None
+
+    tracker = CustomVoiceoverTracker(None, 0)
+    if audio_file:
+        try:
+            duration = get_tts_duration(text, audio_file, **voice)
+            print(f"Audio duration: {duration:.2f}s")
+            tracker = CustomVoiceoverTracker(get_sound_file(audio_file), duration)
+        except Exception as e:
+            print(f"Error processing audio file {audio_file}: {e}")
+            # 损坏的缓存文件会导致之后每次渲染都失败
+            try:
+                os.remove(audio_file)
+            except OSError:
+                pass
+            _remove_sidecars(audio_file)
+            _update_index("remove", get_cache_key(text, **voice))
+    return tracker
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _pending_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TTS_BACKGROUND_WORKERS, thread_name_prefix="tts")
+    return _executor
+
+
+def _pending_key(text, **voice):
+    # 同一句话在不同缓存目录下是不同的文件
+    return os.path.abspath(CACHE_DIR), get_cache_key(text, **voice)
+
+
+def _resolve_pending(key, text, **voice):
+    try:
+        return resolve_tracker(text, **voice)
     finally:
-        pass  # 根据需要决定是否清理缓存
\ No newline at end of file
+        # 结束（包括失败）后移除，之后的请求命中缓存或重新下载
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def request_voiceover(text, token=None, base_url=None, voice_provider=None, voice_id=None):
+    """
+    Starts resolving the narration of ``text`` in the background and returns
+    a LazyVoiceoverTracker. Calls for the same line while it is still being
+    resolved share one download; once it finishes (or fails) the next call
+    starts over, hitting the cache or retrying the request.
+    """
+    voice = dict(token=token, base_url=base_url, voice_provider=voice_provider, voice_id=voice_id)
+    key = _pending_key(text, **voice)
+    executor = _get_executor()
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = executor.submit(_resolve_pending, key, text, **voice)
+            _pending[key] = future
+    return LazyVoiceoverTracker(future)
+
+
+def forget_pending():
+    """Cancels the narration requests that have not started yet and forgets the running ones."""
+    with _pending_lock:
+        futures = list(_pending.values())
+        _pending.clear()
+    for future in futures:
+        future.cancel()
+
+
+def _is_requested(text, **voice):
+    with _pending_lock:
+        return _pending_key(text, **voice) in _pending
+
+
+@contextmanager
+def custom_voiceover_tts(text, token=None, base_url=None, voice_provider=None, voice_id=None):
+    """
+    Fetches TTS audio, caches it, and provides path and duration.
+    Usage: with custom_voiceover_tts("text") as tracker: ...
+    On failure the tracker has audio_path=None and duration=0.
+    Lines already started by request_voiceover() yield their lazy tracker;
+    sounds it noted in add_sound() are added by the end of the block.
+    """
+    voice = dict(token=token, base_url=base_url, voice_provider=voice_provider, voice_id=voice_id)
+    if _is_requested(text, **voice):
+        tracker = request_voiceover(text, **voice)
+    else:
+        tracker = resolve_tracker(text, **voice)
+
+    yield tracker
+    # 块内没有读取 audio_path/duration 时，延迟的 add_sound 在这里补上
+    tracker.flush_sounds()
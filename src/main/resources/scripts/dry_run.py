@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Construct-only dry run: checks that a scene script works without rendering it.
+
+    python dry_run.py 08.py [--offline-tts] [--output timeline.json]
+
+Runs the script's ``__main__`` with Manim's dry-run config and animation
+skipping on: every mobject is built, every ``MathTex`` is compiled and every
+animation and updater is stepped once to its end state, but no frame is
+rasterized, no sound is mixed and nothing is encoded. Prints one JSON object:
+
+    {"ok": true, "duration": 96.4, "animations": 58, "elapsed": 7.9,
+     "scenes": [{"scene": "play_scene_01", "start": 0.0, "duration": 14.2, "animations": 9}, ...]}
+
+or, for the first exception, ``{"ok": false, "error": ..., "traceback": ...,
+"script_traceback": ..., "scene": ...}``
+with exit status 1. Broken generated code fails in seconds instead of after a
+full render.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+import traceback
+
+from script_runner import run_script
+
+DEFAULT_SCENE = "CombinedScene"
+SCENE_METHOD_PREFIX = "play_scene"
+# play_scene_* 之外（construct 本身、收尾动画）的动画归到这一段
+OUTSIDE_SCENES = "construct"
+
+
+class Timeline:
+    """Animations and durations per ``play_scene_*`` segment, in order."""
+
+    def __init__(self):
+        self.current = OUTSIDE_SCENES
+        self.failed_scene = None
+        self.scenes = []
+        self.time = 0.0
+        self.animations = 0
+
+    def enter(self, name):
+        self.current = name
+        self.scenes.append({"scene": name, "start": round(self.time, 3), "duration": 0.0, "animations": 0})
+
+    def leave(self):
+        self.current = OUTSIDE_SCENES
+
+    def add(self, duration):
+        if not self.scenes or self.scenes[-1]["scene"] != self.current:
+            self.enter(self.current)
+        entry = self.scenes[-1]
+        entry["duration"] = round(entry["duration"] + duration, 3)
+        entry["animations"] += 1
+        self.time += duration
+        self.animations += 1
+
+    def to_dict(self):
+        return {"duration": round(self.time, 3), "animations": self.animations, "scenes": self.scenes}
+
+
+def _track_scene_methods(scene_class, timeline):
+    for name in dir(scene_class):
+        if not name.startswith(SCENE_METHOD_PREFIX):
+            continue
+        method = getattr(scene_class, name)
+        if not callable(method) or getattr(method, "_dry_run_tracked", False):
+            continue
+
+        def wrapper(*args, _method=method, _name=name, **kwargs):
+            timeline.enter(_name)
+            try:
+                return _method(*args, **kwargs)
+            except BaseException:
+                timeline.failed_scene = timeline.failed_scene or _name
+                raise
+            finally:
+                timeline.leave()
+
+        wrapper = functools.wraps(method)(wrapper)
+        wrapper._dry_run_tracked = True
+        setattr(scene_class, name, wrapper)
+
+
+def script_traceback(exc, script_path):
+    """Formats only the frames of ``exc`` that are in the script itself, for fix prompts."""
+    frames = [frame for frame in traceback.extract_tb(exc.__traceback__)
+              if os.path.abspath(frame.filename) == script_path]
+    lines = ["Traceback (most recent call last):\n"] if frames else []
+    return "".join(lines + traceback.format_list(frames) + traceback.format_exception_only(type(exc), exc))
+
+
+def dry_run(script_path, scene_name=DEFAULT_SCENE):
+    """Runs the script without rendering; returns the result dict described in the module docstring."""
+    from manim import Scene, config
+
+    script_path = os.path.abspath(script_path)
+    timeline = Timeline()
+    original_play = Scene.play
+
+    def play(self, *args, **kwargs):
+        start = getattr(self.renderer, "time", 0.0)
+        result = original_play(self, *args, **kwargs)
+        timeline.add(getattr(self.renderer, "time", 0.0) - start)
+        return result
+
+    def configure(scene_class):
+        # SceneFileWriter 在 Scene 构造时按 dry_run 决定是否创建输出目录和文件
+        config.dry_run = True
+
+    def before_render(scene):
+        # 跳过模式下每个动画只插值到结束状态一次，updater 也各执行一次
+        scene.renderer.skip_animations = True
+        scene.renderer._original_skipping_status = True
+        _track_scene_methods(type(scene), timeline)
+
+    Scene.play = play
+    start = time.time()
+    try:
+        run_script(script_path, before_render, scene_name=scene_name, configure=configure)
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        return {
+            "ok": False,
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+            "script_traceback": script_traceback(e, script_path),
+            "scene": timeline.failed_scene or timeline.current,
+            "elapsed": round(time.time() - start, 3),
+        }
+    finally:
+        Scene.play = original_play
+    return dict(ok=True, elapsed=round(time.time() - start, 3), **timeline.to_dict())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("script")
+    parser.add_argument("--scene", default=DEFAULT_SCENE)
+    parser.add_argument("--offline-tts", action="store_true",
+                        help="use locally synthesized narration of estimated length (TTS_OFFLINE=1)")
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    if args.offline_tts:
+        os.environ["TTS_OFFLINE"] = "1"
+    output = os.path.abspath(args.output) if args.output else None
+    result = dry_run(args.script, args.scene)
+    text = json.dumps(result, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Advisory file locks shared by threads and processes on one host.
+
+    with file_lock("tts_cache/.locks/abc.lock"):
+        ...
+
+Uses ``fcntl.flock`` on POSIX and ``msvcrt.locking`` on Windows. Each call
+opens its own file handle, so the lock also excludes other threads of the
+same process.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+POLL_INTERVAL = 0.05
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a lock is not acquired within the timeout."""
+
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path, timeout=None):
+    """Holds an exclusive lock on ``path`` (created if missing) for the ``with`` body."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if fcntl is not None and deadline is None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while not _try_lock(fd):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise LockTimeout(f"Timed out waiting for lock {path}")
+                time.sleep(POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
@@ -1,12 +1,7 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
 from manim.utils.color.SVGNAMES import BROWN
-from moviepy import AudioFileClip # Correct import for AudioFileClip
-import hashlib
 from manim.utils.color import color_gradient # Import for gradient
 
 # --- 自定义颜色 ---
@@ -25,85 +20,10 @@ MY_BLUE_C = BLUE_C # "#5C9DCE"
 MY_BLUE_A = BLUE_A # "#8CD1F5"
 MY_BEIGE = "#F5F5DC" # 米色
 
-# --- TTS 配置 ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-
-class CustomVoiceoverTracker:
-    """辅助类，用于跟踪 TTS 音频路径和时长。"""
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-
-def get_cache_filename(text):
-    """根据文本内容生成缓存文件名。"""
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    """
-    上下文管理器，用于生成或获取缓存的 TTS 音频。
-
-    Args:
-        text (str): 需要转换为语音的文本。
-        token (str): API 访问令牌。
-        base_url (str): TTS 服务的基础 URL。
-
-    Yields:
-        CustomVoiceoverTracker: 包含音频路径和时长的对象。
-
-    Raises:
-        Exception: 如果 TTS API 请求失败。
-    """
-    cache_file = get_cache_filename(text)
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-        # print(f"Using cached TTS for: {text[:30]}...")
-    else:
-        # print(f"Generating TTS for: {text[:30]}...")
-        input_text = requests.utils.quote(text)
-        url = f"{base_url}?token={token}&input={input_text}"
-
-        try:
-            response = requests.get(url, stream=True, timeout=60) # 添加超时
-            response.raise_for_status() # 检查 HTTP 错误状态码
-
-            with open(cache_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            audio_file = cache_file
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"TTS API request failed: {e}")
-        except Exception as e:
-            raise Exception(f"An error occurred during TTS generation: {e}")
-
-
-    try:
-        clip = AudioFileClip(audio_file)
-        duration = clip.duration
-        clip.close()
-    except Exception as e:
-        # 如果音频文件损坏或无法读取，尝试删除缓存并重新生成
-        print(f"Error reading audio file {audio_file}: {e}. Attempting to regenerate.")
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
-        # 重新调用自身以尝试重新生成
-        with custom_voiceover_tts(text, token, base_url) as tracker:
-            yield tracker
-        return # 确保在递归调用后退出
-
-    tracker = CustomVoiceoverTracker(audio_file, duration)
-    try:
-        yield tracker
-    finally:
-        # 可以选择在这里清理缓存文件，但通常保留缓存以提高效率
-        pass
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 
 # --- 主场景类 ---
@@ -227,7 +147,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_00 = "大家好！欢迎收看重庆交通大学专业信息速览。本期我们将快速了解港口航道与海岸工程以及水利水电工程这两个专业的关键信息。"
         with custom_voiceover_tts(voice_text_scene_00) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0) # 立即播放声音
+            tracker.add_sound(self) # 立即播放声音
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_00)
 
@@ -281,7 +201,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_01 = "首先来看港口航道与海岸工程专业。该专业在2009年被评为国家级特色专业，并在2017年通过了全国工程教育专业认证复评。"
         with custom_voiceover_tts(voice_text_scene_01) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_01)
 
@@ -331,7 +251,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_02 = "该专业的最低毕业学分要求是多少呢？答案是 180 学分。"
         with custom_voiceover_tts(voice_text_scene_02) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_02)
 
@@ -404,7 +324,7 @@ class CombinedScene(MovingCameraScene):
         # --- 旁白与动画 ---
         voice_text_scene_03 = "专业核心课程包括：渠化工程、港口规划与布置、航道整治、工程项目管理，以及港口与海岸水工建筑物等。"
         with custom_voiceover_tts(voice_text_scene_03) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_03)
 
@@ -466,7 +386,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_04 = "来看两个具体的课程信息：水工钢筋混凝土结构综合实践在第 5 学期开设。数学建模课程的代码是 19210919。"
         with custom_voiceover_tts(voice_text_scene_04) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_04)
 
@@ -515,7 +435,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_05 = "接下来是水利水电工程专业。在2013年，该专业入选了教育部的‘卓越工程师教育培养计划’试点专业，并同时入选重庆市‘三特行动计划’首批特色专业建设点。"
         with custom_voiceover_tts(voice_text_scene_05) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_05)
 
@@ -574,7 +494,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_06 = "水利水电工程专业的总学分是 166 加 10 学分。其中，毕业设计占 12 学分。"
         with custom_voiceover_tts(voice_text_scene_06) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_06)
 
@@ -639,7 +559,7 @@ class CombinedScene(MovingCameraScene):
         # --- 旁白与动画 ---
         voice_text_scene_07 = "水利水电工程的核心课程包括：工程水文与水资源综合利用、水工建筑物、水电站，以及水利工程施工与管理。"
         with custom_voiceover_tts(voice_text_scene_07) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_07)
 
             self.play(
@@ -711,7 +631,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_08 = "在自主发展计划，也就是第二课堂中，美育部分要求完成美育实践。"
         with custom_voiceover_tts(voice_text_scene_08) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             # 字幕也用黑色
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_08, color=MY_BLACK)
@@ -765,7 +685,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画
         voice_text_scene_09 = "本次重庆交通大学专业信息速览到此结束。感谢您的观看！如果需要了解更详细的信息，请查询学校官方网站。"
         with custom_voiceover_tts(voice_text_scene_09) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = self.create_subtitle_voice(voice_text_scene_09)
 
@@ -820,6 +740,8 @@ if __name__ == "__main__":
     config.media_dir = "intro_majoy"
 
     # 实例化并渲染场景
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     try:
         scene.render()
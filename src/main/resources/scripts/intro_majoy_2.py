@@ -1,11 +1,6 @@
 # -*- coding: utf-8 -*-
-import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-from moviepy import AudioFileClip # Correct import for AudioFileClip
-import hashlib
 import manimpango # <--- 添加导入
 
 # --- 自定义颜色 ---
@@ -24,49 +19,10 @@ MY_BLUE_C = "#60A5FA" # 浅蓝
 MY_BLUE_A = "#BFDBFE" # 更浅蓝，用于水利背景
 MY_BEIGE = "#F5F5DC" # 米色
 
-# --- TTS 配置 ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
-
-    if os.path.exists(cache_file):
-        audio_file = cache_file
-    else:
-        input_text = requests.utils.quote(text)
-        url = f"{base_url}?token={token}&input={input_text}"
-
-        response = requests.get(url, stream=True)
-        if response.status_code != 200:
-            raise Exception(f"TTS 接口错误: {response.status_code} - {response.text}")
-
-        with open(cache_file, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-
-        audio_file = cache_file
-
-    clip = AudioFileClip(audio_file)
-    duration = clip.duration
-    clip.close()
-
-    tracker = CustomVoiceoverTracker(audio_file, duration)
-    try:
-        yield tracker
-    finally:
-        pass # Keep cache
+# --- TTS Setup ---
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 # --- 统一字体设置 ---
 # 确保系统已安装 "Noto Sans CJK SC" 字体，或替换为其他可用中文字体
@@ -209,7 +165,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "大家好！欢迎观看重庆交通大学专业信息速览。本期我们将聚焦港口航道与海岸工程以及水利水电工程这两个特色专业。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_WHITE,
@@ -267,7 +223,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "首先来看港口航道与海岸工程。2009年，该专业被评为国家级特色专业。到了2017年，它顺利通过了全国工程教育专业认证的复评。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_WHITE,
@@ -323,7 +279,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "那么，港口航道与海岸工程专业的最低毕业学分要求是多少呢？答案是 180 学分。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_WHITE,
@@ -397,7 +353,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "该专业的核心课程包括：渠化工程、港口规划与布置、航道整治、工程项目管理，以及港口与海岸水工建筑物。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_WHITE,
@@ -457,7 +413,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "具体来看，水工钢筋混凝土结构综合实践这门课在第 5 学期开设。而数学建模课程的代码是 19210919。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_WHITE,
@@ -513,7 +469,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "接下来是水利水电工程专业。2013年是重要的一年，该专业不仅入选了教育部的‘卓越工程师教育培养计划’试点专业，还成为了重庆市‘三特行动计划’的首批特色专业建设点。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_DARK_BLUE, # 深色字配浅背景
@@ -571,7 +527,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "水利水电工程的总学分要求是 166 加 10 学分。其中，毕业设计占 12 学分。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_DARK_BLUE,
@@ -640,7 +596,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "水利水电工程的核心课程主要有：工程水文与水资源综合利用、水工建筑物、水电站，以及水利工程施工与管理。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_DARK_BLUE,
@@ -698,7 +654,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "在自主发展计划，也就是第二课堂中，美育实践是其中的重要组成部分。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_DARK_BLUE,
@@ -749,7 +705,7 @@ class CombinedScene(MovingCameraScene):
         # 旁白与动画同步
         voice_text = "重庆交通大学港口航道与海岸工程及水利水电工程的专业信息速览到此结束。感谢您的观看！如果想了解更多详细信息，请查询学校官方网站。"
         with custom_voiceover_tts(voice_text) as tracker:
-            self.add_sound(tracker.audio_path, time_offset=0)
+            tracker.add_sound(self)
 
             subtitle_voice = Text(
                 voice_text, font_size=28, color=MY_WHITE,
@@ -799,6 +755,8 @@ if __name__ == "__main__":
 
     # 字体检查已在类定义之前完成
 
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print(f"Scene rendering finished. Output video: {config.output_file}.mp4 in {config.media_dir}")
\ No newline at end of file
@@ -1,5 +1,7 @@
 from manim import *
 from custom_voiceover import custom_voiceover_tts  # 导入自定义 voiceover 模块
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 
 class CombinedScene(Scene):
@@ -7,7 +9,7 @@ class CombinedScene(Scene):
         # 使用自定义 voiceover 上下文管理器
         with custom_voiceover_tts("今天天气怎么样") as tracker:
             # 将生成的音频添加到场景中播放
-            self.add_sound(tracker.audio_path)
+            tracker.add_sound(self)
             # 同时展示一段文字，动画时长与旁白音频保持一致
             text_obj = Text("今天天天气怎么样", font_size=36)
             text_obj.to_edge(DOWN)
@@ -23,6 +25,8 @@ if __name__ == "__main__":
     config.output_file = "CombinedScene"  # 指定输出文件名
     config.media_dir = "05"  # 输出目录
 
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print("Scene rendering finished.")
\ No newline at end of file
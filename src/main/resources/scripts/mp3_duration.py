@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Pure-Python MP3 duration probe with cached duration sidecars.
+
+``get_duration("tts_cache/ab/cd/<key>.mp3")`` reads ``tts_cache/ab/cd/<key>.dur`` if it
+exists; otherwise it parses the Xing/Info or VBRI header of the first frame,
+falls back to scanning every frame header, and writes the sidecar. No ffmpeg
+subprocess is started.
+"""
+import os
+import struct
+import threading
+
+SIDECAR_EXT = ".dur"
+
+# 比特率表 (kbps)，按 (MPEG 版本是否为 1, layer) 索引
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# 采样率表，按 MPEG 版本位索引: 0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+
+class FrameHeader:
+    """A decoded MPEG audio frame header."""
+
+    def __init__(self, version, layer, bitrate, sample_rate, padding, channel_mode):
+        self.version = version
+        self.layer = layer
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.padding = padding
+        self.channel_mode = channel_mode
+
+    @property
+    def is_mpeg1(self):
+        return self.version == 3
+
+    @property
+    def samples_per_frame(self):
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and not self.is_mpeg1:
+            return 576
+        return 1152
+
+    @property
+    def frame_length(self):
+        if self.layer == 1:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        slot_factor = 72 if self.layer == 3 and not self.is_mpeg1 else 144
+        return slot_factor * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def side_info_length(self):
+        mono = self.channel_mode == 3
+        if self.is_mpeg1:
+            return 17 if mono else 32
+        return 9 if mono else 17
+
+
+def parse_frame_header(data, offset):
+    """Returns the FrameHeader at ``offset`` or None if it is not a valid frame."""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[(version == 3, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channel_mode = (b3 >> 6) & 0x03
+    return FrameHeader(version, layer, bitrate, sample_rate, padding, channel_mode)
+
+
+def _skip_id3v2(data):
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _find_first_frame(data, offset):
+    """Finds the first offset where two consecutive valid frame headers start."""
+    end = len(data) - 4
+    while offset < end:
+        offset = data.find(b"\xff", offset)
+        if offset < 0 or offset >= end:
+            return None, None
+        header = parse_frame_header(data, offset)
+        if header is not None:
+            next_offset = offset + header.frame_length
+            # 最后一帧或下一帧同样有效时才认为找到了同步
+            if next_offset >= len(data) - 4 or parse_frame_header(data, next_offset) is not None:
+                return offset, header
+        offset += 1
+    return None, None
+
+
+def _vbr_header_duration(data, offset, header):
+    """Reads the frame count from a Xing/Info or VBRI header, if present."""
+    xing = offset + 4 + header.side_info_length
+    tag = data[xing:xing + 4]
+    if tag in (b"Xing", b"Info") and len(data) >= xing + 8:
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x01 and len(data) >= xing + 12:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            if frames:
+                return frames * header.samples_per_frame / header.sample_rate
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        if frames:
+            return frames * header.samples_per_frame / header.sample_rate
+    return None
+
+
+def audio_frame_span(data):
+    """
+    Returns ``(header, start, end)`` for the audio frames in ``data``: the first
+    FrameHeader and the byte range without ID3 tags and without a Xing/Info/VBRI
+    header frame. Raises ValueError if no MPEG audio frame is found.
+    """
+    offset, header = _find_first_frame(data, _skip_id3v2(data))
+    if header is None:
+        raise ValueError("No MPEG audio frame found")
+    xing = offset + 4 + header.side_info_length
+    vbri = offset + 4 + 32
+    if data[xing:xing + 4] in (b"Xing", b"Info") or data[vbri:vbri + 4] == b"VBRI":
+        offset += header.frame_length
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return header, offset, end
+
+
+def _scan_frames_duration(data, offset):
+    """Sums the samples of every frame header from ``offset`` onwards."""
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    samples = 0.0
+    while offset + 4 <= end:
+        header = parse_frame_header(data, offset)
+        if header is None or header.frame_length <= 0:
+            # 丢失同步时向后寻找下一帧
+            next_sync = data.find(b"\xff", offset + 1, end)
+            if next_sync < 0:
+                break
+            offset = next_sync
+            continue
+        samples += header.samples_per_frame / header.sample_rate
+        offset += header.frame_length
+    return samples
+
+
+def probe_mp3_duration(path):
+    """
+    Returns the duration of the MP3 file at ``path`` in seconds.
+    Raises ValueError if no MPEG audio frame is found.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offset, header = _find_first_frame(data, _skip_id3v2(data))
+    if header is None:
+        raise ValueError(f"No MPEG audio frame found in {path}")
+    duration = _vbr_header_duration(data, offset, header)
+    if duration is None:
+        duration = _scan_frames_duration(data, offset)
+    if duration <= 0:
+        raise ValueError(f"MP3 file has no audio frames: {path}")
+    return duration
+
+
+def sidecar_path(audio_path):
+    return os.path.splitext(audio_path)[0] + SIDECAR_EXT
+
+
+def read_duration_sidecar(audio_path):
+    """Returns the cached duration for ``audio_path`` or None."""
+    try:
+        with open(sidecar_path(audio_path), "r", encoding="utf-8") as f:
+            return float(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_duration_sidecar(audio_path, duration):
+    path = sidecar_path(audio_path)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{duration:.6f}")
+    os.replace(tmp_path, path)
+
+
+def remove_duration_sidecar(audio_path):
+    try:
+        os.remove(sidecar_path(audio_path))
+    except OSError:
+        pass
+
+
+def get_duration(audio_path):
+    """Returns the duration of ``audio_path``, using and refreshing its sidecar."""
+    duration = read_duration_sidecar(audio_path)
+    if duration is not None:
+        return duration
+    duration = probe_mp3_duration(audio_path)
+    try:
+        write_duration_sidecar(audio_path, duration)
+    except OSError as e:
+        print(f"Failed to write duration sidecar for {audio_path}: {e}")
+    return duration
@@ -2,6 +2,8 @@ from manim import *
 import numpy as np
 import random
 
+from render_cache import install_render_cache
+
 
 class CombinedScene(MovingCameraScene):
     def construct(self):
@@ -222,5 +224,6 @@ if __name__ == "__main__":
     with tempconfig({
         "media_dir": "./output_video",
     }):
+        install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
         scene = CombinedScene()
         scene.render()
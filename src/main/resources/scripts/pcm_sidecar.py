@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-decoded PCM (WAV) sidecars for cached TTS clips.
+
+Manim mixes the soundtrack with pydub, which starts an ffmpeg process to
+decode every MP3 passed to ``add_sound`` on every render. WAV files are read
+by pydub directly, so keeping ``tts_cache/ab/cd/<key>.wav`` next to the clip
+lets repeat renders skip MP3 decoding entirely. The sidecar is decoded once,
+at the requested sample rate, with a single ffmpeg call.
+"""
+import os
+import shutil
+import subprocess
+import threading
+import wave
+
+SIDECAR_EXT = ".wav"
+DEFAULT_SAMPLE_RATE = 44100
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+def sidecar_path(audio_path):
+    return os.path.splitext(audio_path)[0] + SIDECAR_EXT
+
+
+def _ffmpeg_binary():
+    return os.environ.get("FFMPEG_BINARY") or shutil.which("ffmpeg") or "ffmpeg"
+
+
+def has_pcm_sidecar(audio_path, sample_rate=DEFAULT_SAMPLE_RATE):
+    """True if ``audio_path`` has a readable WAV sidecar at ``sample_rate``."""
+    try:
+        with wave.open(sidecar_path(audio_path), "rb") as wav:
+            return (wav.getframerate() == sample_rate and wav.getnchannels() == CHANNELS
+                    and wav.getsampwidth() == SAMPLE_WIDTH and wav.getnframes() > 0)
+    except (OSError, EOFError, wave.Error):
+        return False
+
+
+def write_pcm_sidecar(audio_path, sample_rate=DEFAULT_SAMPLE_RATE):
+    """
+    Decodes ``audio_path`` into its WAV sidecar and returns the sidecar path.
+    Raises OSError if ffmpeg cannot be started and ValueError if decoding fails.
+    """
+    path = sidecar_path(audio_path)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    cmd = [
+        _ffmpeg_binary(), "-nostdin", "-v", "error", "-y", "-i", audio_path,
+        "-ac", str(CHANNELS), "-ar", str(sample_rate), "-acodec", "pcm_s16le", "-f", "wav", tmp_path,
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise ValueError(f"ffmpeg failed to decode {audio_path}: {result.stderr.decode('utf-8', 'replace').strip()}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def remove_pcm_sidecar(audio_path):
+    try:
+        os.remove(sidecar_path(audio_path))
+    except OSError:
+        pass
+
+
+def get_pcm_sidecar(audio_path, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Returns the WAV sidecar of ``audio_path``, decoding it first if missing or stale."""
+    if has_pcm_sidecar(audio_path, sample_rate):
+        return sidecar_path(audio_path)
+    return write_pcm_sidecar(audio_path, sample_rate)
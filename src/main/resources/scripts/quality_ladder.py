@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Quality ladder: a fast 480p15 preview first, the full-quality render in the background.
+
+    python quality_ladder.py 08.py
+    {"preview": ".../videos/08/480p15/CombinedScene_preview.mp4", "full_status": "...", "full_pid": 1234}
+
+The preview renders the script with only the resolution and frame rate
+overridden, then this command prints its path and returns. The full render
+(the script's own settings, usually 1080p30) continues in a detached
+process; ``full_status`` points to a JSON file that reads ``running``, then
+``done`` with the video path or ``failed`` with the error. Both renders use
+the same working directory, so the full one hits the TTS cache, the LaTeX
+cache under ``media_dir/Tex`` and, with ``RENDER_CACHE=1``, nothing random
+differs between them.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+from script_runner import movie_path, run_script
+
+DEFAULT_SCENE = "CombinedScene"
+
+# (pixel_width, pixel_height, frame_rate)；None 表示使用脚本自己的配置
+QUALITIES = {
+    "preview": (854, 480, 15),
+    "full": None,
+}
+
+
+def write_status(status_file, **status):
+    tmp_path = f"{status_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(status, updated_at=time.time()), f, ensure_ascii=False)
+    os.replace(tmp_path, status_file)
+
+
+def read_status(status_file):
+    with open(status_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def quality_configure(quality, scene_name=DEFAULT_SCENE, rename=True):
+    """
+    Returns a ``run_script`` configure hook that applies the ``quality`` preset;
+    with ``rename`` the video is written as ``<output_file>_<quality>``.
+    """
+    preset = QUALITIES[quality]
+
+    def configure(scene_class):
+        from manim import config
+
+        if preset is None:
+            return
+        # Camera 和 SceneFileWriter 在 Scene 构造时按当前配置确定尺寸和文件名
+        config.pixel_width, config.pixel_height, config.frame_rate = preset
+        if rename:
+            config.output_file = f"{config.output_file or scene_name}_{quality}"
+
+    return configure
+
+
+def render_quality(script_path, quality, status_file, scene_name=DEFAULT_SCENE):
+    """Renders the script at ``quality`` and records the outcome in ``status_file``."""
+    write_status(status_file, state="running", quality=quality)
+
+    def after_render(scene):
+        write_status(status_file, state="done", quality=quality, movie=movie_path(scene))
+
+    try:
+        run_script(script_path, after_render=after_render, scene_name=scene_name,
+                   configure=quality_configure(quality, scene_name))
+    except BaseException as e:
+        write_status(status_file, state="failed", quality=quality, error=f"{type(e).__name__}: {e}",
+                     traceback=traceback.format_exc())
+        raise
+
+
+def _worker_command(script_path, quality, status_file, scene_name):
+    return [sys.executable, os.path.abspath(__file__), "--worker", "--quality", quality,
+            "--status-file", status_file, "--scene", scene_name, os.path.abspath(script_path)]
+
+
+def render_ladder(script_path, scene_name=DEFAULT_SCENE, status_dir=None):
+    """
+    Renders the preview, starts the full render in the background and returns
+    ``{"preview": path, "full_status": path, "full_pid": pid}``.
+    Raises RuntimeError if the preview fails.
+    """
+    status_dir = status_dir or tempfile.mkdtemp(prefix="quality_ladder_")
+    os.makedirs(status_dir, exist_ok=True)
+    preview_status = os.path.join(status_dir, "preview.json")
+    full_status = os.path.join(status_dir, "full.json")
+
+    start = time.time()
+    subprocess.run(_worker_command(script_path, "preview", preview_status, scene_name))
+    status = read_status(preview_status) if os.path.exists(preview_status) else {"state": "failed"}
+    if status.get("state") != "done":
+        raise RuntimeError(f"Preview render failed: {status.get('error', 'no status written')}")
+    print(f"Preview rendered in {time.time() - start:.1f}s", file=sys.stderr)
+
+    # 完整渲染脱离当前进程，调用方拿到预览后即可返回
+    write_status(full_status, state="queued", quality="full")
+    with open(os.path.join(status_dir, "full.log"), "ab") as log:
+        process = subprocess.Popen(
+            _worker_command(script_path, "full", full_status, scene_name),
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True,
+        )
+    return {"preview": status["movie"], "full_status": full_status, "full_pid": process.pid}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("script")
+    parser.add_argument("--scene", default=DEFAULT_SCENE)
+    parser.add_argument("--status-dir", default=None, help="where preview.json/full.json/full.log go")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--quality", choices=sorted(QUALITIES), help=argparse.SUPPRESS)
+    parser.add_argument("--status-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        render_quality(args.script, args.quality, args.status_file, args.scene)
+        return
+    try:
+        result = render_ladder(args.script, args.scene, args.status_dir)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic random seeds and Manim's partial-movie cache for the scene scripts.
+
+Manim hashes every ``self.play``/``self.wait`` call and, with caching on,
+reuses the partial movie file of a matching hash instead of rendering it
+again. The star fields and other decorations use ``random``/``np.random``
+without a seed, so the hashes changed on every run and the scripts turned
+caching off. ``install_render_cache()`` fixes the seeds:
+
+* ``random`` and ``np.random`` are seeded when ``render()`` starts;
+* each ``play_scene_NN`` method reseeds them from its own name, so editing
+  one scene does not shift the random numbers of the scenes after it (and
+  ``scene_parallel`` segments draw the same numbers as a sequential render).
+
+With ``RENDER_CACHE=1`` it also turns caching back on, so fix-and-rerun
+cycles only re-render the animations that changed. The partial movie files
+are kept in a store shared by all renders on the machine,
+``RENDER_CACHE_DIR/partials/<hash>.mp4``; the hash covers the camera, the
+animations and the mobjects, not the scene or script name. Every render still
+works in a directory of its own (``RENDER_CACHE_DIR/work/<host>-<pid>-<id>``,
+set when the scene is constructed, before its file writer fixes the partial
+movie directory): a partial found in the store is hard-linked (or copied) in
+when Manim looks it up, the render writes its list file and new partials
+there, and when it finishes the new partials are linked into the store and
+the directory is removed. Concurrent renders of the same ``CombinedScene``
+never share a list file, and pruning the store down to
+``RENDER_CACHE_MAX_FILES`` cannot remove a partial another render is about to
+combine, since that render holds its own link.
+
+    from render_cache import install_render_cache
+    install_render_cache()
+    scene = CombinedScene()
+    scene.render()
+
+Helpers that need their own stream can use ``scene_rng("stars")``.
+
+With ``RENDER_STREAM_ENCODER=1`` it also installs ``stream_encoder`` (one
+ffmpeg process per render instead of one per animation), which applies to
+renders with caching off.
+"""
+import functools
+import os
+import random
+import shutil
+import socket
+import uuid
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RENDER_SEED = int(os.environ.get("RENDER_SEED", 0))
+RENDER_CACHE = os.environ.get("RENDER_CACHE", "") in ("1", "true", "yes")
+# 所有渲染共用的分段缓存根目录：partials/ 按内容哈希存放分段，work/ 是每次渲染自己的目录
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "render_cache")
+STORE_DIR = "partials"
+WORK_DIR = "work"
+PARTIAL_LIST = "partial_movie_file_list.txt"
+RENDER_CACHE_MAX_FILES = int(os.environ.get("RENDER_CACHE_MAX_FILES", 5000))
+
+SCENE_METHOD_PREFIX = "play_scene"
+
+_installed = False
+
+
+def scene_seed(name, base_seed=None):
+    """Returns a stable 32-bit seed for ``name``."""
+    base_seed = RENDER_SEED if base_seed is None else base_seed
+    return zlib.crc32(f"{base_seed}:{name}".encode("utf-8"))
+
+
+def seed_rngs(seed):
+    """Seeds ``random`` and ``np.random``, which Manim and the scripts share."""
+    random.seed(seed)
+    if np is not None:
+        np.random.seed(seed)
+
+
+def scene_rng(name, base_seed=None):
+    """Returns a NumPy Generator seeded from ``name``, independent of the global RNGs."""
+    return np.random.default_rng(scene_seed(name, base_seed))
+
+
+def _seeded(method, name):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        seed_rngs(scene_seed(name))
+        return method(*args, **kwargs)
+
+    wrapper._render_seeded = True
+    return wrapper
+
+
+def make_deterministic(scene_class):
+    """Wraps every ``play_scene_*`` method of ``scene_class`` to reseed the RNGs first."""
+    for name in dir(scene_class):
+        if not name.startswith(SCENE_METHOD_PREFIX):
+            continue
+        method = getattr(scene_class, name)
+        if callable(method) and not getattr(method, "_render_seeded", False):
+            setattr(scene_class, name, _seeded(method, f"{scene_class.__name__}.{name}"))
+    return scene_class
+
+
+def store_dir(cache_dir=None):
+    return os.path.join(os.path.abspath(cache_dir or RENDER_CACHE_DIR), STORE_DIR)
+
+
+def new_work_dir(cache_dir=None):
+    """Returns a partial movie directory no other render uses."""
+    name = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    return os.path.join(os.path.abspath(cache_dir or RENDER_CACHE_DIR), WORK_DIR, name)
+
+
+def _link(src, dest):
+    """Links ``src`` to ``dest`` (copying across file systems); False if ``src`` is gone or ``dest`` exists."""
+    try:
+        os.link(src, dest)
+        return True
+    except (FileExistsError, FileNotFoundError):
+        return False
+    except OSError:
+        pass
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+        return True
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def fetch_partial(name, work_dir, cache_dir=None):
+    """Links the stored partial ``name`` into ``work_dir``; returns whether the store had it."""
+    stored = os.path.join(store_dir(cache_dir), name)
+    if not _link(stored, os.path.join(work_dir, name)):
+        return False
+    try:
+        # 按访问时间淘汰，命中的分段保留得更久
+        os.utime(stored)
+    except OSError:
+        pass
+    return True
+
+
+def publish_partials(work_dir, cache_dir=None):
+    """Adds the partials rendered in ``work_dir`` to the store; returns how many were new."""
+    store = store_dir(cache_dir)
+    os.makedirs(store, exist_ok=True)
+    added = 0
+    for name in os.listdir(work_dir):
+        if name != PARTIAL_LIST and not name.endswith(".tmp"):
+            added += _link(os.path.join(work_dir, name), os.path.join(store, name))
+    return added
+
+
+def prune_store(max_files=None, cache_dir=None):
+    """Removes the least recently used partials beyond ``max_files``; returns how many were removed."""
+    max_files = max_files or RENDER_CACHE_MAX_FILES
+    store = store_dir(cache_dir)
+    entries = []
+    for entry in os.scandir(store) if os.path.isdir(store) else ():
+        try:
+            entries.append((max(entry.stat().st_atime, entry.stat().st_mtime), entry.path))
+        except OSError:
+            pass
+    removed = 0
+    for _, path in sorted(entries)[:max(0, len(entries) - max_files)]:
+        try:
+            # 正在使用它的渲染在自己的目录里有硬链接，删除存储里的文件不影响它
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def enable_partial_movie_cache(cache_dir=None, max_files=None):
+    """Turns caching on with a fresh work directory of this render as the partial movie directory."""
+    from manim import config
+
+    config.disable_caching = False
+    config.partial_movie_dir = new_work_dir(cache_dir)
+    # 工作目录只属于这次渲染，Manim 自己的清理不会删除其他渲染要用的分段
+    config.max_files_cached = max_files or RENDER_CACHE_MAX_FILES
+
+
+def _install_partial_store():
+    """Patches ``SceneFileWriter`` to look partials up in the shared store and publish new ones."""
+    from manim import config
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    original_is_cached = SceneFileWriter.is_already_cached
+    original_finish = SceneFileWriter.finish
+
+    def cache_root(writer):
+        """The cache directory of the writer's work directory, or None for renders outside the store."""
+        directory = getattr(writer, "partial_movie_directory", None)
+        if directory is None:
+            return None
+        parent = os.path.dirname(os.path.abspath(str(directory)))
+        return os.path.dirname(parent) if os.path.basename(parent) == WORK_DIR else None
+
+    def is_already_cached(self, hash_invocation):
+        root = cache_root(self)
+        if root and not original_is_cached(self, hash_invocation):
+            fetch_partial(f"{hash_invocation}{config.movie_file_extension}", str(self.partial_movie_directory), root)
+        return original_is_cached(self, hash_invocation)
+
+    def finish(self, *args, **kwargs):
+        result = original_finish(self, *args, **kwargs)
+        root = cache_root(self)
+        if root:
+            work_dir = str(self.partial_movie_directory)
+            publish_partials(work_dir, root)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            prune_store(config.max_files_cached, root)
+        return result
+
+    SceneFileWriter.is_already_cached = is_already_cached
+    SceneFileWriter.finish = finish
+
+
+def install_render_cache(enable_cache=None):
+    """
+    Patches ``Scene.render`` to seed the RNGs and wrap ``play_scene_*`` before
+    rendering; with ``enable_cache`` (default: RENDER_CACHE) ``Scene.__init__``
+    re-enables caching before the file writer is built, overriding the
+    script's ``disable_caching``, and shares the partials through the store.
+    Installs the stream encoder if RENDER_STREAM_ENCODER is set.
+    """
+    global _installed
+    if _installed:
+        return
+    from manim import Scene
+
+    enable_cache = RENDER_CACHE if enable_cache is None else enable_cache
+    original_init = Scene.__init__
+    original_render = Scene.render
+
+    @functools.wraps(original_init)
+    def __init__(self, *args, **kwargs):
+        # SceneFileWriter 在构造时确定 partial_movie_files 目录，render() 时再改已经晚了
+        if enable_cache:
+            enable_partial_movie_cache()
+        original_init(self, *args, **kwargs)
+
+    @functools.wraps(original_render)
+    def render(self, *args, **kwargs):
+        make_deterministic(type(self))
+        seed_rngs(scene_seed(type(self).__name__))
+        return original_render(self, *args, **kwargs)
+
+    Scene.__init__ = __init__
+    Scene.render = render
+    if enable_cache:
+        _install_partial_store()
+    _installed = True
+
+    import stream_encoder
+    if stream_encoder.RENDER_STREAM_ENCODER:
+        stream_encoder.install_stream_encoder()
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Fork server: preloads Manim once and forks an isolated child for every render job.
+
+    python render_fork_server.py --socket /tmp/render.sock --size 8
+
+The parent imports Manim, NumPy, Pango/Cairo and the TTS helpers (see
+``render_worker.preload``) and then only accepts jobs. Each job is rendered
+by a forked child that shares the preloaded pages copy-on-write, so it starts
+warm but cannot leak state into later jobs -- a script that patches
+``MathTex.set_font_size`` (08.py) or a Manim class only changes its own copy.
+At most ``size`` children (``RENDER_POOL_SIZE``, default: CPU cores) run at
+once; further jobs wait in order.
+
+Every child runs under ``render_limits.JobLimits`` (server defaults, which
+a job's ``"limits"`` dict can only lower): memory and CPU rlimits and a frame
+cap inside the child, and a wall-clock deadline enforced here by killing the
+child's process group, LaTeX and ffmpeg included. A job can also be
+cancelled with ``{"cancel": "<job id>"}``. Killed jobs answer with
+``"ok": false`` and an error naming the limit.
+
+The protocol is the same as ``render_worker --socket``: one JSON job line per
+connection, answered with one JSON result line. Jobs with ``"progress": true``
+(and optionally ``"planned_duration"``) first receive ``{"progress": {...}}``
+lines with ``render_progress`` events.
+
+    from render_fork_server import submit
+    result = submit("/tmp/render.sock", {"id": "a1", "code": code, "cwd": "/data/jobs/a1"},
+                    on_progress=print)
+"""
+import argparse
+import collections
+import contextlib
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from render_limits import JobLimits, apply_process_limits, kill_process_group, limit_frames
+from render_progress import track_progress
+from render_worker import preload, run_job
+
+RENDER_POOL_SIZE = int(os.environ.get("RENDER_POOL_SIZE", 0)) or os.cpu_count() or 1
+# 客户端连上后发送任务的超时时间
+READ_TIMEOUT = 30
+# 任务行（含脚本代码）的大小上限
+MAX_JOB_BYTES = 16 * 1024 * 1024
+
+
+def submit(socket_path, job, timeout=None, on_progress=None):
+    """
+    Sends ``job`` to a fork server (or a socket render worker) and returns its
+    result dict; progress events are passed to ``on_progress`` as they arrive.
+    """
+    if on_progress is not None:
+        job = dict(job, progress=True)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        with client.makefile("rw", encoding="utf-8") as stream:
+            stream.write(json.dumps(job, ensure_ascii=False) + "\n")
+            stream.flush()
+            for line in stream:
+                message = json.loads(line)
+                if "progress" not in message:
+                    return message
+                if on_progress is not None:
+                    on_progress(message["progress"])
+    raise RuntimeError("Render server closed the connection without a result")
+
+
+class _Request:
+    """A client connection whose job line has not fully arrived yet."""
+
+    def __init__(self, connection, deadline):
+        self.connection = connection
+        self.deadline = deadline
+        self.data = bytearray()
+
+
+class _Child:
+    def __init__(self, pid, job, connection, pipe, started, limits):
+        self.pid = pid
+        self.job = job
+        self.connection = connection
+        self.pipe = pipe
+        self.started = started
+        self.limits = limits
+        self.deadline = started + limits.wall_time if limits.wall_time else None
+        self.killed = None
+        self.data = bytearray()
+        self.result = None
+
+    def kill(self, reason):
+        if self.killed is None:
+            self.killed = reason
+            # 子进程是进程组组长，LaTeX、ffmpeg 等子进程一起终止
+            kill_process_group(self.pid)
+
+
+class ForkServer:
+    """Single-threaded accept loop; the parent never renders and never starts threads, so forking is safe."""
+
+    def __init__(self, socket_path, size=None, limits=None):
+        self.socket_path = socket_path
+        self.size = size or RENDER_POOL_SIZE
+        self.limits = limits or JobLimits.from_env()
+        self.selector = selectors.DefaultSelector()
+        self.pending = collections.deque()
+        self.requests = set()
+        self.children = {}
+        self.server = None
+
+    def serve_forever(self):
+        print(f"Preloaded render stack in {preload():.1f}s", file=sys.stderr)
+        self.listen()
+        print(f"Fork server {os.getpid()} listening on {self.socket_path} with {self.size} slots",
+              file=sys.stderr)
+        try:
+            while True:
+                self.handle_events()
+        finally:
+            self.server.close()
+            os.remove(self.socket_path)
+
+    def listen(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(128)
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ)
+
+    def handle_events(self, timeout=None):
+        """Handles one round of new connections, job lines and child output, then the deadlines."""
+        select_timeout = self._select_timeout()
+        if timeout is not None:
+            select_timeout = timeout if select_timeout is None else min(timeout, select_timeout)
+        for key, _ in self.selector.select(select_timeout):
+            if key.fileobj is self.server:
+                self._accept()
+            elif isinstance(key.data, _Request):
+                self._read_request(key.data)
+            else:
+                self._read_child(key.data)
+        self._enforce_deadlines()
+
+    def _accept(self):
+        try:
+            connection, _ = self.server.accept()
+        except BlockingIOError:
+            return
+        # 任务行也经 selector 非阻塞读取，发送缓慢的客户端不会卡住其他连接和超时检查
+        connection.setblocking(False)
+        request = _Request(connection, time.time() + READ_TIMEOUT)
+        self.requests.add(request)
+        self.selector.register(connection, selectors.EVENT_READ, request)
+
+    def _read_request(self, request):
+        try:
+            chunk = request.connection.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._drop_request(request)
+            self._reply(request.connection, {"ok": False, "error": f"Invalid job: {e}"})
+            return
+        request.data += chunk
+        if chunk and b"\n" not in request.data and len(request.data) <= MAX_JOB_BYTES:
+            return
+        self._drop_request(request)
+        connection = request.connection
+        # 之后只写进度和结果，恢复为带超时的阻塞写
+        connection.settimeout(READ_TIMEOUT)
+        line, newline, _ = bytes(request.data).partition(b"\n")
+        if not newline and len(line) > MAX_JOB_BYTES:
+            self._reply(connection, {"ok": False, "error": f"Invalid job: larger than {MAX_JOB_BYTES} bytes"})
+            return
+        try:
+            job = json.loads(line.decode("utf-8"))
+        except ValueError as e:
+            self._reply(connection, {"ok": False, "error": f"Invalid job: {e}"})
+            return
+        if "cancel" in job:
+            self._reply(connection, {"ok": True, "cancelled": self.cancel(job["cancel"])})
+            return
+        try:
+            # 任务只能收紧服务端的限制，不能放宽或取消
+            self.limits.restricted(job.get("limits"))
+        except (AttributeError, ValueError) as e:
+            self._reply(connection, {"id": job.get("id"), "ok": False, "error": f"Invalid limits: {e}"})
+            return
+        self.pending.append((job, connection))
+        self._start_pending()
+
+    def cancel(self, job_id):
+        """Kills the running job ``job_id`` or drops it from the queue; returns whether it was found."""
+        for child in self.children.values():
+            if child.job.get("id") == job_id:
+                child.kill("Render cancelled")
+                return True
+        for job, connection in list(self.pending):
+            if job.get("id") == job_id:
+                self.pending.remove((job, connection))
+                self._reply(connection, {"id": job_id, "ok": False, "error": "Render cancelled before it started"})
+                return True
+        return False
+
+    def _drop_request(self, request):
+        self.selector.unregister(request.connection)
+        self.requests.discard(request)
+
+    def _select_timeout(self):
+        deadlines = [child.deadline for child in self.children.values() if child.deadline and not child.killed]
+        deadlines += [request.deadline for request in self.requests]
+        return max(0.0, min(deadlines) - time.time()) if deadlines else None
+
+    def _enforce_deadlines(self):
+        now = time.time()
+        for request in list(self.requests):
+            if now >= request.deadline:
+                self._drop_request(request)
+                request.connection.settimeout(READ_TIMEOUT)
+                self._reply(request.connection,
+                            {"ok": False, "error": f"Invalid job: no job line within {READ_TIMEOUT}s"})
+        for child in self.children.values():
+            if child.deadline and now >= child.deadline:
+                child.kill(f"Render exceeded the limit of {child.limits.describe('wall_time')}")
+
+    def _start_pending(self):
+        while self.pending and len(self.children) < self.size:
+            job, connection = self.pending.popleft()
+            limits = self.limits.restricted(job.get("limits"))
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                self._run_child(job, limits, write_fd)
+            # 子进程里也会调用 setpgrp；父进程先设置，保证立即取消时进程组已存在
+            try:
+                os.setpgid(pid, pid)
+            except OSError:
+                pass
+            os.close(write_fd)
+            pipe = os.fdopen(read_fd, "rb", buffering=0)
+            child = _Child(pid, job, connection, pipe, time.time(), limits)
+            self.children[pid] = child
+            self.selector.register(pipe, selectors.EVENT_READ, child)
+
+    def _run_child(self, job, limits, write_fd):
+        """Runs in the forked child: renders the job, writes the result to the pipe and exits."""
+        status = 0
+        pipe = os.fdopen(write_fd, "wb")
+        try:
+            # 子进程不持有父进程的监听 socket、其他客户端连接和结果管道
+            self.server.close()
+            for child in self.children.values():
+                child.pipe.close()
+                child.connection.close()
+            for _, connection in self.pending:
+                connection.close()
+            for request in self.requests:
+                request.connection.close()
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            apply_process_limits(limits)
+
+            def send_progress(event):
+                pipe.write((json.dumps({"progress": event}) + "\n").encode("utf-8"))
+                pipe.flush()
+
+            progress = (track_progress(send_progress, job.get("planned_duration")) if job.get("progress")
+                        else contextlib.nullcontext())
+            with limit_frames(limits.max_frames), progress as reporter:
+                result = run_job(job, before_render=reporter.before_render if reporter else None)
+            if result.get("error", "").startswith("MemoryError"):
+                result["error"] += f" (limit: {limits.describe('memory_mb')})"
+            result["pid"] = os.getpid()
+            data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        except BaseException as e:
+            status = 1
+            data = json.dumps({"id": job.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}",
+                               "traceback": traceback.format_exc()}).encode("utf-8")
+        try:
+            pipe.write(data + b"\n")
+            pipe.flush()
+        finally:
+            os._exit(status)
+
+    def _read_child(self, child):
+        chunk = child.pipe.read(65536)
+        if chunk:
+            child.data += chunk
+            # 进度事件逐行转发，最后一行是结果
+            while b"\n" in child.data:
+                line, _, rest = child.data.partition(b"\n")
+                child.data = bytearray(rest)
+                self._child_line(child, bytes(line))
+            return
+        self.selector.unregister(child.pipe)
+        child.pipe.close()
+        _, status = os.waitpid(child.pid, 0)
+        del self.children[child.pid]
+        # 渲染进程退出后残留的 LaTeX/ffmpeg 进程
+        kill_process_group(child.pid)
+        result = child.result
+        if result is None:
+            result = {"id": child.job.get("id"), "ok": False,
+                      "error": f"Render process {child.pid} died ({self._describe(status, child.limits)})"}
+        if child.killed:
+            result = {"id": child.job.get("id"), "ok": False, "error": child.killed}
+        result["wall_time"] = round(time.time() - child.started, 3)
+        self._reply(child.connection, result)
+        self._start_pending()
+
+    @staticmethod
+    def _child_line(child, line):
+        try:
+            message = json.loads(line.decode("utf-8"))
+        except ValueError:
+            return
+        if "progress" not in message:
+            child.result = message
+            return
+        try:
+            child.connection.sendall(line + b"\n")
+        except OSError:
+            pass
+
+    @staticmethod
+    def _describe(status, limits):
+        if os.WIFSIGNALED(status):
+            if os.WTERMSIG(status) == signal.SIGXCPU:
+                return f"exceeded the limit of {limits.describe('cpu_time')}"
+            return f"signal {os.WTERMSIG(status)}"
+        return f"exit status {os.WEXITSTATUS(status)}"
+
+    @staticmethod
+    def _reply(connection, result):
+        try:
+            connection.sendall((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/render.sock")
+    parser.add_argument("--size", type=int, default=None, help="concurrent renders; default: RENDER_POOL_SIZE or CPU cores")
+    parser.add_argument("--timeout", type=int, default=None, help="wall-clock seconds per job (0: unlimited)")
+    parser.add_argument("--max-memory-mb", type=int, default=None)
+    parser.add_argument("--max-cpu-seconds", type=int, default=None)
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args()
+
+    overrides = {"wall_time": args.timeout, "memory_mb": args.max_memory_mb,
+                 "cpu_time": args.max_cpu_seconds, "max_frames": args.max_frames}
+    limits = JobLimits.from_env().merged({name: value for name, value in overrides.items() if value is not None})
+    ForkServer(os.path.abspath(args.socket), args.size, limits).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Per-job resource limits for renders of generated code.
+
+A generated script that loops in an ``always_redraw`` updater or asks for a
+``run_time`` of hours should fail on its own instead of holding a core for
+everyone else. ``JobLimits`` holds four caps (0 disables one):
+
+* ``wall_time``: seconds from start to result, enforced by the parent, which
+  kills the job's whole process group -- the render and its LaTeX and
+  ffmpeg children;
+* ``memory_mb``: address space (``RLIMIT_AS``) of the render process and
+  each of its children, so a runaway allocation raises ``MemoryError``;
+* ``cpu_time``: CPU seconds (``RLIMIT_CPU``); the kernel stops the process
+  with ``SIGXCPU``;
+* ``max_frames``: frames planned across all ``play``/``wait`` calls, checked
+  before each animation is rendered.
+
+Defaults come from ``RENDER_JOB_TIMEOUT``, ``RENDER_JOB_MAX_MEMORY_MB``,
+``RENDER_JOB_MAX_CPU_SECONDS`` and ``RENDER_JOB_MAX_FRAMES``.
+"""
+import contextlib
+import os
+import resource
+import signal
+
+RENDER_JOB_TIMEOUT = int(os.environ.get("RENDER_JOB_TIMEOUT", 1800))
+RENDER_JOB_MAX_MEMORY_MB = int(os.environ.get("RENDER_JOB_MAX_MEMORY_MB", 4096))
+RENDER_JOB_MAX_CPU_SECONDS = int(os.environ.get("RENDER_JOB_MAX_CPU_SECONDS", 3600))
+# 30 fps 下约 20 分钟的视频
+RENDER_JOB_MAX_FRAMES = int(os.environ.get("RENDER_JOB_MAX_FRAMES", 36000))
+
+# 超出 CPU 软限制后，到硬限制前还允许运行的秒数（用于写出结果）
+CPU_GRACE_SECONDS = 5
+
+LIMIT_NAMES = ("wall_time", "memory_mb", "cpu_time", "max_frames")
+
+
+class FrameLimitExceeded(RuntimeError):
+    pass
+
+
+class JobLimits:
+    """Resource caps of one render job; 0 or None means unlimited."""
+
+    def __init__(self, wall_time=None, memory_mb=None, cpu_time=None, max_frames=None):
+        self.wall_time = wall_time or 0
+        self.memory_mb = memory_mb or 0
+        self.cpu_time = cpu_time or 0
+        self.max_frames = max_frames or 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(RENDER_JOB_TIMEOUT, RENDER_JOB_MAX_MEMORY_MB, RENDER_JOB_MAX_CPU_SECONDS, RENDER_JOB_MAX_FRAMES)
+
+    def merged(self, overrides):
+        """Returns a copy with the values of the ``overrides`` dict (e.g. a job's ``limits``) applied."""
+        values = self.to_dict()
+        values.update({name: overrides[name] for name in LIMIT_NAMES if overrides and name in overrides})
+        return JobLimits(**values)
+
+    def restricted(self, overrides):
+        """
+        Returns a copy with a job's ``limits`` applied, which may only lower
+        these caps. Raises ValueError for unknown names and for values that
+        are not positive integers (0 would mean unlimited).
+        """
+        values = self.to_dict()
+        for name, value in (overrides or {}).items():
+            if name not in LIMIT_NAMES:
+                raise ValueError(f"Unknown limit {name!r}, expected one of {list(LIMIT_NAMES)}")
+            if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                raise ValueError(f"Limit {name} must be a positive integer, got {value!r}")
+            values[name] = min(values[name], value) if values[name] else value
+        return JobLimits(**values)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in LIMIT_NAMES}
+
+    def describe(self, name):
+        units = {"wall_time": "s wall-clock", "memory_mb": " MB of memory", "cpu_time": "s CPU time",
+                 "max_frames": " frames"}
+        return f"{getattr(self, name)}{units[name]}"
+
+
+def apply_process_limits(limits):
+    """
+    Called in the forked render process: makes it a process group leader, so
+    the parent can kill it together with its LaTeX/ffmpeg children, and sets
+    the memory and CPU rlimits, which those children inherit.
+    """
+    os.setpgrp()
+    if limits.memory_mb:
+        size = limits.memory_mb * 1024 * 1024
+        _set_rlimit(resource.RLIMIT_AS, size, size)
+    if limits.cpu_time:
+        _set_rlimit(resource.RLIMIT_CPU, limits.cpu_time, limits.cpu_time + CPU_GRACE_SECONDS)
+
+
+def _set_rlimit(kind, soft, hard):
+    # 不能超过已有的硬限制
+    _, current_hard = resource.getrlimit(kind)
+    if current_hard != resource.RLIM_INFINITY:
+        soft, hard = min(soft, current_hard), min(hard, current_hard)
+    resource.setrlimit(kind, (soft, hard))
+
+
+@contextlib.contextmanager
+def limit_frames(max_frames):
+    """Raises FrameLimitExceeded before an animation would push the planned frame count past ``max_frames``."""
+    if not max_frames:
+        yield
+        return
+    from manim import Scene, config
+
+    original_compile = Scene.compile_animation_data
+    planned = [0.0]
+
+    # 每次 play()/wait() 只调用一次 compile_animation_data；get_run_time 在渲染时还会再调用一次
+    def compile_animation_data(self, *args, **kwargs):
+        result = original_compile(self, *args, **kwargs)
+        planned[0] += self.duration * config.frame_rate
+        if planned[0] > max_frames:
+            raise FrameLimitExceeded(
+                f"The animations ask for {int(planned[0])} frames, more than the limit of {max_frames} "
+                f"(run_time {self.duration:.1f}s at {config.frame_rate} fps)")
+        return result
+
+    Scene.compile_animation_data = compile_animation_data
+    try:
+        yield
+    finally:
+        Scene.compile_animation_data = original_compile
+
+
+def kill_process_group(pgid, sig=signal.SIGKILL):
+    """Kills every process of the group; returns False if none was left."""
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
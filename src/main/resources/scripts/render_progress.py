@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Frame-level progress events of a render.
+
+    python render_progress.py 08.py [--plan] [--interval 1]
+    {"event": "progress", "scene": "play_scene_03", "scene_index": 3, "scene_count": 8, "animation": 17,
+     "frames": 1234, "total_frames": 2890, "elapsed": 41.2, "eta": 55.1, "idle": 0.0}
+    ...
+    {"event": "done", "movie": ".../CombinedScene.mp4", "elapsed": 97.3}
+
+``track_progress(callback)`` hooks a render: ``play_scene_*`` methods mark
+the current scene, every ``play``/``wait`` (``Scene.compile_animation_data``) bumps the
+animation index and the frames it plans, and every frame handed to the
+``SceneFileWriter`` counts as written. Events go to ``callback`` at most once
+per ``interval`` (plus one per scene change), and a heartbeat repeats the
+last state while nothing moves, so ``idle`` grows on a stalled render.
+
+``total_frames`` is only known when the duration of the video is
+(``planned_duration``, e.g. from ``dry_run.py``; ``--plan`` runs it first);
+the ETA then follows the frame rate so far. Otherwise the ETA is estimated
+from the share of ``play_scene_*`` methods finished.
+
+The same events are available as JSON lines from this command, through
+``render_fork_server`` jobs with ``"progress": true`` and as a chunked
+response of ``render_service`` (``POST /manim/start?stream=1``).
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from script_runner import movie_path, run_script
+
+RENDER_PROGRESS_INTERVAL = float(os.environ.get("RENDER_PROGRESS_INTERVAL", 1.0))
+SCENE_METHOD_PREFIX = "play_scene"
+DEFAULT_SCENE = "CombinedScene"
+
+
+class ProgressReporter:
+    """Counts scenes, animations and frames of one render and reports them through ``callback``."""
+
+    def __init__(self, callback, planned_duration=None, interval=None):
+        self.callback = callback
+        self.planned_duration = planned_duration
+        self.interval = interval or RENDER_PROGRESS_INTERVAL
+        self.scene = None
+        self.scene_index = 0
+        self.scene_count = 0
+        self.animation = 0
+        self.frames = 0
+        self.planned_frames = 0
+        self.total_frames = None
+        self.started = time.time()
+        self.last_frame = self.started
+        self.last_emit = 0.0
+        self._lock = threading.Lock()
+        # 渲染线程和心跳线程都会发事件，回调串行执行
+        self._callback_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = None
+
+    def before_render(self, scene):
+        """``run_script`` hook: wraps the scene methods and starts the heartbeat."""
+        from manim import config
+
+        scene_class = type(scene)
+        names = [name for name in dir(scene_class) if name.startswith(SCENE_METHOD_PREFIX)]
+        self.scene_count = len(names)
+        if self.planned_duration:
+            self.total_frames = int(round(self.planned_duration * config.frame_rate))
+        for name in names:
+            method = getattr(scene_class, name)
+            if callable(method) and not getattr(method, "_progress_tracked", False):
+                setattr(scene_class, name, self._wrap_scene(method, name))
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+            self._heartbeat.start()
+
+    def _wrap_scene(self, method, name):
+        reporter = self
+
+        def wrapper(*args, **kwargs):
+            reporter.scene_started(name)
+            return method(*args, **kwargs)
+
+        wrapper.__name__ = name
+        wrapper._progress_tracked = True
+        return wrapper
+
+    def scene_started(self, name):
+        with self._lock:
+            self.scene = name
+            self.scene_index += 1
+        self.emit(force=True)
+
+    def animation_started(self, run_time, frame_rate):
+        with self._lock:
+            self.animation += 1
+            self.planned_frames += int(round(run_time * frame_rate))
+        self.emit()
+
+    def frame_written(self, count=1):
+        with self._lock:
+            self.frames += count
+            self.last_frame = time.time()
+        if self.last_frame - self.last_emit >= self.interval:
+            self.emit()
+
+    def snapshot(self):
+        now = time.time()
+        elapsed = now - self.started
+        eta = None
+        if self.total_frames and self.frames:
+            eta = max(0.0, (self.total_frames - self.frames) * elapsed / self.frames)
+        elif self.scene_count and self.scene_index > 1:
+            done = (self.scene_index - 1) / self.scene_count
+            eta = elapsed * (1 - done) / done
+        return {
+            "event": "progress",
+            "scene": self.scene,
+            "scene_index": self.scene_index,
+            "scene_count": self.scene_count,
+            "animation": self.animation,
+            "frames": self.frames,
+            "planned_frames": self.planned_frames,
+            "total_frames": self.total_frames,
+            "elapsed": round(elapsed, 3),
+            "eta": None if eta is None else round(eta, 1),
+            "idle": round(now - self.last_frame, 1),
+        }
+
+    def emit(self, force=False):
+        with self._lock:
+            now = time.time()
+            if not force and now - self.last_emit < self.interval:
+                return
+            self.last_emit = now
+            event = self.snapshot()
+        with self._callback_lock:
+            try:
+                self.callback(event)
+            except Exception:
+                pass
+
+    def _beat(self):
+        while not self._stopped.wait(self.interval):
+            if time.time() - self.last_emit >= self.interval:
+                self.emit()
+
+    def close(self):
+        self._stopped.set()
+
+
+@contextlib.contextmanager
+def track_progress(callback, planned_duration=None, interval=None):
+    """
+    Installs the frame and animation hooks for the duration of the block and
+    yields the reporter; pass ``reporter.before_render`` to ``run_script``.
+    """
+    from manim import Scene, config
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    reporter = ProgressReporter(callback, planned_duration, interval)
+    original_compile = Scene.compile_animation_data
+    original_write_frame = SceneFileWriter.write_frame
+
+    # 每次 play()/wait() 只编译一次；get_run_time 在渲染时还会再调用一次，不能用来计数
+    def compile_animation_data(self, *args, **kwargs):
+        result = original_compile(self, *args, **kwargs)
+        reporter.animation_started(self.duration, config.frame_rate)
+        return result
+
+    def write_frame(self, frame_or_renderer, num_frames=1, *args, **kwargs):
+        result = original_write_frame(self, frame_or_renderer, num_frames, *args, **kwargs)
+        # wait() 和静止的动画只写一次帧，num_frames 是重复的次数
+        reporter.frame_written(num_frames)
+        return result
+
+    Scene.compile_animation_data = compile_animation_data
+    SceneFileWriter.write_frame = write_frame
+    try:
+        yield reporter
+    finally:
+        Scene.compile_animation_data = original_compile
+        SceneFileWriter.write_frame = original_write_frame
+        reporter.close()
+
+
+def planned_duration(script_path, scene_name=DEFAULT_SCENE):
+    """Runs ``dry_run.py`` on the script in a subprocess and returns the video duration, or None."""
+    completed = subprocess.run(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "dry_run.py"),
+         os.path.abspath(script_path), "--scene", scene_name],
+        capture_output=True, text=True,
+    )
+    try:
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+    return result.get("duration") if result.get("ok") else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("script")
+    parser.add_argument("--scene", default=DEFAULT_SCENE)
+    parser.add_argument("--plan", action="store_true", help="dry-run the script first to know the total frames")
+    parser.add_argument("--interval", type=float, default=None, help="seconds between events (default: 1)")
+    args = parser.parse_args()
+
+    # 事件独占 stdout，脚本和 Manim 的输出改写到 stderr
+    events = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    def send(event):
+        events.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    duration = planned_duration(args.script, args.scene) if args.plan else None
+    movies = []
+    start = time.time()
+    try:
+        with track_progress(send, duration, args.interval) as reporter:
+            run_script(args.script, reporter.before_render, lambda scene: movies.append(movie_path(scene)),
+                       scene_name=args.scene)
+    except Exception as e:
+        send({"event": "failed", "error": f"{type(e).__name__}: {e}", "elapsed": round(time.time() - start, 3)})
+        sys.exit(1)
+    send({"event": "done", "movie": movies[-1] if movies else None, "elapsed": round(time.time() - start, 3)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Finished-video cache keyed on the normalized form of a generated script.
+
+The LLM often produces the same script for differently phrased topics, or
+the same script with other comments, blank lines or indentation of
+continuation lines. ``render_key`` hashes what actually decides the video:
+
+* ``ast.dump`` of the script, which drops comments and formatting, with the
+  ``#(output_path)`` / ``#(output_video)`` placeholders emptied first (their
+  values differ per task);
+* the render options that are not in the script: the quality preset and the
+  TTS voice.
+
+``ResultCache`` maps keys to finished videos with one small JSON file per
+key (``results/ab/cd/<key>.json``), written atomically so several services
+can share the directory. An entry whose video has been deleted is a miss.
+
+    cache = ResultCache("/data/render")
+    key = render_key(code, quality="full", voice="openai/alloy")
+    hit = cache.get(key)            # {"output": "/cache/<taskId>/.../CombinedScene.mp4", ...} or None
+"""
+import ast
+import hashlib
+import json
+import os
+import time
+
+PLACEHOLDERS = ("#(output_path)", "#(output_video)")
+RESULTS_DIR = "results"
+
+
+def normalize_code(code):
+    """Returns the placeholder-free AST dump of ``code``, or None if it does not parse."""
+    for placeholder in PLACEHOLDERS:
+        code = code.replace(placeholder, "")
+    try:
+        return ast.dump(ast.parse(code))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def render_key(code, quality=None, voice=None):
+    """Returns the cache key of rendering ``code`` with these options, or None if it cannot be cached."""
+    normalized = normalize_code(code)
+    if normalized is None:
+        return None
+    options = json.dumps({"quality": quality or "", "voice": voice or ""}, sort_keys=True)
+    return hashlib.sha256(f"{options}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Finished videos under ``root`` by render key."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, RESULTS_DIR, key[:2], key[2:4], f"{key}.json")
+
+    def get(self, key):
+        """Returns the stored entry for ``key`` if its video still exists, else None."""
+        if not key:
+            return None
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(entry.get("movie", "")):
+            return None
+        return entry
+
+    def put(self, key, movie, output, task_id=None):
+        """Records that ``key`` rendered to ``movie``, served as ``output``."""
+        if not key:
+            return
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"movie": movie, "output": output, "taskId": task_id, "created_at": time.time()}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP render service for the ``LinuxClient.executeMainmCode`` contract.
+
+    python render_service.py --root /data/render --port 8080 --key 123456
+    POST /manim/start      body: the generated script (text/plain, or JSON {"code": ...,
+                           "quality": "preview", "voice_provider": ..., "voice_id": ...,
+                           "planned_duration": 96.4})
+    {"taskId": "...", "exitCode": 0, "output": "/cache/<taskId>/videos/.../CombinedScene.mp4",
+     "stdOut": "...", "stdErr": "", "elapsed": 41.2, "cached": false}
+
+The script is saved as ``<taskId>.py`` in ``--root`` and its
+``#(output_path)`` / ``#(output_video)`` placeholders are replaced with the
+task directory ``cache/<taskId>``, so the script's ``media_dir`` ends up
+there. Narration is cached once for all tasks in ``--root/tts_cache``
+(``TTS_CACHE_DIR``), not in the per-task directory the script names. Jobs
+are rendered by a ``render_fork_server`` child process (warm, isolated per
+job); at most ``--concurrency`` run at once, derived by default from the CPU
+cores and the memory (``RENDER_JOB_MEMORY_MB`` per job). ``output`` is the
+video's URL path on this server, which also serves the files (``GET
+/cache/...``), so the service can stand in for the remote runner as both
+``apiBase`` and ``video_server_name``. On failure ``output`` is empty and
+``stdErr`` carries the error and traceback for ``fixCodeAndRerun``.
+
+Finished videos are remembered by ``render_result_cache.render_key`` (the
+normalized script plus quality and voice): an equivalent script returns the
+existing video at once with ``"cached": true``. Requests for a key that is
+still rendering wait for that render instead of starting another one and get
+its result with ``"coalesced": true``.
+
+Each render runs under the fork server's ``render_limits`` (wall-clock,
+memory, CPU time, frame count; see ``RENDER_JOB_*``); ``POST /manim/cancel``
+with ``{"taskId": ...}`` stops a queued or running render.
+
+With ``?stream=1`` the response is chunked JSON lines: ``render_progress``
+events (``{"event": "progress", "scene": ..., "frames": ..., "eta": ...}``)
+while the video renders, then the result above with ``"event": "result"``.
+Requests coalesced onto a running render receive its events too.
+
+``GET /health`` reports the slots, running and queued jobs for load balancers.
+
+The service listens on 127.0.0.1 by default. It runs whatever code it is
+sent, so binding another address requires ``--key`` (or
+``RENDER_SERVICE_KEY``).
+"""
+import argparse
+import ipaddress
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from render_fork_server import submit
+from render_result_cache import PLACEHOLDERS, ResultCache, render_key
+
+START_PATH = "/manim/start"
+CANCEL_PATH = "/manim/cancel"
+HEALTH_PATH = "/health"
+TASK_DIR = "cache"
+TTS_CACHE_DIR = "tts_cache"
+RENDER_JOB_MEMORY_MB = int(os.environ.get("RENDER_JOB_MEMORY_MB", 2048))
+RENDER_SERVICE_MAX_QUEUE = int(os.environ.get("RENDER_SERVICE_MAX_QUEUE", 100))
+MAX_CODE_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 65536
+
+
+def total_memory_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_concurrency(job_memory_mb=None):
+    """One render per core, but no more than the memory can hold at ``job_memory_mb`` each."""
+    slots = os.cpu_count() or 1
+    memory = total_memory_mb()
+    if memory:
+        slots = min(slots, int(memory // (job_memory_mb or RENDER_JOB_MEMORY_MB)))
+    return max(1, slots)
+
+
+def fill_placeholders(code, output_path):
+    for placeholder in PLACEHOLDERS:
+        code = code.replace(placeholder, output_path)
+    return code
+
+
+class ServiceFull(Exception):
+    pass
+
+
+class _Flight(Future):
+    """A render in progress: its result plus everyone who wants its progress events."""
+
+    def __init__(self):
+        super().__init__()
+        self.listeners = []
+        self._listeners_lock = threading.Lock()
+
+    def subscribe(self, listener):
+        if listener is not None:
+            with self._listeners_lock:
+                self.listeners.append(listener)
+
+    def publish(self, event):
+        with self._listeners_lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                pass
+
+
+class RenderService:
+    """Runs generated scripts on a fork server and turns the results into ProcessResult dicts."""
+
+    def __init__(self, root, concurrency=None, max_queue=None):
+        self.root = os.path.abspath(root)
+        self.results = ResultCache(self.root)
+        self.concurrency = concurrency or default_concurrency()
+        self.max_queue = max_queue or RENDER_SERVICE_MAX_QUEUE
+        self.socket_path = os.path.join(tempfile.mkdtemp(prefix="render_service_"), "render.sock")
+        self.process = None
+        self.running = 0
+        self.queued = 0
+        self.coalesced = 0
+        # 正在渲染的 render_key -> Future，相同的请求等待同一次渲染
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def start(self, timeout=300):
+        """Starts the fork server and waits until it has preloaded Manim."""
+        os.makedirs(os.path.join(self.root, TASK_DIR), exist_ok=True)
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ)
+        # 所有任务共用一个 TTS 缓存（可用 tts_warmup.py 预热），脚本里按任务设置的缓存目录不生效
+        env.setdefault("TTS_CACHE_DIR", os.path.join(self.root, TTS_CACHE_DIR))
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(script_dir, "render_fork_server.py"),
+             "--socket", self.socket_path, "--size", str(self.concurrency)],
+            cwd=script_dir, env=env,
+        )
+        deadline = time.time() + timeout
+        while not os.path.exists(self.socket_path):
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Fork server exited with status {self.process.returncode}")
+            if time.time() > deadline:
+                raise RuntimeError("Fork server did not start in time")
+            time.sleep(0.1)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+    def status(self):
+        with self._lock:
+            return {"slots": self.concurrency, "running": self.running, "queued": self.queued,
+                    "inflight": len(self._inflight), "coalesced": self.coalesced}
+
+    def execute(self, code, task_id=None, quality=None, voice_provider=None, voice_id=None, on_progress=None,
+                planned_duration=None):
+        """
+        Renders ``code`` (or finds an equivalent finished render) and returns
+        ``{"taskId", "exitCode", "output", "stdOut", "stdErr", "elapsed", "cached", "coalesced"}``.
+        ``on_progress(event)`` receives the render's progress events; with the
+        video's ``planned_duration`` (from ``dry_run.py``) they include total frames.
+        """
+        start = time.time()
+        voice_provider = voice_provider or os.environ.get("TTS_VOICE_PROVIDER")
+        voice_id = voice_id or os.environ.get("TTS_VOICE_ID")
+        key = render_key(code, quality, f"{voice_provider or ''}/{voice_id or ''}")
+        hit = self.results.get(key)
+        if hit:
+            return {"taskId": hit.get("taskId"), "exitCode": 0, "output": hit["output"], "stdOut": "",
+                    "stdErr": "", "elapsed": round(time.time() - start, 3), "cached": True, "coalesced": False}
+
+        with self._lock:
+            flight = self._inflight.get(key) if key else None
+            leader = flight is None
+            if leader and key:
+                flight = self._inflight[key] = _Flight()
+            elif not leader:
+                self.coalesced += 1
+            if flight is not None:
+                flight.subscribe(on_progress)
+        if not leader:
+            return dict(flight.result(), elapsed=round(time.time() - start, 3), coalesced=True)
+        publish = flight.publish if flight is not None else on_progress
+        try:
+            process_result = self._render(code, key, task_id, quality, voice_provider, voice_id, start, publish,
+                                          planned_duration)
+            if flight is not None:
+                flight.set_result(process_result)
+            return process_result
+        except BaseException as e:
+            if flight is not None:
+                flight.set_exception(e)
+            raise
+        finally:
+            if flight is not None:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def cancel(self, task_id):
+        """Cancels the queued or running render ``task_id``; returns whether it was found."""
+        try:
+            return submit(self.socket_path, {"cancel": task_id}).get("cancelled", False)
+        except (OSError, RuntimeError):
+            return False
+
+    def _render(self, code, key, task_id, quality, voice_provider, voice_id, start, on_progress=None,
+                planned_duration=None):
+        task_id = task_id or uuid.uuid4().hex
+        output_path = f"{TASK_DIR}/{task_id}"
+        job = {"id": task_id, "code": fill_placeholders(code, output_path), "cwd": self.root,
+               "filename": f"{task_id}.py", "quality": quality,
+               "voice_provider": voice_provider, "voice_id": voice_id, "planned_duration": planned_duration}
+        os.makedirs(os.path.join(self.root, output_path), exist_ok=True)
+        with self._lock:
+            if self.queued >= self.max_queue:
+                raise ServiceFull(f"{self.queued} jobs already queued")
+            self.queued += 1
+        # 排队在服务内完成，fork server 的并发与 slots 相同
+        with self._slots:
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            try:
+                result = submit(self.socket_path, job, on_progress=on_progress)
+            except (OSError, RuntimeError) as e:
+                result = {"ok": False, "error": f"Render server unavailable: {e}"}
+            finally:
+                with self._lock:
+                    self.running -= 1
+        process_result = self.to_process_result(task_id, result, time.time() - start)
+        if process_result["output"]:
+            movie = os.path.join(self.root, process_result["output"].lstrip("/"))
+            self.results.put(key, movie, process_result["output"], task_id)
+        return process_result
+
+    def to_process_result(self, task_id, result, elapsed):
+        movies = [path for path in result.get("movies") or [] if os.path.exists(path)]
+        output = ""
+        if result.get("ok") and movies:
+            output = "/" + os.path.relpath(movies[-1], self.root).replace(os.sep, "/")
+        std_err = result.get("stderr", "")
+        if not result.get("ok"):
+            std_err = "\n".join(part for part in (std_err, result.get("traceback"), result.get("error")) if part)
+        elif not movies:
+            std_err = "\n".join(part for part in (std_err, "The script finished without rendering a video") if part)
+        return {
+            "taskId": task_id,
+            "exitCode": 0 if output else 1,
+            "output": output,
+            "stdOut": result.get("stdout", ""),
+            "stdErr": std_err,
+            "elapsed": round(elapsed, 3),
+            "cached": False,
+            "coalesced": False,
+        }
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+    key = None
+
+    def _authorized(self):
+        if self.key and self.headers.get("Authorization") != f"Bearer {self.key}":
+            self._send_json(401, {"error": "invalid key"})
+            return False
+        return True
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path not in (START_PATH, CANCEL_PATH):
+            self._send_json(404, {"error": "not found"})
+            return
+        if not self._authorized():
+            return
+        if path == CANCEL_PATH:
+            self._cancel()
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_CODE_BYTES:
+            self._send_json(400, {"error": "invalid Content-Length"})
+            return
+        body = self.rfile.read(length).decode("utf-8")
+        request = {"code": body}
+        if "json" in (self.headers.get("Content-Type") or ""):
+            try:
+                request = json.loads(body)
+                request["code"]
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {"error": "expected a JSON object with 'code'"})
+                return
+        options = {name: request.get(name) for name in ("quality", "voice_provider", "voice_id", "planned_duration")}
+        if parse_qs(urlparse(self.path).query).get("stream", [""])[0] in ("1", "true"):
+            self._stream(request["code"], options)
+            return
+        try:
+            result = self.service.execute(request["code"], **options)
+        except ServiceFull as e:
+            self._send_json(503, {"error": f"Render service is full: {e}"})
+            return
+        self._send_json(200, result)
+
+    def _stream(self, code, options):
+        """Sends progress events and then the result as chunked JSON lines."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        write_lock = threading.Lock()
+        connected = [True]
+
+        def write_line(data):
+            if not connected[0]:
+                return
+            body = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+            with write_lock:
+                try:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(body), body))
+                    self.wfile.flush()
+                except OSError:
+                    # 调用方断开后渲染继续，结果照常进入缓存
+                    connected[0] = False
+
+        try:
+            result = self.service.execute(code, on_progress=write_line, **options)
+        except ServiceFull as e:
+            result = {"exitCode": 1, "output": "", "stdErr": f"Render service is full: {e}"}
+        write_line(dict(result, event="result"))
+        with write_lock:
+            if connected[0]:
+                try:
+                    self.wfile.write(b"0\r\n\r\n")
+                except OSError:
+                    pass
+
+    def _cancel(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            task_id = json.loads(self.rfile.read(length).decode("utf-8"))["taskId"]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": "expected a JSON object with 'taskId'"})
+            return
+        self._send_json(200, {"taskId": task_id, "cancelled": self.service.cancel(task_id)})
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == HEALTH_PATH:
+            self._send_json(200, self.service.status())
+            return
+        self._send_file(path)
+
+    def _send_file(self, path):
+        root = os.path.join(self.service.root, TASK_DIR)
+        file_path = os.path.abspath(os.path.join(self.service.root, unquote(path).lstrip("/")))
+        if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+            self._send_json(404, {"error": "not found"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4" if file_path.endswith(".mp4") else "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(file_path)))
+        self.end_headers()
+        with open(file_path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_loopback(host):
+    """Returns whether binding ``host`` only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def make_server(service, host="127.0.0.1", port=0, key=None):
+    handler = type("ConfiguredRenderHandler", (RenderHandler,), {"service": service, "key": key})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default="render_service")
+    parser.add_argument("--host", default="127.0.0.1", help="other than loopback only with --key")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--key", default=os.environ.get("RENDER_SERVICE_KEY"),
+                        help="require 'Authorization: Bearer <key>' (default: RENDER_SERVICE_KEY)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="concurrent renders; default: min(CPU cores, memory / RENDER_JOB_MEMORY_MB)")
+    args = parser.parse_args()
+    # 服务会执行收到的任意代码，对外监听时必须校验密钥
+    if not args.key and not is_loopback(args.host):
+        parser.error(f"--host {args.host} accepts remote connections; set --key or RENDER_SERVICE_KEY")
+
+    service = RenderService(args.root, args.concurrency)
+    service.start()
+    server = make_server(service, args.host, args.port, args.key)
+    print(f"Render service on http://{args.host}:{args.port}{START_PATH} with {service.concurrency} slots, "
+          f"videos under {service.root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
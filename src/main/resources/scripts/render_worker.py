@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Warm render worker: imports Manim once and renders many scripts in the same interpreter.
+
+    python render_worker.py                       # JSON lines on stdin/stdout
+    python render_worker.py --socket /tmp/render.sock
+
+A cold ``python 08.py`` spends seconds on ``from manim import *``, MoviePy,
+requests and the font scan before it draws anything. The worker pays for
+that once (``preload``) and then runs jobs one at a time:
+
+    {"id": "a1", "code": "...", "cwd": "/data/jobs/a1"}        # or "script": "/path/08.py"
+    {"id": "a1", "ok": true, "movies": [".../CombinedScene.mp4"], "elapsed": 41.2,
+     "stdout": "...", "stderr": "...", "recycle": false}
+
+Every job runs as ``__main__`` in a fresh namespace from its own directory,
+with Manim's global ``config`` restored afterwards along with ``Scene.__init__``,
+``Scene.render``, the working directory, ``sys.path``, ``sys.argv``, the
+modules imported from the job directory and the TTS cache directory; the
+job's unfinished narration requests are dropped and its cache pins released. After ``max_jobs`` jobs, or once the resident memory
+passes ``max_rss_mb``, the worker answers with ``"recycle": true`` and exits;
+``WarmWorker`` starts a fresh one for the next job.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+RENDER_WORKER_MAX_JOBS = int(os.environ.get("RENDER_WORKER_MAX_JOBS", 50))
+RENDER_WORKER_MAX_RSS_MB = int(os.environ.get("RENDER_WORKER_MAX_RSS_MB", 3072))
+# 结果里只保留输出的末尾部分
+OUTPUT_TAIL_CHARS = 20000
+
+# 预加载的模块；缺少的可选模块（如 moviepy）直接跳过
+PRELOAD_MODULES = [
+    "numpy",
+    "manim",
+    "manimpango",
+    "moviepy",
+    "requests",
+    "custom_voiceover",
+    "tts_prefetch",
+    "render_cache",
+    "script_runner",
+]
+
+
+def preload():
+    """Imports the render stack and scans the fonts once; returns the seconds it took."""
+    import importlib
+
+    start = time.time()
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    try:
+        import manimpango
+        # 第一次调用会扫描系统字体，之后的 Text/MarkupText 直接使用结果
+        manimpango.list_fonts()
+    except ImportError:
+        pass
+    from render_cache import install_render_cache
+    install_render_cache()
+    return time.time() - start
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _tail(text):
+    return text[-OUTPUT_TAIL_CHARS:]
+
+
+class _Tee(io.TextIOBase):
+    """Captures job output while still writing it to the worker's stderr."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = io.StringIO()
+
+    def write(self, text):
+        self.buffer.write(text)
+        self.stream.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def getvalue(self):
+        return self.buffer.getvalue()
+
+
+def job_script(job):
+    """Returns the script path of ``job``, writing ``code`` into its ``cwd`` first if given."""
+    if job.get("script"):
+        return os.path.abspath(job["script"])
+    cwd = os.path.abspath(job.get("cwd") or os.getcwd())
+    os.makedirs(cwd, exist_ok=True)
+    script_path = os.path.join(cwd, job.get("filename") or "main.py")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(job["code"])
+    return script_path
+
+
+@contextlib.contextmanager
+def isolated_job(script_dir):
+    """Restores the interpreter state a script may change: config, Scene hooks, cwd, paths, modules, TTS cache."""
+    from manim import Scene, tempconfig
+
+    try:
+        import custom_voiceover
+    except ImportError:
+        custom_voiceover = None
+
+    cwd = os.getcwd()
+    path = list(sys.path)
+    argv = list(sys.argv)
+    modules = set(sys.modules)
+    init, render = Scene.__init__, Scene.render
+    cache_dir = custom_voiceover.CACHE_DIR if custom_voiceover else None
+    try:
+        with tempconfig({}):
+            yield
+    finally:
+        # run_script 的钩子只对当前任务有效，否则下一个任务会沿用这次的画质
+        Scene.__init__, Scene.render = init, render
+        if custom_voiceover:
+            # 脚本会用 set_cache_dir 指向自己的任务目录；预取但没用到的旁白不再等待
+            custom_voiceover.CACHE_DIR = cache_dir
+            custom_voiceover.forget_pending()
+            custom_voiceover.release_pins()
+        os.chdir(cwd)
+        sys.path[:] = path
+        sys.argv[:] = argv
+        # 任务目录里的模块下次重新导入，避免读到上一个任务的版本
+        for name in set(sys.modules) - modules:
+            module_file = getattr(sys.modules[name], "__file__", None) or ""
+            if os.path.abspath(module_file).startswith(script_dir + os.sep):
+                del sys.modules[name]
+
+
+@contextlib.contextmanager
+def job_voice(voice_provider=None, voice_id=None):
+    """Sets the default TTS voice for the job and restores the previous one afterwards."""
+    if not voice_provider and not voice_id:
+        yield
+        return
+    import custom_voiceover
+
+    previous = custom_voiceover.TTS_VOICE_PROVIDER, custom_voiceover.TTS_VOICE_ID
+    custom_voiceover.set_voice(voice_provider or previous[0], voice_id or previous[1])
+    try:
+        yield
+    finally:
+        custom_voiceover.set_voice(*previous)
+
+
+def run_job(job, before_render=None, after_render=None):
+    """
+    Runs one job in this interpreter and returns its result dict (``movies``:
+    the videos it rendered). Optional job fields: ``quality`` (a
+    ``quality_ladder.QUALITIES`` preset), ``voice_provider``/``voice_id``.
+    """
+    from quality_ladder import QUALITIES, quality_configure
+    from script_runner import movie_path, run_script
+
+    start = time.time()
+    result = {"id": job.get("id"), "ok": True, "movies": []}
+
+    def record_movie(scene):
+        result["movies"].append(movie_path(scene))
+        if after_render:
+            after_render(scene)
+
+    stdout, stderr = _Tee(sys.stderr), _Tee(sys.stderr)
+    try:
+        if job.get("quality") and job["quality"] not in QUALITIES:
+            raise ValueError(f"Unknown quality {job['quality']!r}, expected one of {sorted(QUALITIES)}")
+        script_path = job_script(job)
+        result["script"] = script_path
+        sys.argv[:] = [script_path] + list(job.get("args", []))
+        with isolated_job(os.path.dirname(script_path)), job_voice(job.get("voice_provider"), job.get("voice_id")), \
+                contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            # 分辨率要在 Scene 构造前设置，render() 时 Camera 已经按脚本的配置建好
+            run_script(script_path, before_render, record_movie, scene_name=job.get("scene"),
+                       configure=quality_configure(job.get("quality") or "full", rename=False))
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            result.update(ok=False, error=f"SystemExit: {e.code}")
+    except Exception as e:
+        result.update(ok=False, error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result.update(elapsed=round(time.time() - start, 3), stdout=_tail(stdout.getvalue()),
+                  stderr=_tail(stderr.getvalue()))
+    return result
+
+
+class Worker:
+    """Runs jobs sequentially and decides when the process should be recycled."""
+
+    def __init__(self, max_jobs=None, max_rss_mb=None):
+        self.max_jobs = max_jobs or RENDER_WORKER_MAX_JOBS
+        self.max_rss_mb = max_rss_mb or RENDER_WORKER_MAX_RSS_MB
+        self.jobs = 0
+
+    def handle(self, job):
+        result = run_job(job)
+        self.jobs += 1
+        memory = rss_mb()
+        result.update(jobs=self.jobs, rss_mb=round(memory, 1),
+                      recycle=self.jobs >= self.max_jobs or memory >= self.max_rss_mb)
+        return result
+
+
+def _protocol_stdout():
+    """Keeps fd 1 for the JSON protocol and sends everything else written to stdout to stderr."""
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    # ffmpeg、LaTeX 等子进程直接写 fd 1，重定向到 stderr 以免破坏协议
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return protocol
+
+
+def serve_stdio(worker):
+    protocol = _protocol_stdout()
+    protocol.write(json.dumps({"ready": True, "pid": os.getpid(), "preload": round(preload(), 3)}) + "\n")
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        result = worker.handle(json.loads(line))
+        protocol.write(json.dumps(result, ensure_ascii=False) + "\n")
+        if result["recycle"]:
+            return
+
+
+def serve_socket(worker, socket_path):
+    """Serves one job per connection on a Unix socket until the worker is due for recycling."""
+    preload()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    print(f"Render worker {os.getpid()} listening on {socket_path}", file=sys.stderr)
+    try:
+        while True:
+            connection, _ = server.accept()
+            with connection, connection.makefile("rw", encoding="utf-8") as stream:
+                line = stream.readline()
+                if not line.strip():
+                    continue
+                result = worker.handle(json.loads(line))
+                stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if result["recycle"]:
+                return
+    finally:
+        server.close()
+        os.remove(socket_path)
+
+
+class WarmWorker:
+    """
+    Client side of the stdio protocol: keeps one worker process warm and
+    starts a new one when the current one recycles itself or dies.
+    """
+
+    def __init__(self, max_jobs=None, max_rss_mb=None, cwd=None):
+        self.command = [sys.executable, os.path.abspath(__file__)]
+        if max_jobs:
+            self.command += ["--max-jobs", str(max_jobs)]
+        if max_rss_mb:
+            self.command += ["--max-rss-mb", str(max_rss_mb)]
+        self.cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+        self.process = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker and blocks until it has preloaded; returns the ready message."""
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding="utf-8", bufsize=1,
+        )
+        return self._read()
+
+    def _read(self):
+        line = self.process.stdout.readline()
+        if not line:
+            self.process.wait()
+            raise RuntimeError(f"Render worker exited with status {self.process.returncode}")
+        return json.loads(line)
+
+    def run(self, job):
+        """Sends ``job`` to the worker and returns its result dict."""
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                self.start()
+            try:
+                self.process.stdin.write(json.dumps(job, ensure_ascii=False) + "\n")
+                self.process.stdin.flush()
+                result = self._read()
+            except (OSError, RuntimeError) as e:
+                self.process = None
+                return {"id": job.get("id"), "ok": False, "error": f"Render worker died: {e}"}
+            if result.get("recycle"):
+                self.process.stdin.close()
+                self.process.wait()
+                self.process = None
+            return result
+
+    def close(self):
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                self.process.stdin.close()
+                self.process.wait()
+            self.process = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=None, help="serve on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--max-jobs", type=int, default=None, help="default: RENDER_WORKER_MAX_JOBS (50)")
+    parser.add_argument("--max-rss-mb", type=int, default=None, help="default: RENDER_WORKER_MAX_RSS_MB (3072)")
+    args = parser.parse_args()
+
+    worker = Worker(args.max_jobs, args.max_rss_mb)
+    if args.socket:
+        serve_socket(worker, os.path.abspath(args.socket))
+    else:
+        serve_stdio(worker)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Renders the ``play_scene_NN`` segments of a CombinedScene script in parallel.
+
+    python scene_parallel.py 08.py [--scene CombinedScene] [--workers 8]
+
+``construct()`` is split at its ``self.clear_and_reset()`` calls. Every
+segment starts from the state ``clear_and_reset`` leaves behind (no mobjects,
+camera at its default frame), so each one can be rendered by a fresh scene in
+its own process. Scenes that deliberately skip the reset (04.py scenes 2-4,
+cofficient.py scenes 2-3) stay in the same segment as their predecessor.
+Statements before the first ``play_scene`` call run in every segment.
+
+Each worker runs the script's own ``__main__`` block, so its config
+(resolution, frame rate, media_dir) applies unchanged; only ``construct`` and
+the output file name are swapped. The segment videos are joined with the
+ffmpeg concat demuxer without re-encoding into the file a normal render
+would produce.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from script_runner import movie_path, run_script
+
+DEFAULT_SCENE = "CombinedScene"
+RESET_CALL = "clear_and_reset"
+SCENE_CALL_PREFIX = "play_scene"
+
+
+class SegmentPlan:
+    """Statement indexes of ``construct`` run by every segment (prelude) and by each segment."""
+
+    def __init__(self, prelude, segments, labels):
+        self.prelude = prelude
+        self.segments = segments
+        self.labels = labels
+
+
+def _self_call_name(stmt):
+    """Returns ``name`` for a ``self.name()`` expression statement, else None."""
+    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+        func = stmt.value.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self":
+            return func.attr
+    return None
+
+
+def find_construct(tree, scene_name):
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == scene_name:
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef) and item.name == "construct":
+                    return item
+    raise ValueError(f"{scene_name}.construct() not found")
+
+
+def plan_segments(construct):
+    """Splits the body of ``construct`` into independently renderable segments."""
+    prelude, segments, labels = [], [], []
+    current, current_scenes = [], []
+    started = False
+    for index, stmt in enumerate(construct.body):
+        name = _self_call_name(stmt)
+        if not started:
+            if name is None or not name.startswith(SCENE_CALL_PREFIX):
+                prelude.append(index)
+                continue
+            started = True
+        current.append(index)
+        if name and name.startswith(SCENE_CALL_PREFIX):
+            current_scenes.append(name[len(SCENE_CALL_PREFIX):].lstrip("_") or name)
+        if name == RESET_CALL:
+            segments.append(current)
+            labels.append("+".join(current_scenes) or "outro")
+            current, current_scenes = [], []
+    if current:
+        segments.append(current)
+        labels.append("+".join(current_scenes) or "outro")
+    return SegmentPlan(prelude, segments, labels)
+
+
+def load_plan(script_path, scene_name=DEFAULT_SCENE):
+    with open(script_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=script_path)
+    construct = find_construct(tree, scene_name)
+    return construct, plan_segments(construct)
+
+
+def build_segment_construct(construct, plan, segment, script_path, module_globals):
+    """Compiles a ``construct`` that runs the prelude and one segment, in the script's globals."""
+    body = [construct.body[i] for i in plan.prelude + plan.segments[segment]]
+    func = ast.FunctionDef(
+        name="construct", args=construct.args, body=body, decorator_list=[], returns=None, type_comment=None,
+    )
+    if sys.version_info >= (3, 12):
+        func.type_params = []
+    module = ast.fix_missing_locations(ast.Module(body=[func], type_ignores=[]))
+    namespace = {}
+    exec(compile(module, script_path, "exec"), module_globals, namespace)
+    return namespace["construct"]
+
+
+def run_worker(script_path, scene_name, segment, result_file):
+    """Renders one segment by running the script with its ``construct`` swapped."""
+    import types
+
+    from manim import config
+
+    construct, plan = load_plan(script_path, scene_name)
+
+    def configure(scene_class):
+        # 每个分段写自己的视频和 partial_movie_files 目录，并行的进程互不覆盖
+        name = f"{config.output_file or scene_name}_part{segment:02d}"
+        config.output_file = name
+        config.partial_movie_dir = os.path.join("{video_dir}", "partial_movie_files", os.path.basename(name))
+
+    def before_render(scene):
+        segment_construct = build_segment_construct(
+            construct, plan, segment, script_path, type(scene).construct.__globals__)
+        scene.construct = types.MethodType(segment_construct, scene)
+
+    def after_render(scene):
+        with open(result_file, "w", encoding="utf-8") as f:
+            json.dump({"movie": movie_path(scene)}, f)
+
+    run_script(script_path, before_render, after_render, scene_name=scene_name, configure=configure)
+
+
+def _ffmpeg():
+    return os.environ.get("FFMPEG_BINARY", "ffmpeg")
+
+
+def _ffprobe():
+    return os.environ.get("FFPROBE_BINARY", "ffprobe")
+
+
+def probe_audio(path):
+    """Returns ``(codec, sample_rate, channels)`` of the first audio stream, or None."""
+    output = subprocess.run(
+        [_ffprobe(), "-v", "error", "-select_streams", "a:0", "-show_entries",
+         "stream=codec_name,sample_rate,channels", "-of", "json", path],
+        check=True, capture_output=True,
+    ).stdout
+    streams = json.loads(output or b"{}").get("streams") or []
+    if not streams:
+        return None
+    stream = streams[0]
+    return stream.get("codec_name"), int(stream.get("sample_rate", 0)), int(stream.get("channels", 0))
+
+
+def add_silent_audio(path, audio):
+    """Adds a silent track matching ``audio`` so the segment can be stream-copied with the others."""
+    codec, sample_rate, channels = audio
+    layout = "mono" if channels == 1 else "stereo"
+    tmp_path = os.path.splitext(path)[0] + ".silent" + os.path.splitext(path)[1]
+    subprocess.run(
+        [_ffmpeg(), "-nostdin", "-v", "error", "-y", "-i", path,
+         "-f", "lavfi", "-i", f"anullsrc=r={sample_rate}:cl={layout}",
+         "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", codec, "-shortest", tmp_path],
+        check=True,
+    )
+    os.replace(tmp_path, path)
+
+
+def concat_segments(paths, output_path):
+    """Joins segment videos without re-encoding; segments lacking audio get a silent track first."""
+    audio = [probe_audio(path) for path in paths]
+    reference = next((a for a in audio if a), None)
+    if reference:
+        for path, segment_audio in zip(paths, audio):
+            if segment_audio is None:
+                add_silent_audio(path, reference)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+    try:
+        subprocess.run(
+            [_ffmpeg(), "-nostdin", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+             "-c", "copy", "-movflags", "+faststart", output_path],
+            check=True,
+        )
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+def render_segment(script_path, scene_name, segment):
+    """Runs one worker process and returns the path of its segment video."""
+    fd, result_file = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", "--scene", scene_name,
+             "--segment", str(segment), "--result-file", result_file, os.path.abspath(script_path)],
+            check=True,
+        )
+        with open(result_file, "r", encoding="utf-8") as f:
+            return json.load(f)["movie"]
+    finally:
+        os.remove(result_file)
+
+
+def render_parallel(script_path, scene_name=DEFAULT_SCENE, workers=None, keep_parts=False):
+    """Renders all segments concurrently and returns the joined video path."""
+    _, plan = load_plan(script_path, scene_name)
+    count = len(plan.segments)
+    workers = max(1, min(workers or os.cpu_count() or 1, count))
+    print(f"Rendering {count} segments with {workers} workers: {', '.join(plan.labels)}")
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(lambda i: render_segment(script_path, scene_name, i), range(count)))
+    print(f"Segments rendered in {time.time() - start:.1f}s")
+    directory, name = os.path.split(parts[0])
+    stem, ext = os.path.splitext(name)
+    if not stem.endswith("_part00"):
+        raise RuntimeError(f"Segment 0 rendered to {parts[0]}, expected a name ending in _part00{ext}")
+    output_path = os.path.join(directory, stem[:-len("_part00")] + ext)
+    concat_segments(parts, output_path)
+    if not keep_parts:
+        for path in parts:
+            os.remove(path)
+    print(f"Joined video: {output_path} ({time.time() - start:.1f}s total)")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("script")
+    parser.add_argument("--scene", default=DEFAULT_SCENE)
+    parser.add_argument("--workers", type=int, default=None, help="default: number of CPU cores")
+    parser.add_argument("--keep-parts", action="store_true", help="keep the per-segment videos")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--segment", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.script, args.scene, args.segment, args.result_file)
+    else:
+        render_parallel(args.script, args.scene, args.workers, args.keep_parts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Runs a scene script's own ``__main__`` block with hooks around ``Scene.render``.
+
+The render modes built on top of it (``scene_parallel``, ``quality_ladder``)
+each change one thing about a render -- which part of ``construct`` runs,
+the resolution -- while the script's config, fonts and TTS setup run exactly
+as written.
+
+Config that decides files and sizes must be changed in ``configure``, which
+runs when the scene is constructed: ``Scene.__init__`` creates the camera
+(resolution) and the ``SceneFileWriter`` (output name, movie path, partial
+movie directory) from ``config`` as it is at that moment, so changing them in
+``before_render`` has no effect.
+"""
+import os
+import runpy
+import sys
+
+
+def movie_path(scene):
+    """Returns the absolute path of the video ``scene`` rendered to."""
+    return os.path.abspath(str(scene.renderer.file_writer.movie_file_path))
+
+
+def run_script(script_path, before_render=None, after_render=None, scene_name=None, configure=None):
+    """
+    Executes ``script_path`` as ``__main__`` from its own directory. For every
+    scene it renders (only ``scene_name`` if given) ``configure(scene_class)``
+    runs right before the scene is constructed, after the script has set up
+    ``config``; ``before_render(scene)`` runs just before rendering and
+    ``after_render(scene)`` right after.
+    """
+    from manim import Scene
+    from render_cache import install_render_cache
+
+    # 固定随机种子，不同渲染模式画出的内容一致
+    install_render_cache()
+    original_init = Scene.__init__
+    original_render = Scene.render
+
+    def selected(scene):
+        return not scene_name or type(scene).__name__ == scene_name
+
+    def __init__(self, *args, **kwargs):
+        if configure and selected(self):
+            configure(type(self))
+        original_init(self, *args, **kwargs)
+
+    def render(self, *args, **kwargs):
+        if not selected(self):
+            return original_render(self, *args, **kwargs)
+        if before_render:
+            before_render(self)
+        result = original_render(self, *args, **kwargs)
+        if after_render:
+            after_render(self)
+        return result
+
+    Scene.__init__ = __init__
+    Scene.render = render
+    script_path = os.path.abspath(script_path)
+    script_dir = os.path.dirname(script_path)
+    sys.path.insert(0, script_dir)
+    os.chdir(script_dir)
+    runpy.run_path(script_path, run_name="__main__")
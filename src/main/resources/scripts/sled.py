@@ -1,11 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 import numpy as np
-import requests
-from contextlib import contextmanager
 from manim import *
-from moviepy import AudioFileClip # Correct import for AudioFileClip
-import hashlib
 import manimpango # For font checking
 
 # --- Custom Colors ---
@@ -23,62 +19,9 @@ MY_GOLD = "#F59E0B"
 MY_DARK_BG = "#0A192F"
 
 # --- TTS Setup ---
-CACHE_DIR = "tts_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-class CustomVoiceoverTracker:
-    def __init__(self, audio_path, duration):
-        self.audio_path = audio_path
-        self.duration = duration
-
-def get_cache_filename(text):
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    return os.path.join(CACHE_DIR, f"{text_hash}.mp3")
-
-@contextmanager
-def custom_voiceover_tts(text, token="123456", base_url="https://uni-ai.fly.dev/api/manim/tts"):
-    cache_file = get_cache_filename(text)
-    audio_file = None # Initialize audio_file
-    duration = 0 # Initialize duration
-
-    try:
-        if os.path.exists(cache_file):
-            audio_file = cache_file
-        else:
-            input_text = requests.utils.quote(text)
-            url = f"{base_url}?token={token}&input={input_text}"
-
-            response = requests.get(url, stream=True)
-            if response.status_code != 200:
-                print(f"TTS API Error: {response.status_code} - {response.text}")
-                with open(cache_file, "wb") as f: pass # Create empty file
-                audio_file = cache_file
-            else:
-                with open(cache_file, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk: f.write(chunk)
-                audio_file = cache_file
-
-        if audio_file and os.path.getsize(audio_file) > 0:
-            try:
-                clip = AudioFileClip(audio_file)
-                duration = clip.duration
-                clip.close()
-            except Exception as e:
-                print(f"Error processing audio file {audio_file}: {e}")
-                duration = 0
-        else:
-             print(f"Warning: TTS cache file {cache_file} is empty or invalid.")
-             duration = 0
-             if not audio_file:
-                 if not os.path.exists(cache_file):
-                      with open(cache_file, "wb") as f: pass
-                 audio_file = cache_file
-
-        tracker = CustomVoiceoverTracker(audio_file, duration)
-        yield tracker
-    finally:
-        pass
+from custom_voiceover import custom_voiceover_tts
+from tts_prefetch import prefetch_file
+from render_cache import install_render_cache
 
 # --- Font Check ---
 DEFAULT_FONT = "Noto Sans CJK SC"
@@ -252,8 +195,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover and Animation (Code unchanged from previous version) ---
         voice_text_01 = "大家好！本视频将分析一个经典的物理问题：一个滑雪巡逻队用绳子以恒定速度，将一个总质量为90千克、包含受害者的救援雪橇，沿着倾角为60度的斜坡向下放30米。已知摩擦系数为0.1。我们将计算摩擦力、绳子拉力、重力所做的功以及总功。"
         with custom_voiceover_tts(voice_text_01) as tracker:
-            if tracker.audio_path and tracker.duration > 0: self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Audio file not available or invalid for Scene 1.")
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_01, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.4)
             self.play(AnimationGroup(FadeIn(subtitle_voice, run_time=0.5), Write(title, run_time=2.0), lag_ratio=0.0), run_time=2.0)
             self.play(FadeIn(line1, shift=DOWN*0.2), run_time=1.0)
@@ -337,8 +279,7 @@ class CombinedScene(MovingCameraScene):
         decomp_group = VGroup(mg_par_vec, mg_par_label, mg_perp_vec, mg_perp_label, dashed_line1, dashed_line2)
         voice_text_02 = "首先，我们进行受力分析。选择沿斜面向下为x轴正方向，垂直斜面向上为y轴正方向。雪橇受到竖直向下的重力mg，垂直斜面向上的支持力N，沿斜面向上的摩擦力f（与运动方向相反），以及沿斜面向上的绳子拉力T。为了方便计算，我们将重力分解为沿斜面向下的分力mg sin theta 和垂直斜面向下的分力mg cos theta。"
         with custom_voiceover_tts(voice_text_02) as tracker:
-            if tracker.audio_path and tracker.duration > 0: self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Audio file not available or invalid for Scene 2.")
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_02, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.4)
             self.play(AnimationGroup(FadeIn(subtitle_voice, run_time=0.5), FadeIn(title2, shift=DOWN*0.2), Create(diagram_group), lag_ratio=0.0), run_time=1.5)
             self.play(Create(coord_sys), run_time=1.5)
@@ -403,8 +344,7 @@ class CombinedScene(MovingCameraScene):
         right_group = VGroup(title3_right, calc_N, calc_f, calc_mgsin_implied, calc_T)
         voice_text_03 = "由于雪橇是恒速下滑，其加速度为零。根据牛顿第二定律，沿斜面方向的合力为零。也就是 mg sin theta 减去 f 再减去 T 等于 0。由此可得 T 等于 mg sin theta 减去 f。同时，摩擦力 f 等于摩擦系数 mu 乘以支持力 N。在垂直斜面方向，合力也为零，即 N 减去 mg cos theta 等于 0，所以 N 等于 mg cos theta。将这些代入，我们得到 T 的表达式。现在，代入数值：m=90kg, g=9.8m/s², theta=60度, mu=0.1。我们计算出支持力N约为441牛顿，摩擦力f约为44.1牛顿，绳子拉力T约为719牛顿。"
         with custom_voiceover_tts(voice_text_03) as tracker:
-            if tracker.audio_path and tracker.duration > 0: self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Audio file not available or invalid for Scene 3.")
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_03, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.4)
             self.play(AnimationGroup(FadeIn(subtitle_voice, run_time=0.5), Write(title3_left), FadeIn(title3_right), lag_ratio=0.0), run_time=1.5)
             self.play(FadeIn(condition_text), run_time=1.5)
@@ -507,8 +447,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover and Animation (Code unchanged) ---
         voice_text_04 = "接下来，我们计算各个力所做的功。功的计算公式为 W 等于 F 乘以 d 乘以 cos phi，其中 phi 是力 F 与位移 d 之间的夹角。位移 d 是沿斜面向下30米。(a) 摩擦力 f 方向沿斜面向上，与位移夹角为180度，所以摩擦力做负功，约为负1320焦耳。(b) 绳子拉力 T 方向沿斜面向上，与位移夹角也为180度，所以绳子拉力也做负功，约为负21600焦耳。(c) 重力做的功，可以看作是重力沿斜面的分力 mg sin theta 做的功。该分力方向沿斜面向下，与位移夹角为0度，所以重力做正功，约为22900焦耳。"
         with custom_voiceover_tts(voice_text_04) as tracker:
-            if tracker.audio_path and tracker.duration > 0: self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Audio file not available or invalid for Scene 4.")
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_04, font_size=28, color=MY_BLACK, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.4)
             self.play(AnimationGroup(FadeIn(subtitle_voice, run_time=0.5), Write(title4), FadeIn(work_formula_group), lag_ratio=0.0), run_time=2.0)
             self.play(LaggedStartMap(FadeIn, group_a, shift=UP*0.2, lag_ratio=0.2), run_time=2.5)
@@ -632,8 +571,7 @@ class CombinedScene(MovingCameraScene):
         # --- Voiceover and Animation (Code unchanged) ---
         voice_text_05 = "最后，我们计算总功。(d) 总功 W_total 是所有力做功的代数和。将重力、摩擦力、绳子拉力做的功相加，我们得到 W_total 约等于 22900 减 1320 减 21600，结果为 0 焦耳。这与动能定理一致：因为雪橇是恒速运动，动能变化为零，所以合外力做的总功也必须为零。总结一下最终答案：摩擦力做功约为负1.32乘以10的三次方焦耳，绳子做功约为负2.16乘以10的四次方焦耳，重力做功约为2.29乘以10的四次方焦耳，总功为零。"
         with custom_voiceover_tts(voice_text_05) as tracker:
-            if tracker.audio_path and tracker.duration > 0: self.add_sound(tracker.audio_path, time_offset=0)
-            else: print("Warning: Audio file not available or invalid for Scene 5.")
+            tracker.add_sound(self)
             subtitle_voice = Text(voice_text_05, font_size=28, color=MY_WHITE, width=config.frame_width - 2, should_center=True).to_edge(DOWN, buff=0.4)
             self.play(AnimationGroup(FadeIn(subtitle_voice, run_time=0.5), FadeIn(title_d), lag_ratio=0.0), run_time=1.0)
             self.play(Write(method1_title), run_time=0.8)
@@ -666,6 +604,8 @@ if __name__ == "__main__":
     config.media_dir = "slide"
     config.disable_caching = True
 
+    install_render_cache()  # 固定随机种子；RENDER_CACHE=1 时复用分段缓存
+    prefetch_file(__file__, wait=False)  # 后台并发下载所有旁白，构建场景时不阻塞
     scene = CombinedScene()
     scene.render()
     print("Scene rendering finished.")
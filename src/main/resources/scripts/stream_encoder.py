@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+One long-lived ffmpeg encoder per render instead of one partial movie per animation.
+
+Manim's Cairo renderer opens a new encoder and a new partial movie file for
+every ``self.play``/``self.wait`` and joins the hundreds of small files in a
+final concat pass (``intro_majoy.py`` has over two hundred). With
+``install_stream_encoder()`` the ``SceneFileWriter`` of a render instead
+pipes all raw frames into a single ``ffmpeg`` process, started at the first
+animation and closed when the scene finishes; the audio is muxed in one step
+afterwards. ``scene_parallel`` workers render one segment each, so they get
+one encoder per segment.
+
+The animation boundaries are written next to the video as
+``<name>.manifest.json``: for each animation its content hash, first frame,
+frame count and start time. Since no per-animation files exist any more,
+Manim's partial-movie cache cannot be used in this mode. With caching off
+Manim names every animation ``uncached_NNNNN``, so the encoder computes the
+hash Manim's cache would use (``get_hash_from_play_call``) itself; the
+manifest's hashes therefore match the partial movie files of a cached
+render, and cached segments can be matched and cut from the video.
+
+Enabled with ``RENDER_STREAM_ENCODER=1`` (``render_cache.install_render_cache``
+installs it). Renders that need the per-animation files -- caching on
+(``RENDER_CACHE=1``), OpenGL, transparent output, formats other than MP4,
+``save_sections`` -- keep Manim's own writer.
+"""
+import json
+import os
+import subprocess
+
+RENDER_STREAM_ENCODER = os.environ.get("RENDER_STREAM_ENCODER", "") in ("1", "true", "yes")
+RENDER_STREAM_PRESET = os.environ.get("RENDER_STREAM_PRESET", "medium")
+# 与 Manim 自己的 libx264 输出一致
+RENDER_STREAM_CRF = os.environ.get("RENDER_STREAM_CRF", "23")
+
+_installed = False
+
+
+def _ffmpeg():
+    return os.environ.get("FFMPEG_BINARY", "ffmpeg")
+
+
+class StreamEncoder:
+    """A single ffmpeg process fed with raw RGBA frames, plus the animation manifest."""
+
+    def __init__(self, path, width, height, frame_rate):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.frame_rate = frame_rate
+        self.frames = 0
+        self.animations = []
+        self._current = None
+        self.process = subprocess.Popen(
+            [_ffmpeg(), "-nostdin", "-v", "error", "-y",
+             "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(frame_rate), "-i", "-",
+             "-an", "-c:v", "libx264", "-preset", RENDER_STREAM_PRESET, "-crf", RENDER_STREAM_CRF,
+             "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE,
+        )
+
+    def begin(self, animation_hash=None):
+        self._current = {"index": len(self.animations), "hash": animation_hash, "start_frame": self.frames}
+
+    def write(self, frame, num_frames=1):
+        data = frame.tobytes()
+        for _ in range(num_frames):
+            self.process.stdin.write(data)
+        self.frames += num_frames
+
+    def end(self):
+        if self._current is None:
+            return
+        entry = self._current
+        entry["frames"] = self.frames - entry["start_frame"]
+        entry["start"] = round(entry["start_frame"] / self.frame_rate, 6)
+        entry["duration"] = round(entry["frames"] / self.frame_rate, 6)
+        self.animations.append(entry)
+        self._current = None
+
+    def close(self):
+        """Flushes the encoder; raises RuntimeError if ffmpeg failed."""
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self.process.returncode} while encoding {self.path}")
+
+    def manifest(self):
+        return {"frame_rate": self.frame_rate, "width": self.width, "height": self.height,
+                "frames": self.frames, "animations": self.animations}
+
+
+def write_manifest(encoder, movie_path):
+    manifest_path = os.path.splitext(movie_path)[0] + ".manifest.json"
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(encoder.manifest(), f)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+def mux_audio(video_path, audio_path, output_path):
+    """Copies the video stream and encodes the audio track next to it."""
+    subprocess.run(
+        [_ffmpeg(), "-nostdin", "-v", "error", "-y", "-i", video_path, "-i", audio_path,
+         "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-b:a", "320k",
+         "-movflags", "+faststart", output_path],
+        check=True,
+    )
+
+
+def stream_supported():
+    """True if the current config renders into a single MP4 that this encoder can produce."""
+    from manim import config
+
+    renderer = getattr(config.renderer, "value", config.renderer)
+    return (str(renderer) == "cairo" and config.write_to_movie and config.disable_caching
+            and not config.transparent and config.movie_file_extension == ".mp4" and not config.save_sections)
+
+
+def install_stream_encoder():
+    """Patches ``SceneFileWriter`` to encode each render through one ``StreamEncoder``."""
+    global _installed
+    if _installed:
+        return
+    from manim import config
+    from manim.renderer.cairo_renderer import CairoRenderer
+    from manim.scene.scene_file_writer import SceneFileWriter
+    from manim.utils.hashing import get_hash_from_play_call
+
+    original_play = CairoRenderer.play
+    original_begin = SceneFileWriter.begin_animation
+    original_end = SceneFileWriter.end_animation
+    original_write_frame = SceneFileWriter.write_frame
+    original_add_partial = SceneFileWriter.add_partial_movie_file
+    original_combine = SceneFileWriter.combine_to_movie
+
+    def play(self, scene, *args, **kwargs):
+        # 文件写入器拿不到 scene，计算内容哈希时需要
+        self.file_writer._stream_scene = scene
+        return original_play(self, scene, *args, **kwargs)
+
+    def begin_animation(self, allow_write=False, *args, **kwargs):
+        if not (allow_write and stream_supported()):
+            return original_begin(self, allow_write, *args, **kwargs)
+        encoder = getattr(self, "_stream_encoder", None)
+        if encoder is None:
+            stem, _ = os.path.splitext(str(self.movie_file_path))
+            encoder = self._stream_encoder = StreamEncoder(
+                f"{stem}.stream.mp4", config.pixel_width, config.pixel_height, config.frame_rate)
+        # play() 先调用 add_partial_movie_file 计算哈希，再调用 begin_animation
+        encoder.begin(getattr(self, "_stream_pending_hash", None))
+        self._stream_pending_hash = None
+
+    def end_animation(self, allow_write=False, *args, **kwargs):
+        encoder = getattr(self, "_stream_encoder", None)
+        if encoder is None:
+            return original_end(self, allow_write, *args, **kwargs)
+        if allow_write:
+            encoder.end()
+
+    def write_frame(self, frame, num_frames=1, *args, **kwargs):
+        encoder = getattr(self, "_stream_encoder", None)
+        if encoder is None:
+            return original_write_frame(self, frame, num_frames, *args, **kwargs)
+        encoder.write(frame, num_frames)
+
+    def add_partial_movie_file(self, hash_animation, *args, **kwargs):
+        scene = getattr(self, "_stream_scene", None)
+        if hash_animation is not None and scene is not None and stream_supported():
+            # 关闭缓存时 Manim 只给出 uncached_NNNNN，清单里记录开启缓存时的内容哈希
+            self._stream_pending_hash = get_hash_from_play_call(
+                scene, self.renderer.camera, scene.animations, scene.mobjects)
+        else:
+            self._stream_pending_hash = hash_animation
+        return original_add_partial(self, hash_animation, *args, **kwargs)
+
+    def combine_to_movie(self, *args, **kwargs):
+        encoder = getattr(self, "_stream_encoder", None)
+        if encoder is None:
+            return original_combine(self, *args, **kwargs)
+        encoder.close()
+        movie_path = str(self.movie_file_path)
+        if self.includes_sound:
+            from pydub import AudioSegment
+
+            # 补齐到视频长度，与 Manim 自己的合并方式一致
+            self.add_audio_segment(AudioSegment.silent(0))
+            sound_path = os.path.splitext(movie_path)[0] + ".wav"
+            self.audio_segment.export(sound_path, format="wav")
+            mux_audio(encoder.path, sound_path, movie_path)
+            os.remove(sound_path)
+            os.remove(encoder.path)
+        else:
+            os.replace(encoder.path, movie_path)
+        write_manifest(encoder, movie_path)
+        self._stream_encoder = None
+        self._stream_scene = None
+
+    CairoRenderer.play = play
+    SceneFileWriter.begin_animation = begin_animation
+    SceneFileWriter.end_animation = end_animation
+    SceneFileWriter.write_frame = write_frame
+    SceneFileWriter.add_partial_movie_file = add_partial_movie_file
+    SceneFileWriter.combine_to_movie = combine_to_movie
+    _installed = True
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Puts the scripts directory on sys.path so the tests import the helpers the way the scene scripts do."""
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from concurrent import futures
+
+import pytest
+
+pytest.importorskip("requests")
+
+
+@pytest.fixture
+def voiceover(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import custom_voiceover
+
+    monkeypatch.setattr(custom_voiceover, "CACHE_DIR", str(tmp_path / "tts_cache"))
+    monkeypatch.setattr(custom_voiceover, "TTS_VOICE_PROVIDER", None)
+    monkeypatch.setattr(custom_voiceover, "TTS_VOICE_ID", None)
+    monkeypatch.setattr(custom_voiceover, "TTS_OFFLINE", False)
+    monkeypatch.setattr(custom_voiceover, "_pending", {})
+    return custom_voiceover
+
+
+def test_key_depends_on_voice_and_endpoint(voiceover):
+    key = voiceover.get_cache_key("你好")
+    assert voiceover.get_cache_key("你好") == key
+    assert voiceover.get_cache_key("你好", voice_provider="openai", voice_id="alloy") != key
+    assert voiceover.get_cache_key("你好", voice_id="nova") != voiceover.get_cache_key("你好", voice_id="alloy")
+    assert voiceover.get_cache_key("你好", base_url="http://127.0.0.1:8765/tts") != key
+    assert voiceover.get_cache_key("你好", token="other") == key
+
+
+def test_default_voice_applies(voiceover, monkeypatch):
+    plain = voiceover.get_cache_key("hello")
+    voiceover.set_voice("openai", "alloy")
+    assert voiceover.get_cache_key("hello") == voiceover.get_cache_key("hello", voice_provider="openai", voice_id="alloy")
+    assert voiceover.get_cache_key("hello") != plain
+
+
+def test_cache_path_is_sharded(voiceover):
+    key = voiceover.get_cache_key("hello")
+    path = voiceover.get_cache_filename("hello")
+    assert path == os.path.join(voiceover.CACHE_DIR, key[:2], key[2:4], f"{key}.mp3")
+
+
+def test_voice_is_only_part_of_the_cache_key(voiceover):
+    url = voiceover.TtsRequest("a b", voice_provider="openai", voice_id="alloy").url
+    assert url == f"{voiceover.TTS_BASE_URL}?token={voiceover.TTS_TOKEN}&input=a%20b"
+    assert url == voiceover.TtsRequest("a b").url
+
+
+def test_pending_requests_share_one_resolve_and_are_forgotten(voiceover, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def resolve(text, **voice):
+        calls.append(text)
+        release.wait(5)
+        return voiceover.CustomVoiceoverTracker(None, 0)
+
+    monkeypatch.setattr(voiceover, "resolve_tracker", resolve)
+    first = voiceover.request_voiceover("hello")
+    second = voiceover.request_voiceover("hello")
+    assert voiceover._is_requested("hello")
+    release.set()
+    assert first.duration == 0 and second.duration == 0
+    assert calls == ["hello"]
+    # 失败的结果不会一直留在 _pending 里，下一次请求会重试
+    assert not voiceover._is_requested("hello")
+    voiceover.request_voiceover("hello").result()
+    assert calls == ["hello", "hello"]
+
+
+def test_pending_key_includes_cache_dir(voiceover, monkeypatch, tmp_path):
+    release = threading.Event()
+    monkeypatch.setattr(voiceover, "resolve_tracker",
+                        lambda text, **voice: release.wait(5) and voiceover.CustomVoiceoverTracker(None, 0))
+    tracker = voiceover.request_voiceover("hello")
+    monkeypatch.setattr(voiceover, "CACHE_DIR", str(tmp_path / "other"))
+    assert not voiceover._is_requested("hello")
+    release.set()
+    tracker.result()
+
+
+def test_pinned_cache_dir_ignores_per_task_dirs(voiceover, monkeypatch, tmp_path):
+    shared = str(tmp_path / "shared")
+    monkeypatch.setattr(voiceover, "TTS_CACHE_DIR", shared)
+    monkeypatch.setattr(voiceover, "CACHE_DIR", shared)
+    voiceover.set_cache_dir(str(tmp_path / "task" / "audio"))
+    assert voiceover.CACHE_DIR == shared
+    voiceover.set_cache_dir(str(tmp_path / "other"), force=True)
+    assert voiceover.CACHE_DIR == str(tmp_path / "other")
+
+
+def test_unpinned_set_cache_dir(voiceover, tmp_path):
+    voiceover.set_cache_dir(str(tmp_path / "task" / "audio"))
+    assert voiceover.CACHE_DIR == str(tmp_path / "task" / "audio")
+    assert os.path.isdir(voiceover.CACHE_DIR)
+
+
+def test_forget_pending_drops_requests_of_a_finished_job(voiceover, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(voiceover, "resolve_tracker",
+                        lambda text, **voice: release.wait(5) and voiceover.CustomVoiceoverTracker(None, 0))
+    tracker = voiceover.request_voiceover("hello")
+    voiceover.forget_pending()
+    assert not voiceover._is_requested("hello")
+    release.set()
+    # 还在排队的请求被取消，已经开始的照常完成
+    futures.wait([tracker._future], timeout=5)
+    assert tracker.done()
+    assert voiceover._pending == {}
+
+
+class FakeScene:
+    """Records add_sound calls at absolute times, like Manim's file writer."""
+
+    def __init__(self):
+        self.time = 0.0
+        self.renderer = type("Renderer", (), {"skip_animations": False})()
+        self.sounds = []
+
+    def add_sound(self, sound_file, time_offset=0, gain=None):
+        self.sounds.append((sound_file, self.time + time_offset))
+
+
+def test_add_sound_waits_for_the_first_read_of_a_pending_line(voiceover, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(voiceover, "resolve_tracker",
+                        lambda text, **voice: release.wait(5) and voiceover.CustomVoiceoverTracker("a.mp3", 3.0))
+    scene = FakeScene()
+    voiceover.request_voiceover("hello")
+    with voiceover.custom_voiceover_tts("hello") as tracker:
+        tracker.add_sound(scene)
+        # 没有等待下载：场景继续构建和播放
+        assert not tracker.done() and scene.sounds == []
+        scene.time = 1.5
+        release.set()
+        assert tracker.duration == 3.0
+        assert scene.sounds == [("a.mp3", 0.0)]
+    assert scene.sounds == [("a.mp3", 0.0)]
+
+
+def test_pending_sounds_are_added_when_the_block_ends(voiceover, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(voiceover, "resolve_tracker",
+                        lambda text, **voice: release.wait(5) and voiceover.CustomVoiceoverTracker("a.mp3", 3.0))
+    scene = FakeScene()
+    scene.time = 2.0
+    voiceover.request_voiceover("hello")
+    with voiceover.custom_voiceover_tts("hello") as tracker:
+        tracker.add_sound(scene, time_offset=0.5)
+        scene.time = 4.0
+        release.set()
+    assert scene.sounds == [("a.mp3", 2.5)]
+
+
+def test_add_sound_skips_failed_lines(voiceover, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(voiceover, "resolve_tracker",
+                        lambda text, **voice: release.wait(5) and voiceover.CustomVoiceoverTracker(None, 0))
+    scene = FakeScene()
+    voiceover.request_voiceover("hello")
+    with voiceover.custom_voiceover_tts("hello") as tracker:
+        tracker.add_sound(scene)
+        release.set()
+    with voiceover.custom_voiceover_tts("hello") as tracker:
+        tracker.add_sound(scene)
+    assert scene.sounds == []
+
+
+def test_shared_layer_hit_is_written_back_to_the_nearer_layers(voiceover, monkeypatch, tmp_path):
+    import tts_blob_server
+    from tts_cache_backends import DirBackend, HttpBlobBackend, sharded_path
+
+    server, base_url = tts_blob_server.start_server(str(tmp_path / "blobs"))
+    try:
+        near, far = DirBackend(str(tmp_path / "shared")), HttpBlobBackend(base_url)
+        monkeypatch.setattr(voiceover, "CACHE_BACKENDS", [near, far])
+        monkeypatch.setattr(voiceover, "download_tts", lambda req, cache_file: pytest.fail("requested the TTS service"))
+        key = voiceover.get_cache_key("hello")
+        clip = tmp_path / "clip.mp3"
+        clip.write_bytes(b"audio")
+        far.put(key, "mp3", str(clip))
+
+        cache_file = voiceover.fetch_tts("hello")
+        assert cache_file == voiceover.get_cache_filename("hello")
+        with open(cache_file, "rb") as f:
+            assert f.read() == b"audio"
+        with open(sharded_path(near.root, f"{key}.mp3"), "rb") as f:
+            assert f.read() == b"audio"
+        # 之后的命中直接读本地缓存
+        os.remove(sharded_path(near.root, f"{key}.mp3"))
+        assert voiceover.fetch_tts("hello") == cache_file
+        assert not os.path.exists(sharded_path(near.root, f"{key}.mp3"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_whole_line_is_looked_up_before_chunking(voiceover, monkeypatch, tmp_path):
+    from tts_cache_backends import DirBackend
+
+    text = "第一句话比较长一些。第二句话也比较长。"
+    requested = []
+
+    def download(req, cache_file):
+        requested.append(req.text)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, "wb") as f:
+            f.write(req.text.encode("utf-8"))
+        return cache_file
+
+    def concat(paths, dest):
+        with open(dest, "wb") as out:
+            for path in paths:
+                with open(path, "rb") as f:
+                    out.write(f.read())
+        return dest
+
+    shared = DirBackend(str(tmp_path / "shared"))
+    monkeypatch.setattr(voiceover, "CACHE_BACKENDS", [shared])
+    monkeypatch.setattr(voiceover, "TTS_CHUNK_CHARS", 10)
+    monkeypatch.setattr(voiceover, "download_tts", download)
+    monkeypatch.setattr(voiceover.tts_chunking, "concat_mp3", concat)
+    clip = tmp_path / "clip.mp3"
+    clip.write_bytes(b"whole line")
+    shared.put(voiceover.get_cache_key(text), "mp3", str(clip))
+
+    # 共享层有整句时直接使用，不拆分也不请求分段
+    with open(voiceover.fetch_tts(text), "rb") as f:
+        assert f.read() == b"whole line"
+    assert requested == []
+
+    other = "另一句话比较长一些。还有一句也比较长。"
+    with open(voiceover.fetch_tts(other), "rb") as f:
+        assert f.read().decode("utf-8") == other
+    assert sorted(requested) == sorted(["另一句话比较长一些。", "还有一句也比较长。"])
+
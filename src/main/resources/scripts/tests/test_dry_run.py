@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import dry_run
+
+SCRIPT = '''
+from manim import *
+
+
+class CombinedScene(Scene):
+    def construct(self):
+        self.play_scene_01()
+        self.play_scene_02()
+        self.wait(0.5)
+
+    def play_scene_01(self):
+        self.play(Create(Square()), run_time=2)
+        self.wait(1)
+
+    def play_scene_02(self):
+        self.play(FadeIn(Circle()), run_time=1)
+        raise_here = BROKEN
+
+
+if __name__ == "__main__":
+    config.media_dir = "media"
+    scene = CombinedScene()
+    scene.render()
+'''
+
+
+def test_timeline_groups_animations_by_scene():
+    timeline = dry_run.Timeline()
+    timeline.add(0.5)
+    timeline.enter("play_scene_01")
+    timeline.add(2.0)
+    timeline.add(1.0)
+    timeline.leave()
+    timeline.enter("play_scene_02")
+    timeline.leave()
+    timeline.add(0.25)
+    assert timeline.to_dict() == {
+        "duration": 3.75,
+        "animations": 4,
+        "scenes": [
+            {"scene": "construct", "start": 0.0, "duration": 0.5, "animations": 1},
+            {"scene": "play_scene_01", "start": 0.5, "duration": 3.0, "animations": 2},
+            {"scene": "play_scene_02", "start": 3.5, "duration": 0.0, "animations": 0},
+            {"scene": "construct", "start": 3.5, "duration": 0.25, "animations": 1},
+        ],
+    }
+
+
+def test_script_traceback_keeps_only_script_frames(tmp_path):
+    script = tmp_path / "main.py"
+    script.write_text("def scene():\n    return {}['missing']\n", encoding="utf-8")
+    namespace = {}
+    exec(compile(script.read_text(), str(script), "exec"), namespace)
+    try:
+        namespace["scene"]()
+    except KeyError as e:
+        text = dry_run.script_traceback(e, str(script))
+    assert text.startswith("Traceback")
+    assert f'File "{script}", line 2, in scene' in text
+    assert __file__ not in text
+    assert text.rstrip().endswith("KeyError: 'missing'")
+
+
+def test_dry_run_reports_the_failing_scene_without_rendering(tmp_path):
+    pytest.importorskip("manim")
+    script = tmp_path / "main.py"
+    script.write_text(SCRIPT, encoding="utf-8")
+    result = dry_run.dry_run(str(script))
+    assert not result["ok"]
+    assert result["scene"] == "play_scene_02"
+    assert "NameError" in result["error"] and "BROKEN" in result["script_traceback"]
+    assert not os.path.exists(str(tmp_path / "media" / "videos"))
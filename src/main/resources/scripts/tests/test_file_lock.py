@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+from file_lock import LockTimeout, file_lock
+
+
+def test_lock_excludes_other_threads(tmp_path):
+    path = os.path.join(str(tmp_path), ".locks", "abc.lock")
+    inside = []
+    overlaps = []
+
+    def worker():
+        with file_lock(path):
+            inside.append(1)
+            if len(inside) > 1:
+                overlaps.append(1)
+            time.sleep(0.01)
+            inside.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not overlaps
+
+
+def test_timeout(tmp_path):
+    path = os.path.join(str(tmp_path), "abc.lock")
+    errors = []
+
+    def contender():
+        try:
+            with file_lock(path, timeout=0.1):
+                pass
+        except LockTimeout as e:
+            errors.append(e)
+
+    with file_lock(path):
+        thread = threading.Thread(target=contender)
+        thread.start()
+        thread.join()
+    assert len(errors) == 1
+    with file_lock(path, timeout=0.1):
+        pass
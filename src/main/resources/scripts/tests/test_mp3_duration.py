@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import mp3_duration
+import tts_offline
+
+
+def _write(tmp_path, name, data):
+    path = os.path.join(str(tmp_path), name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_info_header_duration(tmp_path):
+    path = _write(tmp_path, "a.mp3", tts_offline.silent_mp3(2.0))
+    frames = int(round(2.0 / tts_offline.FRAME_SECONDS))
+    assert mp3_duration.probe_mp3_duration(path) == pytest.approx(frames * tts_offline.FRAME_SECONDS)
+
+
+def test_frame_scan_without_header(tmp_path):
+    path = _write(tmp_path, "a.mp3", tts_offline.silent_mp3(1.5, info_header=False))
+    frames = int(round(1.5 / tts_offline.FRAME_SECONDS))
+    assert mp3_duration.probe_mp3_duration(path) == pytest.approx(frames * tts_offline.FRAME_SECONDS)
+
+
+def test_id3_tags_are_skipped(tmp_path):
+    id3v2 = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    id3v1 = b"TAG" + b"\x00" * 125
+    body = tts_offline.silent_mp3(1.0, info_header=False)
+    path = _write(tmp_path, "a.mp3", id3v2 + body + id3v1)
+    expected = mp3_duration.probe_mp3_duration(_write(tmp_path, "b.mp3", body))
+    assert mp3_duration.probe_mp3_duration(path) == pytest.approx(expected)
+
+
+def test_not_mp3_raises(tmp_path):
+    path = _write(tmp_path, "a.mp3", b"RIFF" + b"\x00" * 100)
+    with pytest.raises(ValueError):
+        mp3_duration.probe_mp3_duration(path)
+
+
+def test_sidecar_is_written_and_preferred(tmp_path):
+    path = _write(tmp_path, "a.mp3", tts_offline.silent_mp3(1.0))
+    duration = mp3_duration.get_duration(path)
+    assert mp3_duration.read_duration_sidecar(path) == pytest.approx(duration, abs=1e-6)
+    mp3_duration.write_duration_sidecar(path, 42.0)
+    assert mp3_duration.get_duration(path) == 42.0
+    mp3_duration.remove_duration_sidecar(path)
+    assert mp3_duration.read_duration_sidecar(path) is None
+
+
+def test_audio_frame_span_drops_info_frame(tmp_path):
+    with_info = tts_offline.silent_mp3(1.0)
+    without_info = tts_offline.silent_mp3(1.0, info_header=False)
+    _, start, end = mp3_duration.audio_frame_span(with_info)
+    assert with_info[start:end] == without_info
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+import wave
+
+import pytest
+
+import pcm_sidecar
+import tts_offline
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("FFMPEG_BINARY") and pcm_sidecar.shutil.which("ffmpeg") is None,
+    reason="ffmpeg not installed")
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = tmp_path / "ab" / "cd" / "key.mp3"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(tts_offline.silent_mp3(1.0))
+    return str(path)
+
+
+def test_sidecar_is_decoded_once_at_the_sample_rate(clip, monkeypatch):
+    path = pcm_sidecar.get_pcm_sidecar(clip, 22050)
+    assert path == clip[:-len(".mp3")] + ".wav"
+    with wave.open(path, "rb") as wav:
+        assert wav.getframerate() == 22050 and wav.getnchannels() == pcm_sidecar.CHANNELS
+        assert wav.getnframes() == pytest.approx(22050, rel=0.1)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("decoded again")
+
+    monkeypatch.setattr(pcm_sidecar, "write_pcm_sidecar", fail)
+    assert pcm_sidecar.get_pcm_sidecar(clip, 22050) == path
+
+
+def test_stale_or_broken_sidecars_are_rewritten(clip):
+    pcm_sidecar.write_pcm_sidecar(clip, 22050)
+    assert not pcm_sidecar.has_pcm_sidecar(clip, 44100)
+    pcm_sidecar.get_pcm_sidecar(clip, 44100)
+    assert pcm_sidecar.has_pcm_sidecar(clip, 44100)
+    with open(pcm_sidecar.sidecar_path(clip), "wb") as f:
+        f.write(b"RIFF")
+    assert not pcm_sidecar.has_pcm_sidecar(clip)
+    pcm_sidecar.remove_pcm_sidecar(clip)
+    assert not os.path.exists(pcm_sidecar.sidecar_path(clip))
+
+
+def test_undecodable_clip_raises(tmp_path):
+    path = tmp_path / "broken.mp3"
+    path.write_bytes(b"not audio")
+    with pytest.raises(ValueError):
+        pcm_sidecar.write_pcm_sidecar(str(path))
+    assert os.listdir(str(tmp_path)) == ["broken.mp3"]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import quality_ladder
+
+SCRIPT = '''
+from manim import *
+
+
+class CombinedScene(Scene):
+    def construct(self):
+        self.play(Create(Square()), run_time=0.5)
+
+
+if __name__ == "__main__":
+    config.pixel_width = 1920
+    config.pixel_height = 1080
+    config.frame_rate = 30
+    config.output_file = "CombinedScene"
+    config.disable_caching = True
+    config.media_dir = "media"
+    scene = CombinedScene()
+    scene.render()
+'''
+
+
+def test_status_round_trip(tmp_path):
+    status_file = str(tmp_path / "preview.json")
+    quality_ladder.write_status(status_file, state="done", movie="a.mp4")
+    status = quality_ladder.read_status(status_file)
+    assert status["state"] == "done" and status["movie"] == "a.mp4"
+    assert [p.name for p in tmp_path.iterdir()] == ["preview.json"]
+
+
+def test_unknown_quality_is_rejected():
+    with pytest.raises(KeyError):
+        quality_ladder.quality_configure("4k")
+
+
+@pytest.mark.skipif(shutil.which("ffprobe") is None, reason="ffprobe not installed")
+def test_preview_is_rendered_at_the_preview_size(tmp_path):
+    pytest.importorskip("manim")
+    script = tmp_path / "scene.py"
+    script.write_text(SCRIPT, encoding="utf-8")
+    status_file = str(tmp_path / "preview.json")
+    subprocess.run(quality_ladder._worker_command(str(script), "preview", status_file, "CombinedScene"),
+                   check=True, cwd=str(tmp_path))
+    status = quality_ladder.read_status(status_file)
+    assert status["state"] == "done"
+    assert status["movie"].endswith("CombinedScene_preview.mp4")
+    probe = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
+                            "stream=width,height,r_frame_rate", "-of", "json", status["movie"]],
+                           check=True, stdout=subprocess.PIPE)
+    stream = json.loads(probe.stdout)["streams"][0]
+    width, height, frame_rate = quality_ladder.QUALITIES["preview"]
+    assert (stream["width"], stream["height"]) == (width, height)
+    assert stream["r_frame_rate"] == f"{frame_rate}/1"
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+import pytest
+
+import render_cache
+
+
+def test_scene_seed_is_stable_and_name_dependent():
+    assert render_cache.scene_seed("a", 0) == render_cache.scene_seed("a", 0)
+    assert render_cache.scene_seed("a", 0) != render_cache.scene_seed("b", 0)
+    assert render_cache.scene_seed("a", 0) != render_cache.scene_seed("a", 1)
+
+
+def test_make_deterministic_reseeds_each_scene_method():
+    class Scene:
+        def play_scene_01(self):
+            return random.random()
+
+        def play_scene_02(self):
+            return random.random()
+
+    render_cache.make_deterministic(Scene)
+    render_cache.make_deterministic(Scene)  # 重复调用不会套两层
+    scene = Scene()
+    first = scene.play_scene_02()
+    random.random()
+    scene.play_scene_01()
+    assert scene.play_scene_02() == first
+    assert Scene.play_scene_02.__wrapped__.__name__ == "play_scene_02"
+
+
+def _partial(directory, name, data=b"movie"):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_partials_are_shared_through_the_store(tmp_path):
+    cache_dir = str(tmp_path / "render_cache")
+    first, second = render_cache.new_work_dir(cache_dir), render_cache.new_work_dir(cache_dir)
+    assert first != second and os.path.dirname(first) == os.path.join(cache_dir, render_cache.WORK_DIR)
+    _partial(first, "1_2_3.mp4")
+    _partial(first, render_cache.PARTIAL_LIST, b"file '1_2_3.mp4'")
+    assert render_cache.publish_partials(first, cache_dir) == 1
+    assert render_cache.publish_partials(first, cache_dir) == 0
+    assert os.listdir(render_cache.store_dir(cache_dir)) == ["1_2_3.mp4"]
+
+    os.makedirs(second)
+    assert render_cache.fetch_partial("1_2_3.mp4", second, cache_dir)
+    assert not render_cache.fetch_partial("4_5_6.mp4", second, cache_dir)
+    with open(os.path.join(second, "1_2_3.mp4"), "rb") as f:
+        assert f.read() == b"movie"
+
+
+def test_pruning_keeps_partials_a_render_has_linked(tmp_path):
+    cache_dir = str(tmp_path / "render_cache")
+    store = render_cache.store_dir(cache_dir)
+    for i, name in enumerate(["old.mp4", "mid.mp4", "new.mp4"]):
+        os.utime(_partial(store, name), (1000 + i, 1000 + i))
+    work_dir = render_cache.new_work_dir(cache_dir)
+    os.makedirs(work_dir)
+    assert render_cache.fetch_partial("mid.mp4", work_dir, cache_dir)
+    # fetch 更新了 mid.mp4 的访问时间，最旧的是 old.mp4
+    assert render_cache.prune_store(2, cache_dir) == 1
+    assert sorted(os.listdir(store)) == ["mid.mp4", "new.mp4"]
+    # 存储里的文件被淘汰后，已经链接到工作目录的分段仍然可用
+    os.utime(os.path.join(store, "mid.mp4"), (900, 900))
+    assert render_cache.prune_store(1, cache_dir) == 1
+    assert os.listdir(store) == ["new.mp4"]
+    with open(os.path.join(work_dir, "mid.mp4"), "rb") as f:
+        assert f.read() == b"movie"
+
+
+def test_renders_use_their_own_work_dirs_and_share_the_store(tmp_path, monkeypatch):
+    manim = pytest.importorskip("manim")
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    monkeypatch.setattr(render_cache, "_installed", False)
+    monkeypatch.setattr(manim.Scene, "__init__", manim.Scene.__init__)
+    monkeypatch.setattr(manim.Scene, "render", manim.Scene.render)
+    monkeypatch.setattr(SceneFileWriter, "is_already_cached", SceneFileWriter.is_already_cached)
+    monkeypatch.setattr(SceneFileWriter, "finish", SceneFileWriter.finish)
+    cache_dir = str(tmp_path / "render_cache")
+    monkeypatch.setattr(render_cache, "RENDER_CACHE_DIR", cache_dir)
+
+    class Square(manim.Scene):
+        def construct(self):
+            self.play(manim.Create(manim.Square()), run_time=0.5)
+
+    with manim.tempconfig({"media_dir": str(tmp_path / "media"), "disable_caching": True, "frame_rate": 10,
+                           "pixel_width": 160, "pixel_height": 90}):
+        render_cache.install_render_cache(enable_cache=True)
+        first, second = Square(), Square()
+        work_dirs = [str(scene.renderer.file_writer.partial_movie_directory) for scene in (first, second)]
+        assert work_dirs[0] != work_dirs[1]
+        first.render()
+        stored = os.listdir(render_cache.store_dir(cache_dir))
+        assert len(stored) == 1 and not os.path.exists(work_dirs[0])
+        second.render()
+        assert os.listdir(render_cache.store_dir(cache_dir)) == stored
+        assert os.path.getsize(str(second.renderer.file_writer.movie_file_path)) > 0
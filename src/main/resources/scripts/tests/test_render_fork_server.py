@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import json
+import select
+import socket
+
+import pytest
+
+import render_fork_server
+from render_fork_server import ForkServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = ForkServer(str(tmp_path / "render.sock"), size=1)
+    server.listen()
+    yield server
+    server.server.close()
+
+
+def _connect(server):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(5)
+    client.connect(server.socket_path)
+    return client
+
+
+def _reply(server, client):
+    for _ in range(20):
+        server.handle_events(timeout=0.05)
+        if select.select([client], [], [], 0)[0]:
+            break
+    with client.makefile("r", encoding="utf-8") as stream:
+        return json.loads(stream.readline())
+
+
+def test_slow_client_does_not_block_other_connections(server):
+    slow = _connect(server)
+    slow.sendall(b'{"cancel": ')
+    server.handle_events(timeout=0.05)
+    server.handle_events(timeout=0.05)
+
+    fast = _connect(server)
+    fast.sendall(b'{"cancel": "a1"}\n')
+    assert _reply(server, fast) == {"ok": True, "cancelled": False}
+
+    slow.sendall(b'"a2"}\n')
+    assert _reply(server, slow) == {"ok": True, "cancelled": False}
+    assert not server.requests
+
+
+def test_invalid_and_silent_clients_are_answered(server, monkeypatch):
+    broken = _connect(server)
+    broken.sendall(b"not json\n")
+    assert _reply(server, broken)["error"].startswith("Invalid job")
+
+    monkeypatch.setattr(render_fork_server, "READ_TIMEOUT", 0)
+    silent = _connect(server)
+    assert "no job line" in _reply(server, silent)["error"]
+    assert not server.requests
+
+
+def test_job_limits_cannot_raise_the_server_caps(server):
+    client = _connect(server)
+    client.sendall(b'{"id": "a1", "code": "", "limits": {"wall_time": 0}}\n')
+    reply = _reply(server, client)
+    assert reply["id"] == "a1" and reply["error"].startswith("Invalid limits")
+    assert not server.pending and not server.children
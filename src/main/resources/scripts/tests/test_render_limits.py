@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from render_limits import FrameLimitExceeded, JobLimits, kill_process_group, limit_frames
+
+
+def test_merged_overrides_only_known_limits():
+    limits = JobLimits(wall_time=1800, memory_mb=4096, cpu_time=3600, max_frames=36000)
+    merged = limits.merged({"wall_time": 60, "max_frames": 0, "priority": 1})
+    assert merged.to_dict() == {"wall_time": 60, "memory_mb": 4096, "cpu_time": 3600, "max_frames": 0}
+    assert limits.wall_time == 1800
+    assert limits.merged(None).to_dict() == limits.to_dict()
+
+
+def test_job_limits_can_only_lower_the_caps():
+    limits = JobLimits(wall_time=1800, memory_mb=4096, cpu_time=0, max_frames=36000)
+    restricted = limits.restricted({"wall_time": 60, "memory_mb": 10 ** 6, "cpu_time": 30})
+    assert restricted.to_dict() == {"wall_time": 60, "memory_mb": 4096, "cpu_time": 30, "max_frames": 36000}
+    assert limits.restricted(None).to_dict() == limits.to_dict()
+    for overrides in ({"wall_time": 0}, {"max_frames": None}, {"memory_mb": -1}, {"cpu_time": "10"},
+                      {"wall_time": True}, {"priority": 1}):
+        with pytest.raises(ValueError):
+            limits.restricted(overrides)
+
+
+def test_describe_names_the_limit():
+    limits = JobLimits(wall_time=60, memory_mb=512, cpu_time=30, max_frames=900)
+    assert limits.describe("wall_time") == "60s wall-clock"
+    assert limits.describe("memory_mb") == "512 MB of memory"
+    assert limits.describe("cpu_time") == "30s CPU time"
+    assert limits.describe("max_frames") == "900 frames"
+
+
+def test_process_limits_are_applied_in_the_child():
+    code = ("import json, os, resource; from render_limits import JobLimits, apply_process_limits; "
+            "apply_process_limits(JobLimits(memory_mb=2048, cpu_time=10)); "
+            "print(json.dumps([os.getpgrp() == os.getpid(), resource.getrlimit(resource.RLIMIT_AS)[0], "
+            "resource.getrlimit(resource.RLIMIT_CPU)[0]]))")
+    scripts_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=scripts_dir, check=True,
+                            stdout=subprocess.PIPE, text=True).stdout
+    leader, memory, cpu = json.loads(output)
+    assert leader
+    assert memory <= 2048 * 1024 * 1024
+    assert cpu <= 10
+
+
+def test_kill_process_group_kills_the_children():
+    process = subprocess.Popen(["sh", "-c", "sleep 30 & wait"], start_new_session=True)
+    assert kill_process_group(process.pid)
+    assert process.wait(5) == -signal.SIGKILL
+    # 孤儿 sleep 要等 init 回收后才从进程组里消失
+    deadline = time.time() + 5
+    while kill_process_group(process.pid, 0) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not kill_process_group(process.pid)
+
+
+def test_frame_limit_stops_long_animations():
+    manim = pytest.importorskip("manim")
+
+    class Long(manim.Scene):
+        def construct(self):
+            self.wait(1)
+            self.wait(3600)
+
+    with manim.tempconfig({"dry_run": True, "frame_rate": 30}), limit_frames(900):
+        with pytest.raises(FrameLimitExceeded, match="limit of 900"):
+            Long().render()
+
+
+def test_frames_are_counted_once_per_play():
+    manim = pytest.importorskip("manim")
+
+    class Short(manim.Scene):
+        def construct(self):
+            # 60 帧，重复计数会变成 120 帧，超过 100 帧的上限
+            self.play(manim.Create(manim.Square()), run_time=2)
+
+    with manim.tempconfig({"dry_run": True, "frame_rate": 30}), limit_frames(100):
+        Short().render()
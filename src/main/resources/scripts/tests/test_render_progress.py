@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import render_progress
+from render_progress import ProgressReporter
+
+
+def _reporter(events, planned_duration=None):
+    # 间隔设得很大，只有 force 的事件会立即发出
+    return ProgressReporter(events.append, planned_duration, interval=3600)
+
+
+def test_frames_accumulate_repeated_frames():
+    reporter = _reporter([])
+    reporter.frame_written()
+    reporter.frame_written(30)
+    assert reporter.snapshot()["frames"] == 31
+
+
+def test_animations_add_planned_frames():
+    reporter = _reporter([])
+    reporter.animation_started(1.5, 30)
+    reporter.animation_started(0.5, 30)
+    snapshot = reporter.snapshot()
+    assert snapshot["animation"] == 2
+    assert snapshot["planned_frames"] == 60
+
+
+def test_eta_from_total_frames(monkeypatch):
+    reporter = _reporter([])
+    reporter.total_frames = 300
+    reporter.started = 100.0
+    reporter.frame_written(100)
+    monkeypatch.setattr(render_progress.time, "time", lambda: 110.0)
+    assert reporter.snapshot()["eta"] == 20.0
+
+
+def test_scene_start_is_reported_at_once():
+    events = []
+    reporter = _reporter(events)
+    reporter.scene_count = 2
+    reporter.scene_started("play_scene_01")
+    reporter.frame_written(10)
+    assert [event["scene"] for event in events] == ["play_scene_01"]
+    assert events[0]["scene_index"] == 1 and events[0]["frames"] == 0
+
+
+def test_each_play_is_counted_once(tmp_path):
+    manim = pytest.importorskip("manim")
+
+    class ThreePlays(manim.Scene):
+        def construct(self):
+            square = manim.Square()
+            self.play(manim.Create(square), run_time=1)
+            self.wait(0.5)
+            self.play(square.animate.shift(manim.RIGHT), run_time=1)
+
+    events = []
+    with manim.tempconfig({"media_dir": str(tmp_path), "disable_caching": True, "frame_rate": 10,
+                           "pixel_width": 160, "pixel_height": 90}):
+        with render_progress.track_progress(events.append, interval=3600) as reporter:
+            ThreePlays().render()
+            snapshot = reporter.snapshot()
+    assert snapshot["animation"] == 3
+    assert snapshot["planned_frames"] == 25
+    assert snapshot["frames"] == pytest.approx(25, abs=3)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import os
+
+from render_result_cache import ResultCache, normalize_code, render_key
+
+CODE = '''
+from manim import *
+
+class CombinedScene(Scene):
+    def construct(self):
+        self.play(Create(Circle(radius=1,
+                                color=BLUE)))
+
+if __name__ == "__main__":
+    config.media_dir = r"#(output_path)"
+'''
+
+REFORMATTED = '''# 另一种写法
+from manim import *
+
+
+class CombinedScene(Scene):
+    def construct(self):
+        # 画一个圆
+        self.play(Create(Circle(radius=1, color=BLUE)))
+
+
+if __name__ == "__main__":
+    config.media_dir = r"#(output_path)"
+'''
+
+
+def test_comments_formatting_and_placeholders_do_not_change_the_key():
+    assert normalize_code(CODE) == normalize_code(REFORMATTED)
+    assert render_key(CODE) == render_key(REFORMATTED)
+
+
+def test_code_and_options_change_the_key():
+    key = render_key(CODE, quality="full", voice="openai/alloy")
+    assert render_key(CODE.replace("radius=1", "radius=2"), quality="full", voice="openai/alloy") != key
+    assert render_key(CODE, quality="preview", voice="openai/alloy") != key
+    assert render_key(CODE, quality="full", voice="openai/nova") != key
+
+
+def test_unparsable_code_is_not_cached(tmp_path):
+    assert render_key("def broken(:") is None
+    cache = ResultCache(str(tmp_path))
+    cache.put(None, "movie.mp4", "out.mp4")
+    assert cache.get(None) is None
+    assert not os.path.exists(str(tmp_path / "results"))
+
+
+def test_entry_is_a_miss_once_its_movie_is_deleted(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = render_key(CODE, quality="full")
+    movie = tmp_path / "CombinedScene.mp4"
+    movie.write_bytes(b"video")
+    assert cache.get(key) is None
+    cache.put(key, str(movie), "/cache/1/CombinedScene.mp4", task_id="1")
+    entry = ResultCache(str(tmp_path)).get(key)
+    assert entry["output"] == "/cache/1/CombinedScene.mp4" and entry["taskId"] == "1"
+    movie.unlink()
+    assert cache.get(key) is None
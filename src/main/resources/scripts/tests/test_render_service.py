@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import render_service
+
+
+def test_is_loopback():
+    for host in ("127.0.0.1", "127.0.0.2", "::1", "localhost"):
+        assert render_service.is_loopback(host)
+    for host in ("0.0.0.0", "::", "192.168.1.10", "render.example.com"):
+        assert not render_service.is_loopback(host)
+
+
+def test_remote_bind_requires_a_key(monkeypatch, capsys):
+    monkeypatch.delenv("RENDER_SERVICE_KEY", raising=False)
+    monkeypatch.setattr(sys, "argv", ["render_service.py", "--host", "0.0.0.0"])
+    monkeypatch.setattr(render_service, "RenderService", None)
+    with pytest.raises(SystemExit) as e:
+        render_service.main()
+    assert e.value.code == 2
+    assert "RENDER_SERVICE_KEY" in capsys.readouterr().err
+
+
+CODE = '''
+from manim import *
+
+class CombinedScene(Scene):
+    def construct(self):
+        self.play(Create(Circle()))
+
+if __name__ == "__main__":
+    config.media_dir = r"#(output_path)"
+'''
+
+
+@pytest.fixture
+def service_and_submit(tmp_path, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    jobs = []
+
+    def submit(socket_path, job, on_progress=None):
+        jobs.append(job)
+        started.set()
+        release.wait(5)
+        if on_progress:
+            on_progress({"event": "progress", "frames": 30})
+        movie = tmp_path / "cache" / job["id"] / "CombinedScene.mp4"
+        movie.parent.mkdir(parents=True, exist_ok=True)
+        movie.write_bytes(b"video")
+        return {"id": job["id"], "ok": True, "movies": [str(movie)], "stdout": "", "stderr": ""}
+
+    monkeypatch.setattr(render_service, "submit", submit)
+    fake = types.SimpleNamespace(started=started, release=release, jobs=jobs)
+    return render_service.RenderService(str(tmp_path), concurrency=2), fake
+
+
+def test_identical_requests_share_one_render(service_and_submit):
+    service, fake = service_and_submit
+    events = {"leader": [], "follower": []}
+    results = {}
+
+    def request(name, code):
+        results[name] = service.execute(code, on_progress=events[name].append)
+
+    leader = threading.Thread(target=request, args=("leader", CODE))
+    leader.start()
+    assert fake.started.wait(5)
+    # 只有注释和格式不同的代码等待同一次渲染
+    follower = threading.Thread(target=request, args=("follower", "# same video\n" + CODE))
+    follower.start()
+    for _ in range(100):
+        if service.status()["coalesced"]:
+            break
+        time.sleep(0.01)
+    fake.release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(fake.jobs) == 1
+    assert results["follower"]["coalesced"] and not results["leader"]["coalesced"]
+    assert results["follower"]["output"] == results["leader"]["output"]
+    assert events["leader"] == events["follower"] == [{"event": "progress", "frames": 30}]
+    assert service.status()["inflight"] == 0
+
+    cached = service.execute(CODE)
+    assert cached["cached"] and cached["output"] == results["leader"]["output"]
+    assert len(fake.jobs) == 1
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+import render_worker
+
+# 按 stdio 协议应答的最小 worker：crash 任务直接退出进程，每两个任务要求回收
+FAKE_WORKER = """
+import json, os, sys
+print(json.dumps({"ready": True, "pid": os.getpid()}), flush=True)
+jobs = 0
+for line in sys.stdin:
+    job = json.loads(line)
+    if job.get("crash"):
+        os._exit(3)
+    jobs += 1
+    print(json.dumps({"id": job["id"], "ok": True, "pid": os.getpid(), "recycle": jobs >= 2}), flush=True)
+"""
+
+
+def test_worker_recycles_after_max_jobs(monkeypatch):
+    monkeypatch.setattr(render_worker, "run_job", lambda job: {"id": job["id"], "ok": True})
+    monkeypatch.setattr(render_worker, "rss_mb", lambda: 100.0)
+    worker = render_worker.Worker(max_jobs=2, max_rss_mb=200)
+    assert not worker.handle({"id": "a1"})["recycle"]
+    result = worker.handle({"id": "a2"})
+    assert result["recycle"] and result["jobs"] == 2
+
+
+def test_worker_recycles_above_the_rss_threshold(monkeypatch):
+    monkeypatch.setattr(render_worker, "run_job", lambda job: {"id": job["id"], "ok": True})
+    monkeypatch.setattr(render_worker, "rss_mb", lambda: 250.0)
+    result = render_worker.Worker(max_jobs=10, max_rss_mb=200).handle({"id": "a1"})
+    assert result["recycle"] and result["jobs"] == 1 and result["rss_mb"] == 250.0
+
+
+def test_warm_worker_survives_a_crashing_job_and_recycles(tmp_path):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER, encoding="utf-8")
+    worker = render_worker.WarmWorker(cwd=str(tmp_path))
+    worker.command = [sys.executable, str(script)]
+    try:
+        first = worker.run({"id": "a1"})
+        assert first["ok"]
+        crashed = worker.run({"id": "a2", "crash": True})
+        assert not crashed["ok"] and crashed["error"].startswith("Render worker died")
+        assert crashed["id"] == "a2"
+        # 进程死掉后下一个任务启动新的 worker
+        second = worker.run({"id": "a3"})
+        assert second["ok"] and second["pid"] != first["pid"]
+        recycled = worker.run({"id": "a4"})
+        assert recycled["recycle"] and worker.process is None
+        assert worker.run({"id": "a5"})["pid"] != recycled["pid"]
+    finally:
+        worker.close()
+
+
+def test_isolated_job_restores_interpreter_state(tmp_path, monkeypatch):
+    manim = pytest.importorskip("manim")
+    pytest.importorskip("requests")
+    import custom_voiceover
+
+    monkeypatch.setattr(custom_voiceover, "_pending", {})
+    monkeypatch.setattr(custom_voiceover, "CACHE_DIR", custom_voiceover.CACHE_DIR)
+    monkeypatch.setattr(custom_voiceover, "resolve_tracker",
+                        lambda text, **voice: custom_voiceover.CustomVoiceoverTracker(None, 0))
+    monkeypatch.setattr(manim.Scene, "__init__", manim.Scene.__init__)
+    job_dir = tmp_path / "job"
+    job_dir.mkdir()
+    (job_dir / "job_helpers.py").write_text("VALUE = 1\n", encoding="utf-8")
+    cwd, path, argv = os.getcwd(), list(sys.path), list(sys.argv)
+    init, frame_rate, cache_dir = manim.Scene.__init__, manim.config.frame_rate, custom_voiceover.CACHE_DIR
+
+    with render_worker.isolated_job(str(job_dir)):
+        os.chdir(job_dir)
+        sys.path.insert(0, str(job_dir))
+        sys.argv[:] = ["main.py", "--draft"]
+        import job_helpers  # noqa: F401
+        manim.config.frame_rate = 5
+        manim.Scene.__init__ = lambda self, *args, **kwargs: None
+        custom_voiceover.set_cache_dir(str(job_dir / "audio"), force=True)
+        custom_voiceover.request_voiceover("hello")
+
+    assert (os.getcwd(), sys.path, sys.argv) == (cwd, path, argv)
+    assert "job_helpers" not in sys.modules
+    assert manim.config.frame_rate == frame_rate
+    assert manim.Scene.__init__ is init
+    assert custom_voiceover.CACHE_DIR == cache_dir
+    assert custom_voiceover._pending == {}
+
+
+def test_warm_worker_reports_failing_scripts(tmp_path):
+    pytest.importorskip("manim")
+    failing = tmp_path / "failing.py"
+    failing.write_text("raise RuntimeError('boom')\n", encoding="utf-8")
+    exiting = tmp_path / "exiting.py"
+    exiting.write_text("import os\nos._exit(3)\n", encoding="utf-8")
+    quiet = tmp_path / "quiet.py"
+    quiet.write_text("print('no scenes')\n", encoding="utf-8")
+
+    worker = render_worker.WarmWorker()
+    try:
+        result = worker.run({"id": "a1", "script": str(failing)})
+        assert not result["ok"] and result["error"] == "RuntimeError: boom"
+        pid = worker.process.pid
+        # 抛异常的任务不影响 worker，退出进程的任务由下一个新 worker 接手
+        assert worker.run({"id": "a2", "script": str(quiet)})["ok"] and worker.process.pid == pid
+        assert worker.run({"id": "a3", "script": str(exiting)})["error"].startswith("Render worker died")
+        assert worker.run({"id": "a4", "script": str(quiet)})["ok"] and worker.process.pid != pid
+    finally:
+        worker.close()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import ast
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import scene_parallel
+
+SCRIPT = '''
+from manim import *
+
+
+class CombinedScene(Scene):
+    def construct(self):
+        self.camera.background_color = BLACK
+        self.play_scene_01()
+        self.clear_and_reset()
+        self.play_scene_02()
+        self.play_scene_03()
+        self.clear_and_reset()
+        self.play_scene_04()
+
+    def clear_and_reset(self):
+        self.clear()
+
+    def play_scene_01(self):
+        self.play(Create(Square()), run_time=0.5)
+
+    def play_scene_02(self):
+        self.play(Create(Circle()), run_time=0.5)
+
+    def play_scene_03(self):
+        self.wait(0.5)
+
+    def play_scene_04(self):
+        self.play(FadeIn(Triangle()), run_time=0.5)
+
+
+if __name__ == "__main__":
+    config.pixel_width = 160
+    config.pixel_height = 90
+    config.frame_rate = 10
+    config.output_file = "CombinedScene"
+    config.disable_caching = True
+    config.media_dir = "media"
+    scene = CombinedScene()
+    scene.render()
+'''
+
+needs_ffmpeg = pytest.mark.skipif(
+    shutil.which(scene_parallel._ffmpeg()) is None or shutil.which(scene_parallel._ffprobe()) is None,
+    reason="ffmpeg/ffprobe not installed")
+
+
+def _construct(source=SCRIPT):
+    return scene_parallel.find_construct(ast.parse(source), "CombinedScene")
+
+
+def test_plan_segments_splits_at_clear_and_reset():
+    plan = scene_parallel.plan_segments(_construct())
+    assert plan.prelude == [0]
+    assert plan.segments == [[1, 2], [3, 4, 5], [6]]
+    assert plan.labels == ["01", "02+03", "04"]
+
+
+def test_find_construct_requires_the_scene():
+    with pytest.raises(ValueError):
+        scene_parallel.find_construct(ast.parse(SCRIPT), "OtherScene")
+
+
+def test_segment_construct_runs_prelude_and_one_segment():
+    construct = _construct()
+    plan = scene_parallel.plan_segments(construct)
+    calls = []
+
+    class Recorder:
+        camera = type("Camera", (), {})()
+
+        def __getattr__(self, name):
+            return lambda: calls.append(name)
+
+    func = scene_parallel.build_segment_construct(construct, plan, 1, "script.py", {"BLACK": "#000000"})
+    func(Recorder())
+    assert calls == ["play_scene_02", "play_scene_03", "clear_and_reset"]
+
+
+def _video(path, seconds, audio):
+    inputs = ["-f", "lavfi", "-i", f"color=c=black:s=160x90:r=10:d={seconds}"]
+    if audio:
+        inputs += ["-f", "lavfi", "-i", f"sine=f=440:d={seconds}"]
+    subprocess.run([scene_parallel._ffmpeg(), "-v", "error", "-y", *inputs, "-c:v", "libx264", "-pix_fmt", "yuv420p",
+                    *(["-c:a", "aac"] if audio else []), path], check=True)
+    return path
+
+
+@needs_ffmpeg
+def test_render_parallel_stitches_segment_videos(tmp_path, monkeypatch):
+    script = tmp_path / "scene.py"
+    script.write_text(SCRIPT, encoding="utf-8")
+    video_dir = tmp_path / "media" / "videos" / "scene" / "90p10"
+    video_dir.mkdir(parents=True)
+
+    def render_segment(script_path, scene_name, segment):
+        # 第二段没有旁白，没有音轨
+        return _video(str(video_dir / f"CombinedScene_part{segment:02d}.mp4"), 1, audio=segment != 1)
+
+    monkeypatch.setattr(scene_parallel, "render_segment", render_segment)
+    output = scene_parallel.render_parallel(str(script), workers=2)
+    assert output == str(video_dir / "CombinedScene.mp4")
+    assert sorted(os.listdir(str(video_dir))) == ["CombinedScene.mp4"]
+    assert scene_parallel.probe_audio(output)[0] == "aac"
+
+
+@needs_ffmpeg
+def test_render_parallel_end_to_end(tmp_path):
+    pytest.importorskip("manim")
+    script = tmp_path / "scene.py"
+    script.write_text(SCRIPT, encoding="utf-8")
+    subprocess.run([sys.executable, scene_parallel.__file__, str(script), "--workers", "3"], check=True,
+                   cwd=str(tmp_path))
+    video_dir = tmp_path / "media" / "videos" / "scene" / "90p10"
+    assert os.path.exists(str(video_dir / "CombinedScene.mp4"))
+    assert not [name for name in os.listdir(str(video_dir)) if "_part" in name and name.endswith(".mp4")]
+    # 每个分段有自己的分段目录，并行渲染时不会互相覆盖
+    partial_dirs = sorted(os.listdir(str(video_dir / "partial_movie_files")))
+    assert partial_dirs == ["CombinedScene_part00", "CombinedScene_part01", "CombinedScene_part02"]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+
+import pytest
+
+import stream_encoder
+
+np = pytest.importorskip("numpy")
+pytestmark = pytest.mark.skipif(shutil.which(stream_encoder._ffmpeg()) is None, reason="ffmpeg not installed")
+
+
+def _frame(value):
+    return np.full((90, 160, 4), value, dtype=np.uint8)
+
+
+def test_one_encoder_records_animation_boundaries(tmp_path):
+    path = str(tmp_path / "CombinedScene.mp4")
+    encoder = stream_encoder.StreamEncoder(path, 160, 90, 10)
+    encoder.begin("hash_a")
+    for value in range(5):
+        encoder.write(_frame(value * 40))
+    encoder.end()
+    encoder.begin("hash_b")
+    # wait() 写一帧并重复 num_frames 次
+    encoder.write(_frame(255), num_frames=15)
+    encoder.end()
+    encoder.end()
+    encoder.close()
+
+    assert os.path.getsize(path) > 0
+    manifest_path = stream_encoder.write_manifest(encoder, path)
+    assert manifest_path == str(tmp_path / "CombinedScene.manifest.json")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["frames"] == 20
+    assert [(a["hash"], a["start_frame"], a["frames"], a["start"], a["duration"])
+            for a in manifest["animations"]] == [("hash_a", 0, 5, 0.0, 0.5), ("hash_b", 5, 15, 0.5, 1.5)]
+
+
+def test_close_reports_ffmpeg_failure(tmp_path):
+    encoder = stream_encoder.StreamEncoder(str(tmp_path / "missing" / "out.mp4"), 160, 90, 10)
+    with pytest.raises(RuntimeError):
+        encoder.close()
+
+
+SCRIPT_SCENE = '''
+from manim import *
+
+
+class CombinedScene(Scene):
+    def construct(self):
+        square = Square()
+        self.play(Create(square), run_time=0.5)
+        self.wait(1)
+        self.play(square.animate.shift(RIGHT), run_time=0.2)
+'''
+
+
+def test_patched_writer_streams_a_render_with_content_hashes(tmp_path, monkeypatch):
+    manim = pytest.importorskip("manim")
+    from manim.renderer.cairo_renderer import CairoRenderer
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    for name in ("begin_animation", "end_animation", "write_frame", "add_partial_movie_file", "combine_to_movie"):
+        monkeypatch.setattr(SceneFileWriter, name, getattr(SceneFileWriter, name))
+    monkeypatch.setattr(CairoRenderer, "play", CairoRenderer.play)
+    monkeypatch.setattr(stream_encoder, "_installed", False)
+    stream_encoder.install_stream_encoder()
+    namespace = {}
+    exec(SCRIPT_SCENE, namespace)
+
+    def render():
+        with manim.tempconfig({"media_dir": str(tmp_path / "media"), "disable_caching": True,
+                               "pixel_width": 160, "pixel_height": 90, "frame_rate": 10}):
+            scene = namespace["CombinedScene"]()
+            scene.render()
+            return str(scene.renderer.file_writer.movie_file_path)
+
+    movie = render()
+    assert os.path.getsize(movie) > 0
+    assert not os.path.exists(os.path.splitext(movie)[0] + ".stream.mp4")
+    with open(os.path.splitext(movie)[0] + ".manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert len(manifest["animations"]) == 3
+    assert sum(a["frames"] for a in manifest["animations"]) == manifest["frames"] > 0
+    hashes = [a["hash"] for a in manifest["animations"]]
+    assert not any(h.startswith("uncached_") for h in hashes)
+    assert len(set(hashes)) == 3
+    # 同样的场景再渲染一次，哈希相同，可以与缓存的分段对应
+    render()
+    with open(os.path.splitext(movie)[0] + ".manifest.json", "r", encoding="utf-8") as f:
+        assert [a["hash"] for a in json.load(f)["animations"]] == hashes
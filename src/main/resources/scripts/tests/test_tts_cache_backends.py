@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import tts_cache_backends
+from tts_cache_backends import DirBackend, HttpBlobBackend, parse_backends
+
+
+def test_parse_backends():
+    backends = parse_backends(" dir:/mnt/tts , http://127.0.0.1:8766/blobs/,/srv/tts,")
+    assert [type(b) for b in backends] == [DirBackend, HttpBlobBackend, DirBackend]
+    assert backends[0].root == "/mnt/tts"
+    assert backends[1].base_url == "http://127.0.0.1:8766/blobs"
+    assert parse_backends("") == []
+
+
+def test_dir_backend_round_trip(tmp_path):
+    backend = DirBackend(str(tmp_path / "shared"))
+    src = tmp_path / "clip.mp3"
+    src.write_bytes(b"audio")
+    key = "ab" * 16
+    dest = str(tmp_path / "local" / "clip.mp3")
+    assert backend.get(key, "mp3", dest) is False
+    backend.put(key, "mp3", str(src))
+    assert os.path.exists(tts_cache_backends.sharded_path(backend.root, f"{key}.mp3"))
+    assert backend.get(key, "mp3", dest) is True
+    with open(dest, "rb") as f:
+        assert f.read() == b"audio"
+
+
+def test_http_backend_round_trip_against_the_blob_server(tmp_path):
+    requests = pytest.importorskip("requests")
+    import tts_blob_server
+
+    server, base_url = tts_blob_server.start_server(str(tmp_path / "blobs"), token="secret")
+    try:
+        backend = HttpBlobBackend(base_url, token="secret")
+        src = tmp_path / "clip.mp3"
+        src.write_bytes(b"audio" * 1000)
+        key = "cd" * 16
+        dest = str(tmp_path / "local" / "clip.mp3")
+        assert backend.get(key, "mp3", dest) is False
+        backend.put(key, "mp3", str(src))
+        assert os.path.exists(tts_cache_backends.sharded_path(str(tmp_path / "blobs"), f"{key}.mp3"))
+        assert backend.get(key, "mp3", dest) is True
+        with open(dest, "rb") as f:
+            assert f.read() == b"audio" * 1000
+
+        with pytest.raises(requests.HTTPError):
+            HttpBlobBackend(base_url, token="wrong").get(key, "mp3", dest)
+        # 摘要不符的上传被拒绝，不会覆盖已有的片段
+        response = requests.put(f"{base_url}/{key}.mp3", data=b"truncated", timeout=5,
+                                headers={"Authorization": "Bearer secret", tts_cache_backends.HASH_HEADER: "0" * 64})
+        assert response.status_code == 400
+        assert backend.get(key, "mp3", dest) is True
+        with open(dest, "rb") as f:
+            assert f.read() == b"audio" * 1000
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import tts_cache_index
+import tts_offline
+
+
+def _clip(cache_dir, key, seconds=1.0):
+    path = os.path.join(str(cache_dir), key[:2], key[2:4], f"{key}.mp3")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(tts_offline.silent_mp3(seconds))
+    return path
+
+
+@pytest.fixture
+def index(tmp_path):
+    return tts_cache_index.CacheIndex(str(tmp_path))
+
+
+def test_record_lookup_touch(index, tmp_path):
+    path = _clip(tmp_path, "a" * 32)
+    index.record("a" * 32, path, voice="openai/alloy", duration=1.0)
+    entry = index.lookup("a" * 32)
+    assert entry.path == os.path.relpath(path, str(tmp_path))
+    assert entry.size == os.path.getsize(path)
+    assert entry.voice == "openai/alloy"
+    index.touch("a" * 32)
+    assert index.lookup("a" * 32).hits == 1
+    assert index.lookup("b" * 32) is None
+
+
+def test_stats_per_voice(index, tmp_path):
+    index.record("a" * 32, _clip(tmp_path, "a" * 32), voice="v1", duration=1.0)
+    index.record("b" * 32, _clip(tmp_path, "b" * 32), voice="v1", duration=2.0)
+    index.record("c" * 32, _clip(tmp_path, "c" * 32), voice="v2", duration=3.0)
+    stats = index.stats()
+    assert stats["count"] == 3
+    assert stats["duration"] == pytest.approx(6.0)
+    assert stats["voices"][0] == {"voice": "v1", "count": 2, "bytes": stats["bytes"] - index.lookup("c" * 32).size}
+
+
+def test_rebuild_adds_files_and_drops_missing(index, tmp_path):
+    _clip(tmp_path, "a" * 32)
+    gone = _clip(tmp_path, "b" * 32)
+    index.record("b" * 32, gone)
+    os.remove(gone)
+    assert index.rebuild() == (1, 1)
+    assert index.lookup("a" * 32).duration > 0
+    assert index.lookup("b" * 32) is None
+
+
+def test_get_index_is_shared_per_directory(tmp_path):
+    first = tts_cache_index.get_index(str(tmp_path))
+    assert tts_cache_index.get_index(os.path.join(str(tmp_path), ".")) is first
+
+
+def _fill(index, tmp_path, keys):
+    for i, key in enumerate(keys):
+        index.record(key, _clip(tmp_path, key))
+        # 固定访问顺序，越靠前越久未访问
+        index._connect().execute("UPDATE clips SET last_access = ? WHERE key = ?", (1000 + i, key))
+    return os.path.getsize(index.abspath(index.lookup(keys[0])))
+
+
+def test_evict_least_recently_used(index, tmp_path):
+    keys = [c * 32 for c in "abcd"]
+    size = _fill(index, tmp_path, keys)
+    assert index.evict(size * 3, target_ratio=0.9) == (2, size * 2)
+    assert [index.lookup(key) is None for key in keys] == [True, True, False, False]
+    assert not os.path.exists(os.path.join(str(tmp_path), "aa", "aa", "a" * 32 + ".mp3"))
+
+
+def test_evict_under_budget_does_nothing(index, tmp_path):
+    size = _fill(index, tmp_path, ["a" * 32, "b" * 32])
+    assert index.evict(size * 2) == (0, 0)
+    assert index.evict(0) == (0, 0)
+
+
+def test_evict_skips_pinned(index, tmp_path):
+    keys = [c * 32 for c in "abcd"]
+    size = _fill(index, tmp_path, keys)
+    index.pin("a" * 32)
+    index.evict(size * 3, target_ratio=0.9)
+    assert index.lookup("a" * 32) is not None
+    assert index.lookup("b" * 32) is None
+    assert index.lookup("c" * 32) is None
+    index.unpin_all()
+    index.evict(size, target_ratio=0.5)
+    assert index.lookup("a" * 32) is None
+
+
+def test_pins_of_exited_processes_are_ignored(index, tmp_path, monkeypatch):
+    size = _fill(index, tmp_path, ["a" * 32, "b" * 32])
+    index._connect().execute(
+        "INSERT INTO pins (key, host, pid, pinned_at) VALUES (?, ?, ?, 0)", ("a" * 32, tts_cache_index._HOST, 999999))
+    monkeypatch.setattr(tts_cache_index, "_pid_alive", lambda pid: pid != 999999)
+    assert index.evict(size, target_ratio=0.5) == (2, size * 2)
+    assert index._connect().execute("SELECT COUNT(*) FROM pins").fetchone()[0] == 0
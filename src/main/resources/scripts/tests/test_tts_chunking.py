@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+
+import pytest
+
+import mp3_duration
+import tts_chunking
+import tts_offline
+from tts_chunking import split_narration
+
+SENTENCE = "函数的导数描述了曲线在某一点的变化率。"
+
+
+def test_short_text_is_one_chunk():
+    assert split_narration("你好，世界。", 60) == ["你好，世界。"]
+    assert split_narration(SENTENCE * 10, 0) == [SENTENCE * 10]
+
+
+def test_one_chunk_per_sentence():
+    text = SENTENCE + "切线的斜率就是导数的值！" + "我们来看一个例子？"
+    assert split_narration(text, 20) == [SENTENCE, "切线的斜率就是导数的值！", "我们来看一个例子？"]
+
+
+def test_sentence_chunk_does_not_depend_on_neighbours():
+    # 同一句话在不同的旁白里拆出的片段相同，才能命中缓存
+    first = split_narration("首先复习一下上节课的内容。" + SENTENCE, 20)
+    second = split_narration(SENTENCE + "接下来看二阶导数的含义。", 20)
+    assert SENTENCE in first and SENTENCE in second
+
+
+def test_english_breaks_need_whitespace():
+    text = "The value is 2.5 here. Then it doubles to 5.0 there! Finally it stops."
+    assert split_narration(text, 30) == ["The value is 2.5 here.", "Then it doubles to 5.0 there!",
+                                         "Finally it stops."]
+
+
+def test_long_sentence_breaks_at_commas():
+    clause = "当自变量的增量趋近于零时，"
+    tail = "所以这个极限存在并且等于导数。"
+    chunks = split_narration(clause * 6 + tail, 30)
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    assert "".join(chunks) == clause * 6 + tail
+
+
+def test_short_fragments_are_merged():
+    assert split_narration("好。" + SENTENCE + "对！" + SENTENCE, 20) == ["好。" + SENTENCE + "对！", SENTENCE]
+    assert split_narration(SENTENCE + "。。" + SENTENCE, 20) == [SENTENCE + "。。", SENTENCE]
+
+
+@pytest.mark.skipif(shutil.which(tts_chunking._ffmpeg_binary()) is None, reason="ffmpeg not installed")
+def test_concat_mp3_reencodes(tmp_path):
+    paths = []
+    for i, seconds in enumerate((1.0, 2.0)):
+        path = str(tmp_path / f"{i}.mp3")
+        with open(path, "wb") as f:
+            f.write(tts_offline.silent_mp3(seconds))
+        paths.append(path)
+    dest = tts_chunking.concat_mp3(paths, str(tmp_path / "joined.mp3"))
+    assert mp3_duration.probe_mp3_duration(dest) == pytest.approx(3.0, abs=0.1)
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".part")]
+
+
+def test_concat_mp3_rejects_non_mp3(tmp_path):
+    path = str(tmp_path / "a.mp3")
+    with open(path, "wb") as f:
+        f.write(b"not audio")
+    with pytest.raises(ValueError):
+        tts_chunking.concat_mp3([path], str(tmp_path / "joined.mp3"))
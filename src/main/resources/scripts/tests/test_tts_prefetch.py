@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("requests")
+
+import tts_prefetch  # noqa: E402
+
+SOURCE = '''
+from custom_voiceover import custom_voiceover_tts, set_cache_dir
+
+set_cache_dir(r"#(output_path)/audio")
+
+
+class CombinedScene(Scene):
+    def play_scene_01(self):
+        voice_text = "第一句。" + "第二句。"
+        with custom_voiceover_tts(voice_text) as tracker:
+            pass
+        with custom_voiceover_tts("直接写的旁白") as tracker:
+            pass
+
+    def play_scene_02(self):
+        self.voice_text_02: str = "第一句。第二句。"
+        with custom_voiceover_tts(f"{name} 不是常量") as tracker:
+            pass
+        self.play_voiceover("最后一句", font_size=28)
+'''
+
+
+def test_extract_narration_in_source_order_without_duplicates():
+    texts, cache_dir = tts_prefetch.extract_narration(SOURCE)
+    assert texts == ["第一句。第二句。", "直接写的旁白", "最后一句"]
+    assert cache_dir == "#(output_path)/audio"
+
+
+def test_prefetch_reports_failures_without_raising(monkeypatch):
+    def fetch_tts(text):
+        if text == "bad":
+            raise OSError("disk full")
+        return f"/cache/{text}.mp3"
+
+    monkeypatch.setattr(tts_prefetch.custom_voiceover, "fetch_tts", fetch_tts)
+    assert tts_prefetch.prefetch(["a", "bad", "a"]) == {"a": "/cache/a.mp3", "bad": None}
+    assert tts_prefetch.prefetch([]) == {}
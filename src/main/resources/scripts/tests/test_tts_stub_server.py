@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pytest
+
+import mp3_duration
+import tts_offline
+import tts_stub_server
+
+
+def test_offline_duration_follows_text_length():
+    assert tts_offline.estimate_seconds("") == tts_offline.MIN_SECONDS
+    assert tts_offline.estimate_seconds("你好世界你好") == pytest.approx(6 * tts_offline.SECONDS_PER_CJK_CHAR)
+    assert tts_offline.synthesize("同一句话") == tts_offline.synthesize("同一句话")
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**config):
+        server, base_url = tts_stub_server.start_server(**config)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _get(base_url, text, token="t"):
+    query = urllib.parse.urlencode({"token": token, "input": text})
+    with urllib.request.urlopen(f"{base_url}?{query}", timeout=5) as response:
+        return response.read()
+
+
+def test_stub_serves_offline_audio(stub, tmp_path):
+    server, base_url = stub()
+    body = _get(base_url, "你好世界你好")
+    assert body == tts_offline.synthesize("你好世界你好")
+    path = tmp_path / "a.mp3"
+    path.write_bytes(body)
+    assert mp3_duration.probe_mp3_duration(str(path)) == pytest.approx(
+        tts_offline.estimate_seconds("你好世界你好"), abs=tts_offline.FRAME_SECONDS)
+
+
+def test_stub_checks_token_and_injects_failures(stub):
+    server, base_url = stub(token="secret", error_rate=1.0)
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _get(base_url, "hello", token="wrong")
+    assert e.value.code == 401
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _get(base_url, "hello", token="secret")
+    assert e.value.code == 500
+    assert server.RequestHandlerClass.config.errors == 1
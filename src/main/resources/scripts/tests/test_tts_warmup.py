@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+
+SCRIPT = '''
+from custom_voiceover import custom_voiceover_tts, set_cache_dir
+set_cache_dir(r"#(output_path)/audio")
+
+class CombinedScene:
+    def play_scene_01(self):
+        voice_text_01 = "第一句旁白。"
+        with custom_voiceover_tts(voice_text_01) as tracker:
+            pass
+        with custom_voiceover_tts("第二句旁白。") as tracker:
+            pass
+'''
+
+
+@pytest.fixture
+def voiceover(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import custom_voiceover
+
+    shared = str(tmp_path / "shared")
+    monkeypatch.setattr(custom_voiceover, "TTS_CACHE_DIR", shared)
+    monkeypatch.setattr(custom_voiceover, "CACHE_DIR", shared)
+    monkeypatch.setattr(custom_voiceover, "TTS_OFFLINE", True)
+    monkeypatch.setattr(custom_voiceover, "TTS_CHUNK_CHARS", 0)
+    monkeypatch.setattr(custom_voiceover, "CACHE_BACKENDS", [])
+    return custom_voiceover
+
+
+def test_collect_narration_from_scripts_and_prompts(tmp_path):
+    from tts_warmup import collect_narration
+
+    (tmp_path / "a.py").write_text(SCRIPT, encoding="utf-8")
+    (tmp_path / "b.txt").write_text("Example:\n```python\n" + SCRIPT + "```\n", encoding="utf-8")
+    assert collect_narration([str(tmp_path)]) == ["第一句旁白。", "第二句旁白。"]
+
+
+def test_warmed_clips_are_hit_by_per_task_scripts(voiceover, tmp_path):
+    from tts_warmup import warm
+
+    stats = warm(["第一句旁白。", "第二句旁白。"], workers=2)
+    assert (stats.misses, stats.failures) == (2, 0)
+    # 生成的脚本按任务设置缓存目录；TTS_CACHE_DIR 固定时仍命中预热的片段
+    voiceover.set_cache_dir(str(tmp_path / "cache" / "task1" / "audio"))
+    path = voiceover.get_cache_filename("第一句旁白。")
+    assert path.startswith(str(tmp_path / "shared")) and os.path.exists(path)
+    assert warm(["第一句旁白。"]).hits == 1
+
+
+def test_chunk_requests_are_rate_limited_and_shared_hits_counted(voiceover, monkeypatch, tmp_path):
+    import tts_stub_server
+    import tts_warmup
+    from tts_cache_backends import DirBackend
+
+    waits = []
+
+    class CountingLimiter:
+        def __init__(self, rate):
+            pass
+
+        def wait(self):
+            waits.append(1)
+
+    server, base_url = tts_stub_server.start_server()
+    try:
+        monkeypatch.setattr(tts_warmup, "RateLimiter", CountingLimiter)
+        monkeypatch.setattr(voiceover, "TTS_OFFLINE", False)
+        monkeypatch.setattr(voiceover, "TTS_BASE_URL", base_url)
+        monkeypatch.setattr(voiceover, "TTS_CHUNK_CHARS", 10)
+        monkeypatch.setattr(voiceover, "CACHE_BACKENDS", [DirBackend(str(tmp_path / "layer"))])
+        texts = ["第一句话比较长一些。第二句话也比较长。", "短句。"]
+
+        stats = tts_warmup.warm(texts, workers=2, rate=4)
+        assert (stats.hits, stats.shared_hits, stats.misses, stats.failures) == (0, 0, 2, 0)
+        # 每个发到 TTS 服务的请求都经过限速，包括长句拆出的两段
+        assert len(waits) == server.RequestHandlerClass.config.requests >= 3
+
+        # 换一台本地缓存为空的机器：从共享层取到，不再请求服务
+        monkeypatch.setattr(voiceover, "CACHE_DIR", str(tmp_path / "other"))
+        stats = tts_warmup.warm(texts, workers=2, rate=4)
+        assert (stats.hits, stats.shared_hits, stats.misses) == (0, 2, 0)
+        assert tts_warmup.warm(texts).hits == 2
+        assert len(waits) == server.RequestHandlerClass.config.requests
+    finally:
+        server.shutdown()
+        server.server_close()
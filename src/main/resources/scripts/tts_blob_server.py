@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal content-verified blob store for the shared TTS cache layer.
+
+    python tts_blob_server.py --root /srv/tts_blobs --port 8766 --token secret
+    TTS_CACHE_BACKENDS=http://127.0.0.1:8766/blobs TTS_BLOB_TOKEN=secret python 08.py
+
+``PUT /blobs/<key>.<ext>`` stores a clip (the ``X-Content-SHA256`` header is
+checked against the body), ``GET``/``HEAD`` return it with its digest. Blobs
+are written to a temp file and renamed, so concurrent uploads of the same
+clip are safe.
+"""
+import argparse
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from tts_cache_backends import BLOB_NAME, HASH_HEADER, file_sha256, sharded_path
+
+PREFIX = "/blobs/"
+MAX_BLOB_BYTES = 64 * 1024 * 1024
+CHUNK_SIZE = 65536
+
+
+class BlobHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    root = "tts_blobs"
+    token = None
+
+    def _blob_path(self):
+        path = urlparse(self.path).path
+        if not path.startswith(PREFIX) or not BLOB_NAME.match(path[len(PREFIX):]):
+            self._send_text(404, "not found")
+            return None
+        if self.token and self.headers.get("Authorization") != f"Bearer {self.token}":
+            self._send_text(401, "invalid token")
+            return None
+        return sharded_path(self.root, path[len(PREFIX):])
+
+    def do_HEAD(self):
+        self._send_blob(head=True)
+
+    def do_GET(self):
+        self._send_blob(head=False)
+
+    def _send_blob(self, head):
+        path = self._blob_path()
+        if path is None:
+            return
+        if not os.path.exists(path):
+            self._send_text(404, "not found")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header(HASH_HEADER, file_sha256(path))
+        self.end_headers()
+        if head:
+            return
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                self.wfile.write(chunk)
+
+    def do_PUT(self):
+        path = self._blob_path()
+        if path is None:
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BLOB_BYTES:
+            self._send_text(400, "invalid Content-Length")
+            return
+        body = self.rfile.read(length)
+        expected = self.headers.get(HASH_HEADER)
+        if expected and hashlib.sha256(body).hexdigest() != expected.lower():
+            self._send_text(400, "digest mismatch")
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        self._send_text(201, "stored")
+
+    def _send_text(self, status, message):
+        body = message.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(root, host="127.0.0.1", port=0, token=None):
+    os.makedirs(root, exist_ok=True)
+    handler = type("ConfiguredBlobHandler", (BlobHandler,), {"root": root, "token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(root, host="127.0.0.1", port=0, token=None):
+    """
+    Starts the blob store in a background thread and returns ``(server, base_url)``.
+    Call ``server.shutdown()`` to stop it.
+    """
+    server = make_server(root, host, port, token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/blobs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blob store for the shared TTS cache")
+    parser.add_argument("--root", default="tts_blobs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--token", default=None, help="require 'Authorization: Bearer <token>'")
+    args = parser.parse_args()
+
+    server = make_server(args.root, args.host, args.port, args.token)
+    print(f"TTS blob store serving {args.root} on http://{args.host}:{args.port}/blobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
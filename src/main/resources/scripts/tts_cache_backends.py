@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Shared layers of the TTS cache, reused across render containers.
+
+    TTS_CACHE_BACKENDS="dir:/mnt/shared/tts_cache,http://10.0.0.5:8766/blobs"
+
+Layers are listed nearest first. ``custom_voiceover.fetch_tts`` looks in the
+local cache directory, then in each layer in order. A hit is copied into the
+local cache and written back to the layers that missed; a clip fetched from
+the TTS service is written back to every layer. Blobs are addressed by the
+cache key and carry their SHA-256 digest, so a truncated transfer is never
+cached.
+"""
+import hashlib
+import os
+import re
+import shutil
+import threading
+
+HASH_HEADER = "X-Content-SHA256"
+BLOB_NAME = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]{1,8}$")
+
+
+class BackendError(OSError):
+    """Raised when a layer returns a corrupt blob or an unexpected response."""
+
+
+def blob_name(key, fmt):
+    return f"{key}.{fmt}"
+
+
+def sharded_path(root, name):
+    return os.path.join(root, name[:2], name[2:4], name)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+
+
+def _copy_atomic(src, dest):
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp_path = _tmp_path(dest)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class DirBackend:
+    """A cache directory on a shared filesystem (NFS, a Modal volume, ...)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def __repr__(self):
+        return f"dir:{self.root}"
+
+    def get(self, key, fmt, dest):
+        """Copies the blob into ``dest``; returns False if the layer does not have it."""
+        src = sharded_path(self.root, blob_name(key, fmt))
+        if not os.path.exists(src):
+            return False
+        _copy_atomic(src, dest)
+        return True
+
+    def put(self, key, fmt, src):
+        dest = sharded_path(self.root, blob_name(key, fmt))
+        if not os.path.exists(dest):
+            _copy_atomic(src, dest)
+
+
+class HttpBlobBackend:
+    """
+    A blob store speaking ``GET``/``PUT {base_url}/{key}.{fmt}``, such as
+    ``tts_blob_server.py``.
+    """
+
+    def __init__(self, base_url, token=None, timeout=(5, 60)):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return self.base_url
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    self._session = requests.Session()
+        return self._session
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    def get(self, key, fmt, dest):
+        url = f"{self.base_url}/{blob_name(key, fmt)}"
+        response = self._get_session().get(url, headers=self._headers(), stream=True, timeout=self.timeout)
+        try:
+            if response.status_code == 404:
+                return False
+            response.raise_for_status()
+            expected = response.headers.get(HASH_HEADER)
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            tmp_path = _tmp_path(dest)
+            try:
+                digest = hashlib.sha256()
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        if chunk:
+                            digest.update(chunk)
+                            f.write(chunk)
+                if expected and digest.hexdigest() != expected.lower():
+                    raise BackendError(f"Digest mismatch for {url}")
+                os.replace(tmp_path, dest)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return True
+        finally:
+            response.close()
+
+    def put(self, key, fmt, src):
+        url = f"{self.base_url}/{blob_name(key, fmt)}"
+        with open(src, "rb") as f:
+            body = f.read()
+        headers = self._headers()
+        headers["Content-Type"] = "application/octet-stream"
+        headers[HASH_HEADER] = hashlib.sha256(body).hexdigest()
+        response = self._get_session().put(url, data=body, headers=headers, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+        finally:
+            response.close()
+
+
+def parse_backends(spec, token=None):
+    """
+    Builds the layers described by a comma separated ``spec``: ``dir:<path>``
+    (or a bare path) for a shared directory, ``http(s)://...`` for a blob store.
+    """
+    backends = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith(("http://", "https://")):
+            backends.append(HttpBlobBackend(item, token=token))
+        elif item.startswith("dir:"):
+            backends.append(DirBackend(item[len("dir:"):]))
+        else:
+            backends.append(DirBackend(item))
+    return backends
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite index of the clips in a TTS cache directory.
+
+The index lives next to the audio files (``tts_cache/index.sqlite3``) and
+records, per cache key, the relative path, voice, byte size, duration,
+created time, last access and hit count. Stats, warmups and evictions run as
+queries instead of walking and decoding the directory.
+
+Clips used by a running render are pinned (per host and pid) and are never
+evicted; pins of processes that have exited are ignored and cleaned up.
+
+    python tts_cache_index.py stats [cache_dir]
+    python tts_cache_index.py rebuild [cache_dir]
+    python tts_cache_index.py evict [cache_dir] <max_bytes>
+"""
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+import mp3_duration
+import pcm_sidecar
+
+INDEX_FILENAME = "index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    voice TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    duration REAL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS clips_last_access ON clips (last_access);
+CREATE TABLE IF NOT EXISTS pins (
+    key TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    pinned_at REAL NOT NULL,
+    PRIMARY KEY (key, host, pid)
+);
+"""
+
+# 其他主机上的 pin 无法检查进程是否存活，超过这个时间视为失效
+PIN_TTL = 6 * 3600
+
+# 超出预算时一次清理到预算的这个比例，避免每次写入都触发清理
+EVICT_TARGET_RATIO = 0.9
+
+_HOST = socket.gethostname()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CacheEntry:
+    """One row of the index."""
+
+    def __init__(self, key, path, voice, size, duration, created_at, last_access, hits):
+        self.key = key
+        self.path = path
+        self.voice = voice
+        self.size = size
+        self.duration = duration
+        self.created_at = created_at
+        self.last_access = last_access
+        self.hits = hits
+
+
+class CacheIndex:
+    """Index for one cache directory. Safe to share between threads and processes."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self._local = threading.local()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def abspath(self, entry):
+        return os.path.join(self.cache_dir, entry.path)
+
+    def lookup(self, key):
+        """Returns the CacheEntry for ``key`` or None."""
+        row = self._connect().execute(
+            "SELECT key, path, voice, size, duration, created_at, last_access, hits FROM clips WHERE key = ?",
+            (key,),
+        ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def record(self, key, audio_path, voice=None, duration=None):
+        """Adds or replaces the entry for a clip that was just written."""
+        now = time.time()
+        size = os.path.getsize(audio_path)
+        wav_path = pcm_sidecar.sidecar_path(audio_path)
+        if os.path.exists(wav_path):
+            size += os.path.getsize(wav_path)
+        path = os.path.relpath(audio_path, self.cache_dir)
+        self._connect().execute(
+            "INSERT OR REPLACE INTO clips (key, path, voice, size, duration, created_at, last_access, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+            (key, path, voice, size, duration, now, now),
+        )
+
+    def add_bytes(self, key, size):
+        """Adds the size of a sidecar written for ``key`` to its budget share."""
+        self._connect().execute("UPDATE clips SET size = size + ? WHERE key = ?", (size, key))
+
+    def set_duration(self, key, duration):
+        self._connect().execute("UPDATE clips SET duration = ? WHERE key = ?", (duration, key))
+
+    def touch(self, key):
+        """Marks a cache hit."""
+        self._connect().execute(
+            "UPDATE clips SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+        )
+
+    def remove(self, key):
+        self._connect().execute("DELETE FROM clips WHERE key = ?", (key,))
+
+    def pin(self, key):
+        """Protects ``key`` from eviction until this process exits or calls unpin_all()."""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO pins (key, host, pid, pinned_at) VALUES (?, ?, ?, ?)",
+            (key, _HOST, os.getpid(), time.time()),
+        )
+
+    def unpin_all(self, pid=None):
+        self._connect().execute(
+            "DELETE FROM pins WHERE host = ? AND pid = ?", (_HOST, os.getpid() if pid is None else pid)
+        )
+
+    def _live_pinned_keys(self, conn):
+        pinned = set()
+        expired = time.time() - PIN_TTL
+        for key, host, pid, pinned_at in conn.execute("SELECT key, host, pid, pinned_at FROM pins").fetchall():
+            if host == _HOST:
+                alive = _pid_alive(pid)
+            else:
+                alive = pinned_at >= expired
+            if alive:
+                pinned.add(key)
+            else:
+                conn.execute("DELETE FROM pins WHERE key = ? AND host = ? AND pid = ?", (key, host, pid))
+        return pinned
+
+    def total_bytes(self):
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+
+    def evict(self, max_bytes, target_ratio=EVICT_TARGET_RATIO):
+        """
+        Deletes least-recently-used clips until the cache is below
+        ``max_bytes * target_ratio``. Pinned clips are skipped. Returns
+        ``(clips, bytes)`` removed; does nothing while under ``max_bytes``.
+        """
+        if max_bytes <= 0 or self.total_bytes() <= max_bytes:
+            return 0, 0
+        conn = self._connect()
+        # 文件在写锁内删除：并发的 pin() 要么先于清理生效，要么之后发现文件已不存在
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+            target = int(max_bytes * target_ratio)
+            pinned = self._live_pinned_keys(conn)
+            removed_count, removed_bytes = 0, 0
+            rows = conn.execute("SELECT key, path, size FROM clips ORDER BY last_access").fetchall()
+            for key, path, size in rows:
+                if total <= target:
+                    break
+                if key in pinned:
+                    continue
+                audio_path = os.path.join(self.cache_dir, path)
+                for file_path in (audio_path, mp3_duration.sidecar_path(audio_path),
+                                  pcm_sidecar.sidecar_path(audio_path)):
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        pass
+                conn.execute("DELETE FROM clips WHERE key = ?", (key,))
+                total -= size
+                removed_count += 1
+                removed_bytes += size
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return removed_count, removed_bytes
+
+    def entries(self, order_by="last_access"):
+        if order_by not in ("last_access", "created_at", "hits", "size"):
+            raise ValueError(f"Unsupported order: {order_by}")
+        rows = self._connect().execute(
+            "SELECT key, path, voice, size, duration, created_at, last_access, hits FROM clips "
+            f"ORDER BY {order_by}"
+        )
+        return [CacheEntry(*row) for row in rows]
+
+    def stats(self):
+        """Returns count, total bytes, total duration and total hits, overall and per voice."""
+        conn = self._connect()
+        count, size, duration, hits = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(duration), 0), COALESCE(SUM(hits), 0) FROM clips"
+        ).fetchone()
+        voices = conn.execute(
+            "SELECT voice, COUNT(*), COALESCE(SUM(size), 0) FROM clips GROUP BY voice ORDER BY 2 DESC"
+        ).fetchall()
+        return {
+            "count": count,
+            "bytes": size,
+            "duration": duration,
+            "hits": hits,
+            "voices": [{"voice": v, "count": c, "bytes": b} for v, c, b in voices],
+        }
+
+    def rebuild(self):
+        """
+        Indexes audio files that exist on disk but not in the index, and drops
+        rows whose file is gone. Used once for caches created before the index.
+        """
+        conn = self._connect()
+        known = {path for (path,) in conn.execute("SELECT path FROM clips")}
+        added = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                audio_path = os.path.join(root, name)
+                if os.path.relpath(audio_path, self.cache_dir) in known:
+                    continue
+                try:
+                    duration = mp3_duration.get_duration(audio_path)
+                except ValueError:
+                    duration = None
+                self.record(os.path.splitext(name)[0], audio_path, duration=duration)
+                added += 1
+        removed = 0
+        for entry in self.entries():
+            if not os.path.exists(self.abspath(entry)):
+                self.remove(entry.key)
+                removed += 1
+        return added, removed
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(cache_dir):
+    """Returns the shared CacheIndex for ``cache_dir``."""
+    key = os.path.abspath(cache_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = CacheIndex(cache_dir)
+            _indexes[key] = index
+        return index
+
+
+def open_indexes():
+    """Returns the indexes opened by this process."""
+    with _indexes_lock:
+        return list(_indexes.values())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "rebuild", "evict"):
+        print("usage: python tts_cache_index.py stats|rebuild [cache_dir] | evict [cache_dir] <max_bytes>")
+        sys.exit(1)
+    args = sys.argv[2:]
+    max_bytes = int(args.pop()) if sys.argv[1] == "evict" and args else None
+    index = get_index(args[0] if args else "tts_cache")
+    if sys.argv[1] == "rebuild":
+        added, removed = index.rebuild()
+        print(f"indexed {added} clips, dropped {removed} missing entries")
+    elif sys.argv[1] == "evict":
+        if max_bytes is None:
+            print("evict requires <max_bytes>")
+            sys.exit(1)
+        count, size = index.evict(max_bytes)
+        print(f"evicted {count} clips, {size / 1024 / 1024:.1f} MiB")
+    stats = index.stats()
+    print(f"{stats['count']} clips, {stats['bytes'] / 1024 / 1024:.1f} MiB, "
+          f"{stats['duration'] / 60:.1f} min audio, {stats['hits']} hits")
+    for voice in stats["voices"]:
+        print(f"  {voice['voice'] or '-'}: {voice['count']} clips, {voice['bytes'] / 1024 / 1024:.1f} MiB")
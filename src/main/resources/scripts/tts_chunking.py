@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Splits long narration lines into sentence chunks and joins their MP3 clips.
+
+Each chunk is requested and cached on its own, so a paragraph-length line is
+synthesized in parallel and sentences repeated across videos hit the cache.
+Chunks follow sentence boundaries, not a character budget, so the same
+sentence is the same chunk whatever surrounds it. The chunk clips are
+decoded and re-encoded as one MP3 by ffmpeg, which trims each chunk's
+encoder delay and padding and writes one header for the joined clip.
+"""
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+import mp3_duration
+
+# 句末标点，标点留在句子末尾。英文标点后须有空白，避免拆开 2.5 这样的数字
+_SENTENCE_END = re.compile(r"(?<=[。！？；…])|(?<=[!?;.])(?=\s)")
+# 句中停顿，只用来拆开超过长度上限的句子
+_CLAUSE_END = re.compile(r"(?<=[，、：])|(?<=[,:])(?=\s)")
+# 短于这个字数（或只有标点）的片段并入相邻的片段，避免请求很短的音频
+MIN_CHUNK_CHARS = 8
+
+
+def _ffmpeg_binary():
+    return os.environ.get("FFMPEG_BINARY") or shutil.which("ffmpeg") or "ffmpeg"
+
+
+def _pieces(pattern, text):
+    return [piece for piece in pattern.split(text) if piece]
+
+
+def _too_short(chunk, min_chars):
+    return len(chunk.strip()) < min_chars or not re.search(r"\w", chunk)
+
+
+def _pack(clauses, max_chars):
+    """Packs the clauses of one long sentence into pieces of at most about ``max_chars``."""
+    packed = []
+    current = ""
+    for clause in clauses:
+        if current and len(current) + len(clause) > max_chars:
+            packed.append(current)
+            current = clause
+        else:
+            current += clause
+    if current:
+        packed.append(current)
+    return packed
+
+
+def split_narration(text, max_chars, min_chars=MIN_CHUNK_CHARS):
+    """
+    Returns ``text`` as one chunk per sentence. Sentences longer than
+    ``max_chars`` are broken further at commas; fragments shorter than
+    ``min_chars`` are merged into the previous chunk (the next one for a
+    leading fragment). Text of at most ``max_chars`` is one chunk.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+    chunks = []
+    for sentence in _pieces(_SENTENCE_END, text):
+        if len(sentence.strip()) > max_chars:
+            chunks.extend(_pack(_pieces(_CLAUSE_END, sentence), max_chars))
+        else:
+            chunks.append(sentence)
+    merged = []
+    for chunk in chunks:
+        if merged and (_too_short(chunk, min_chars) or _too_short(merged[-1], min_chars)):
+            merged[-1] += chunk
+        else:
+            merged.append(chunk)
+    # 去掉首尾空白，同一句话出现在不同视频里时命中同一个缓存片段
+    return [chunk.strip() for chunk in merged if chunk.strip()] or [text]
+
+
+def concat_mp3(paths, dest):
+    """
+    Decodes the MP3 files ``paths`` and encodes them, in order, as one MP3
+    at ``dest`` with the bitrate, sample rate and channels of the first one.
+    Raises ValueError if a file has no audio frames or ffmpeg fails.
+    """
+    first = None
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            header, _, _ = mp3_duration.audio_frame_span(data)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+        first = first or header
+    # 解码时按各段的 LAME 头去掉编码器延迟和填充，重新编码后比特池和头帧都是连续的
+    inputs = []
+    for path in paths:
+        inputs += ["-i", path]
+    streams = "".join(f"[{i}:a]" for i in range(len(paths)))
+    tmp_path = f"{dest}.{os.getpid()}.{threading.get_ident()}.part"
+    cmd = [
+        _ffmpeg_binary(), "-nostdin", "-v", "error", "-y", *inputs,
+        "-filter_complex", f"{streams}concat=n={len(paths)}:v=0:a=1[out]", "-map", "[out]",
+        "-c:a", "libmp3lame", "-b:a", f"{first.bitrate // 1000}k", "-ar", str(first.sample_rate),
+        "-ac", "1" if first.channel_mode == 3 else "2", "-f", "mp3", tmp_path,
+    ]
+    try:
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise ValueError(f"Cannot start ffmpeg: {e}")
+        if result.returncode != 0:
+            raise ValueError(f"ffmpeg failed to join chunks: {result.stderr.decode('utf-8', 'replace').strip()}")
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return dest
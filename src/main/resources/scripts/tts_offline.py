@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic stand-in narration audio, for benchmarks and isolated nodes.
+
+``synthesize(text)`` returns a valid MP3 of silence whose length grows with
+the text, roughly matching how long the real TTS service speaks it. Used by
+``tts_stub_server.py`` and by ``custom_voiceover`` when ``TTS_OFFLINE=1``.
+"""
+import struct
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono
+_FRAME_HEADER = b"\xff\xfb\x90\xc4"
+_FRAME_LENGTH = 417
+_SIDE_INFO_LENGTH = 17
+FRAME_SECONDS = 1152 / 44100
+
+# 全零的帧数据（side info 中 part2_3_length 为 0）解码为静音
+_SILENT_FRAME = _FRAME_HEADER + b"\x00" * (_FRAME_LENGTH - 4)
+
+# 语速估计：中日韩字符每字约 0.22 秒，其他字符约 0.065 秒
+SECONDS_PER_CJK_CHAR = 0.22
+SECONDS_PER_CHAR = 0.065
+MIN_SECONDS = 0.5
+
+
+def _is_cjk(ch):
+    code = ord(ch)
+    return (0x3040 <= code <= 0x30FF or 0x3400 <= code <= 0x4DBF or 0x4E00 <= code <= 0x9FFF
+            or 0xAC00 <= code <= 0xD7AF or 0xF900 <= code <= 0xFAFF)
+
+
+def estimate_seconds(text):
+    """Returns how long the narration of ``text`` should last."""
+    seconds = 0.0
+    for ch in text:
+        if ch.isspace():
+            continue
+        seconds += SECONDS_PER_CJK_CHAR if _is_cjk(ch) else SECONDS_PER_CHAR
+    return max(MIN_SECONDS, seconds)
+
+
+def silent_mp3(seconds, info_header=True):
+    """
+    Returns ``seconds`` of silent MP3. With ``info_header`` the first frame is
+    a LAME-style "Info" frame carrying the frame count, like real CBR encoders
+    write it.
+    """
+    frames = max(1, int(round(seconds / FRAME_SECONDS)))
+    if not info_header:
+        return _SILENT_FRAME * frames
+    info = bytearray(_SILENT_FRAME)
+    offset = 4 + _SIDE_INFO_LENGTH
+    info[offset:offset + 16] = b"Info" + struct.pack(">III", 0x03, frames, frames * _FRAME_LENGTH)
+    return bytes(info) + _SILENT_FRAME * frames
+
+
+def synthesize(text):
+    """Returns the stand-in MP3 bytes for ``text``."""
+    return silent_mp3(estimate_seconds(text))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Downloads every narration line of a scene script before rendering starts.
+
+Usage:
+    python tts_prefetch.py 08.py          # 只预取，不渲染
+or, in a script's main block:
+    prefetch_file(__file__, wait=False)
+    scene = CombinedScene()
+    scene.render()
+
+With ``wait=False`` the downloads run in the background while the scene
+builds its mobjects; each ``custom_voiceover_tts`` block only waits for its
+own line.
+
+Narration strings are found statically: string literals assigned to
+``voice_text*`` names and literal first arguments of ``custom_voiceover_tts``
+and ``play_voiceover`` calls. Anything computed at render time is still
+fetched by ``custom_voiceover_tts`` as before.
+"""
+import ast
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import custom_voiceover
+
+PREFETCH_WORKERS = 8
+
+VOICE_TEXT_NAME = re.compile(r"^voice_text\w*$")
+NARRATION_CALLS = ("custom_voiceover_tts", "play_voiceover")
+
+
+def _const_str(node):
+    """Returns the string value of a literal (or literal concatenation) node."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _const_str(node.left)
+        right = _const_str(node.right)
+        if left is not None and right is not None:
+            return left + right
+    return None
+
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _target_names(node):
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    for target in targets:
+        if isinstance(target, ast.Name):
+            yield target.id
+        elif isinstance(target, ast.Attribute):
+            yield target.attr
+
+
+def extract_narration(source):
+    """
+    Returns ``(texts, cache_dir)`` for a script's source code.
+    ``texts`` keeps source order without duplicates; ``cache_dir`` is the
+    literal argument of ``set_cache_dir(...)`` if the script calls it.
+    """
+    tree = ast.parse(source)
+    texts = []
+    cache_dir = None
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+            if any(VOICE_TEXT_NAME.match(name) for name in _target_names(node)):
+                text = _const_str(node.value)
+                if text:
+                    texts.append((node.lineno, node.col_offset, text))
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            if name in NARRATION_CALLS and node.args:
+                text = _const_str(node.args[0])
+                if text:
+                    texts.append((node.lineno, node.col_offset, text))
+            elif name == "set_cache_dir" and node.args:
+                cache_dir = _const_str(node.args[0])
+    texts.sort()
+    return list(dict.fromkeys(text for _, _, text in texts)), cache_dir
+
+
+def prefetch(texts, max_workers=PREFETCH_WORKERS, wait=True):
+    """
+    Downloads ``texts`` into the TTS cache concurrently.
+    Returns ``{text: audio_path or None}``; failures are reported, not raised,
+    so the render falls back to fetching that line inline. With ``wait=False``
+    the lines are only queued and ``{text: LazyVoiceoverTracker}`` is returned.
+    """
+    texts = list(dict.fromkeys(texts))
+    if not texts:
+        return {}
+    if not wait:
+        print(f"TTS prefetch: {len(texts)} lines queued in the background")
+        return {text: custom_voiceover.request_voiceover(text) for text in texts}
+
+    def fetch(text):
+        try:
+            return custom_voiceover.fetch_tts(text)
+        except Exception as e:
+            print(f"TTS prefetch failed for: {text[:30]}... ({e})")
+            return None
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(texts))) as pool:
+        results = dict(zip(texts, pool.map(fetch, texts)))
+    ok = sum(1 for path in results.values() if path)
+    print(f"TTS prefetch: {ok}/{len(texts)} lines ready in {time.time() - start:.2f}s")
+    return results
+
+
+def prefetch_source(source, max_workers=PREFETCH_WORKERS, wait=True):
+    """Prefetches the narration of a script given as source code."""
+    texts, cache_dir = extract_narration(source)
+    if cache_dir and cache_dir != custom_voiceover.CACHE_DIR:
+        custom_voiceover.set_cache_dir(cache_dir)
+    return prefetch(texts, max_workers=max_workers, wait=wait)
+
+
+def prefetch_file(path, max_workers=PREFETCH_WORKERS, wait=True):
+    """Prefetches the narration of the script at ``path``."""
+    with open(path, "r", encoding="utf-8") as f:
+        return prefetch_source(f.read(), max_workers=max_workers, wait=wait)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python tts_prefetch.py <script.py> [<script.py> ...]")
+        sys.exit(1)
+    for script_path in sys.argv[1:]:
+        prefetch_file(script_path)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the TTS service, speaking the same ``?token=&input=`` protocol.
+
+    python tts_stub_server.py --port 8765 --latency 0.3 --error-rate 0.05 --chunk-delay 0.01
+    TTS_BASE_URL=http://127.0.0.1:8765/api/manim/tts python 08.py
+
+Every request returns deterministic silent MP3 audio whose length is
+proportional to the text (see ``tts_offline``). Latency, failures and slow
+streaming can be injected to benchmark the render pipeline without the
+live service.
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import tts_offline
+
+CHUNK_SIZE = 8192
+
+
+class StubConfig:
+    """Fault injection settings shared by all request handlers."""
+
+    def __init__(self, token=None, latency=0.0, error_rate=0.0, chunk_delay=0.0, seed=0):
+        self.token = token
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chunk_delay = chunk_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return fail
+
+
+class TtsStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = StubConfig()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        text = query.get("input", [""])[0]
+        token = query.get("token", [""])[0]
+        config = self.config
+        if config.latency:
+            time.sleep(config.latency)
+        if config.token is not None and token != config.token:
+            self._send_error(401, "invalid token")
+            return
+        if not text:
+            self._send_error(400, "input is required")
+            return
+        if config.should_fail():
+            self._send_error(500, "injected failure")
+            return
+        body = tts_offline.synthesize(text)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for start in range(0, len(body), CHUNK_SIZE):
+            self.wfile.write(body[start:start + CHUNK_SIZE])
+            if config.chunk_delay:
+                self.wfile.flush()
+                time.sleep(config.chunk_delay)
+
+    def _send_error(self, status, message):
+        body = message.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=0, **config):
+    """Returns a stub server; ``config`` takes the StubConfig keyword arguments."""
+    handler = type("ConfiguredTtsStubHandler", (TtsStubHandler,), {"config": StubConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(host="127.0.0.1", port=0, **config):
+    """
+    Starts the stub in a background thread and returns ``(server, base_url)``.
+    Call ``server.shutdown()`` to stop it.
+    """
+    server = make_server(host, port, **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api/manim/tts"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in TTS server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", default=None, help="reject requests with a different token")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between 8 KiB body chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, token=args.token, latency=args.latency,
+                         error_rate=args.error_rate, chunk_delay=args.chunk_delay, seed=args.seed)
+    print(f"TTS stub listening on http://{args.host}:{args.port}/api/manim/tts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Warms the TTS cache from a corpus of scene scripts.
+
+    python tts_warmup.py . ../prompts --cache-dir /var/cache/tts --workers 8 --rate 4
+    python tts_warmup.py ../prompts --voice openai/alloy --voice openai/nova
+
+Scans ``.py`` files and the fenced (or bare) Python code of ``.txt`` prompt
+examples, extracts every literal narration line like ``tts_prefetch`` does,
+and fetches the lines that are not cached yet. ``--rate`` caps requests per
+second sent to the TTS service, including the requests for the chunks of
+long lines; hits in the local cache or a shared layer are not limited. Used
+to prepare new worker images and voices before traffic moves to them.
+
+The generated scripts point the cache at a per-task directory with
+``set_cache_dir(r"#(output_path)/audio")``, which would never contain the
+warmed clips. Renders read them when their environment sets
+``TTS_CACHE_DIR`` to the directory warmed here (the default of
+``--cache-dir``); ``render_service`` does this for its fork server.
+"""
+import argparse
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import custom_voiceover
+from tts_prefetch import extract_narration
+
+CODE_BLOCK = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.S)
+SOURCE_EXTS = (".py", ".txt")
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across threads; rate <= 0 disables it."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class WarmupStats:
+    def __init__(self):
+        self.lines = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, field, count=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+
+def iter_source_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith((".", "__")))
+                for name in sorted(files):
+                    if name.endswith(SOURCE_EXTS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def read_sources(path):
+    """Returns the Python sources in ``path``: the file itself, or the code blocks of a prompt."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".py"):
+        return [content]
+    return CODE_BLOCK.findall(content) or [content]
+
+
+def collect_narration(paths):
+    """Returns the unique narration lines of all scripts under ``paths``, in discovery order."""
+    texts = []
+    for path in iter_source_files(paths):
+        for source in read_sources(path):
+            try:
+                found, _ = extract_narration(source)
+            except SyntaxError:
+                # 提示词里的普通文本或代码片段，没有可提取的旁白
+                continue
+            texts.extend(found)
+    return list(dict.fromkeys(texts))
+
+
+def parse_voice(value):
+    """Parses "provider/voice_id" (either part may be empty) into TtsRequest keyword arguments."""
+    if not value:
+        return {}
+    provider, _, voice_id = value.partition("/")
+    return {"voice_provider": provider or None, "voice_id": voice_id or None}
+
+
+def warm(texts, voices=None, workers=8, rate=0.0):
+    """Fetches every line in every voice; returns WarmupStats."""
+    voices = voices or [{}]
+    limiter = RateLimiter(rate)
+    stats = WarmupStats()
+    jobs = [(text, voice) for voice in voices for text in texts]
+    stats.lines = len(jobs)
+
+    def fetch(job):
+        text, voice = job
+        try:
+            path, source = custom_voiceover.fetch_tts_with_source(text, **voice)
+        except Exception as e:
+            print(f"TTS warmup failed for: {text[:30]}... ({e})")
+            stats.add("failures")
+            return
+        if source == "cache":
+            stats.add("hits")
+        elif source == "shared":
+            stats.add("shared_hits")
+        else:
+            stats.add("misses")
+            stats.add("bytes", os.path.getsize(path))
+
+    if jobs:
+        # 在 HTTP 请求处限速，长句拆出的分段请求也计入
+        previous = custom_voiceover.set_request_limiter(limiter.wait)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+                list(pool.map(fetch, jobs))
+        finally:
+            custom_voiceover.set_request_limiter(previous)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="script files or directories (.py, .txt prompt examples)")
+    parser.add_argument("--cache-dir", default=custom_voiceover.TTS_CACHE_DIR,
+                        help="TTS cache to fill; renders must use it as TTS_CACHE_DIR (default: TTS_CACHE_DIR)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0, help="max TTS requests per second, 0 = unlimited")
+    parser.add_argument("--voice", action="append", default=None,
+                        help="provider/voice_id to warm; repeat for several voices (default: current voice)")
+    args = parser.parse_args()
+
+    if args.cache_dir:
+        custom_voiceover.set_cache_dir(args.cache_dir, force=True)
+    else:
+        print("TTS_CACHE_DIR is not set: renders only hit these clips if they use "
+              f"{os.path.abspath(custom_voiceover.CACHE_DIR)} as TTS_CACHE_DIR")
+    voices = [parse_voice(v) for v in args.voice] if args.voice else [{}]
+
+    start = time.time()
+    texts = collect_narration(args.paths)
+    print(f"Found {len(texts)} narration lines, warming {len(voices)} voice(s) into {custom_voiceover.CACHE_DIR}")
+    stats = warm(texts, voices, workers=args.workers, rate=args.rate)
+    elapsed = time.time() - start
+    print(f"lines {stats.lines}  hits {stats.hits}  shared hits {stats.shared_hits}  misses {stats.misses}  "
+          f"failures {stats.failures}  "
+          f"downloaded {stats.bytes / 1024 / 1024:.1f} MiB  elapsed {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
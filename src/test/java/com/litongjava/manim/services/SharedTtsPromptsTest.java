@@ -0,0 +1,60 @@
+package com.litongjava.manim.services;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertFalse;
+import static org.junit.Assert.assertTrue;
+
+import java.util.regex.Pattern;
+
+import org.junit.Test;
+
+import com.litongjava.tio.utils.hutool.FileUtil;
+import com.litongjava.tio.utils.hutool.ResourceUtil;
+
+public class SharedTtsPromptsTest {
+
+  private String read(String name) {
+    return FileUtil.readURLAsString(ResourceUtil.getResource(name)).toString();
+  }
+
+  private void assertUsesSharedModule(String prompt) {
+    assertTrue(prompt.contains("from custom_voiceover import custom_voiceover_tts, set_cache_dir"));
+    assertTrue(prompt.contains("tracker.add_sound(self)"));
+    assertFalse(prompt.contains("def custom_voiceover_tts"));
+    assertFalse(prompt.contains("CACHE_DIR = "));
+    assertFalse(Pattern.compile("(?m)^\\s+self\\.add_sound\\(tracker").matcher(prompt).find());
+  }
+
+  @Test
+  public void codeExamples() {
+    for (String name : new String[] { "prompts/code_example_01.txt", "prompts/code_example_02.txt", "prompts/code_example_03.txt" }) {
+      String codeExample = SharedTtsPrompts.codeExample(read(name));
+      assertUsesSharedModule(codeExample);
+      assertFalse(codeExample.contains("import requests"));
+      assertFalse(codeExample.contains("from moviepy import AudioFileClip"));
+      assertTrue(codeExample.contains("class CombinedScene"));
+    }
+  }
+
+  @Test
+  public void instructions() {
+    String prompt = SharedTtsPrompts.instructions(read("prompts/gen_video_code_en.txt"));
+    assertUsesSharedModule(prompt);
+    assertTrue(prompt.contains("**Do not** copy or re-implement `custom_voiceover_tts`"));
+    // 与 TTS 无关的示例保持不变
+    assertTrue(prompt.contains("from moviepy import AudioFileClip # Correct import for AudioFileClip"));
+  }
+
+  @Test
+  public void checkedAddSound() {
+    String code = "        with custom_voiceover_tts(text) as tracker:\r\n" //
+        + "            if tracker.audio_path and tracker.duration > 0:\r\n" //
+        + "                self.add_sound(tracker.audio_path, time_offset=0)\r\n" //
+        + "            else:\r\n" //
+        + "                print(\"Warning: Scene 1 TTS audio failed.\")\r\n" //
+        + "            self.play(FadeIn(title))\r\n";
+    assertEquals("        with custom_voiceover_tts(text) as tracker:\r\n" //
+        + "            tracker.add_sound(self)\n" //
+        + "            self.play(FadeIn(title))\r\n", SharedTtsPrompts.codeExample(code));
+  }
+}